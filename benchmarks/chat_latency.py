@@ -0,0 +1,102 @@
+"""
+Chat latency under blog-generation load.
+
+Starts a number of blog generations against a running API and, while they are
+in flight, measures the latency of cheap probe requests (the root endpoint by
+default, or a general chat question with --chat). With a non-blocking /chat
+the probe p99 should stay in the milliseconds-to-one-LLM-call range instead of
+waiting for a crew run to finish.
+
+/chat is rate limited per client, so start the server with the chat and blog
+buckets lifted, otherwise the --chat probes measure the limiter instead of the
+chat path. Responses other than 200 are left out of the percentiles and
+counted by status; use --max-rate to stay under a limit you cannot lift.
+
+    CHAT_RATE_PER_MINUTE=100000 CHAT_BURST=100000 BLOG_BURST=100 \\
+        uvicorn src.social_media_blog.app:app --port 8000
+    python benchmarks/chat_latency.py --url http://localhost:8000 --blogs 3 --probes 50 --chat
+"""
+import argparse
+from collections import Counter
+import statistics
+import threading
+import time
+
+import requests
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_blog(url, topic, results):
+    start = time.perf_counter()
+    try:
+        response = requests.post(f"{url}/chat", json={"topic": f"Write a blog post about {topic}"}, timeout=900)
+        results.append((response.status_code, time.perf_counter() - start))
+    except requests.RequestException as e:
+        results.append((str(e), time.perf_counter() - start))
+
+
+def probe(session, url, chat):
+    start = time.perf_counter()
+    if chat:
+        response = session.post(f"{url}/chat", json={"topic": "What does Mindtype do?"}, timeout=120)
+    else:
+        response = session.get(f"{url}/", timeout=120)
+    return response.status_code, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--blogs", type=int, default=3, help="concurrent blog generations to keep in flight")
+    parser.add_argument("--probes", type=int, default=50, help="probe requests to send while blogs run")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between probes")
+    parser.add_argument("--chat", action="store_true", help="probe /chat with a support question instead of /")
+    parser.add_argument("--max-rate", type=float, default=None, help="cap on probes per minute, for servers with a rate limit")
+    args = parser.parse_args()
+
+    blog_results = []
+    blog_threads = [
+        threading.Thread(target=run_blog, args=(args.url, f"topic {i}", blog_results), daemon=True)
+        for i in range(args.blogs)
+    ]
+    for thread in blog_threads:
+        thread.start()
+
+    # Give the server a moment to pick the blog requests up before probing.
+    time.sleep(1.0)
+
+    interval = max(args.interval, 60 / args.max_rate) if args.max_rate else args.interval
+    latencies = []
+    failures = Counter()
+    with requests.Session() as session:
+        for _ in range(args.probes):
+            status, elapsed = probe(session, args.url, args.chat)
+            if status == 200:
+                latencies.append(elapsed * 1000)
+            else:
+                failures[status] += 1
+            time.sleep(interval)
+
+    print(f"probes: {len(latencies)} ok, {sum(failures.values())} non-200 {dict(failures) or ''}")
+    if failures[429]:
+        print("warning: probes were rate limited; lift the server's limits or pass --max-rate")
+    if latencies:
+        print(f"probe latency ms  p50={percentile(latencies, 50):.1f}  "
+              f"p95={percentile(latencies, 95):.1f}  p99={percentile(latencies, 99):.1f}  "
+              f"max={max(latencies):.1f}  mean={statistics.mean(latencies):.1f}")
+
+    for thread in blog_threads:
+        thread.join()
+    for status, elapsed in blog_results:
+        print(f"blog: status={status} elapsed={elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Per-stage wall time, tokens and output validity of the blog crew.
+
+Runs the real crew (GOOGLE_API_KEY and network access required) over a few
+topics and records, for each task, the model it ran on, its wall time, an
+estimate of the tokens it consumed (its agent's messages plus its output) and
+whether its output is usable: non-empty for research and writing, a JSON
+object that validates as BlogOutput for summarizing. Crew-wide token usage as
+reported by CrewAI is recorded too.
+
+Model tiers come from agents.yaml/tasks.yaml; --tier overrides one task's tier
+for the run, so configurations can be compared side by side. Every run is
+appended to --output as one JSON line.
+
+    python benchmarks/crew_stages_bench.py --topics "AI in healthcare,remote work" --runs 2
+    python benchmarks/crew_stages_bench.py --tier summarizing_task=strong_llm --tier writing_task=fast_llm
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.social_media_blog.chat_models import BlogOutput  # noqa: E402
+from src.social_media_blog.crew import SocialMediaBlog  # noqa: E402
+from src.social_media_blog.tokens import count_tokens  # noqa: E402
+
+
+def valid_output(task_name: str, raw: str) -> bool:
+    text = (raw or "").strip()
+    if task_name != "summarizing_task":
+        return bool(text)
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
+    try:
+        BlogOutput.model_validate_json(text)
+        return True
+    except ValueError:
+        return False
+
+
+def message_tokens(output) -> int:
+    messages = getattr(output, "messages", None) or []
+    return sum(count_tokens(str(message.get("content") or "")) for message in messages)
+
+
+def run_once(topic: str, tone: str, tiers: dict) -> dict:
+    blog = SocialMediaBlog()
+    for task_name, tier in tiers.items():
+        blog.tasks_config[task_name]["llm"] = tier
+    crew = blog.crew()
+    finished = []
+    crew.task_callback = lambda output: finished.append((time.perf_counter(), output))
+
+    started = time.perf_counter()
+    error = None
+    try:
+        result = crew.kickoff(inputs={"topic": topic, "tone": tone})
+        usage = getattr(result, "token_usage", None)
+        usage = usage.model_dump() if usage is not None else {}
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        usage = {}
+    total = time.perf_counter() - started
+
+    stages = []
+    previous = started
+    for task, (stamp, output) in zip(crew.tasks, finished):
+        stages.append({
+            "task": task.name,
+            "model": getattr(task.agent.llm, "model", str(task.agent.llm)),
+            "seconds": round(stamp - previous, 2),
+            "estimated_tokens": message_tokens(output) + count_tokens(output.raw or ""),
+            "valid": valid_output(task.name, output.raw),
+        })
+        previous = stamp
+    return {"topic": topic, "tone": tone, "tiers": tiers, "seconds": round(total, 2),
+            "token_usage": usage, "stages": stages, "error": error}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", default="AI in healthcare", help="comma separated topics")
+    parser.add_argument("--tone", default="informative")
+    parser.add_argument("--runs", type=int, default=1, help="runs per topic")
+    parser.add_argument("--tier", action="append", default=[], metavar="TASK=TIER",
+                        help="run TASK on TIER (strong_llm or fast_llm) instead of its configured model")
+    parser.add_argument("--output", default="crew_stages.jsonl", help="JSON lines file the runs are appended to")
+    args = parser.parse_args()
+
+    tiers = dict(override.split("=", 1) for override in args.tier)
+    runs = []
+    with open(args.output, "a", encoding="utf-8") as f:
+        for topic in [t.strip() for t in args.topics.split(",") if t.strip()]:
+            for _ in range(args.runs):
+                run = run_once(topic, args.tone, tiers)
+                f.write(json.dumps(run) + "\n")
+                runs.append(run)
+
+    by_stage = {}
+    for run in runs:
+        for stage in run["stages"]:
+            by_stage.setdefault((stage["task"], stage["model"]), []).append(stage)
+    print(f"{len(runs)} runs, {sum(1 for run in runs if run['error'])} failed; results appended to {args.output}")
+    for (task_name, model), stages in by_stage.items():
+        print(f"{task_name:<18} {model:<24} wall p50={statistics.median(s['seconds'] for s in stages):7.1f} s  "
+              f"tokens p50={statistics.median(s['estimated_tokens'] for s in stages):7.0f}  "
+              f"valid={sum(s['valid'] for s in stages)}/{len(stages)}")
+    if runs:
+        print(f"{'crew total':<43} wall p50={statistics.median(run['seconds'] for run in runs):7.1f} s")
+
+
+if __name__ == "__main__":
+    main()
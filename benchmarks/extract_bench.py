@@ -0,0 +1,75 @@
+"""
+Article extraction micro-benchmark.
+
+Compares the original extraction (full html.parser soup, every <p> but the
+last) with extract.extract_text() for each available parser, over a directory
+of saved HTML pages. Without --fixtures a synthetic news-style page with
+navigation, scripts and comment boilerplate is generated instead.
+
+    python benchmarks/extract_bench.py --fixtures path/to/saved_pages --repeat 20
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.social_media_blog.extract import PARAGRAPH_EXTRACTORS, extract_text  # noqa: E402
+
+
+def original_extract(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    paragraphs = [p.get_text() for p in soup.find_all("p")]
+    return "\n".join(paragraphs[:-1])
+
+
+def synthetic_page(paragraphs: int = 400) -> str:
+    nav = "<nav>" + "".join(f"<a href='/s{i}'>Section {i}</a>" for i in range(100)) + "</nav>"
+    script = "<script>" + "var x = 1;" * 5000 + "</script>"
+    body = "".join(
+        f"<p>Paragraph {i}: the committee reviewed quarterly figures and published a detailed breakdown of spending.</p>"
+        for i in range(paragraphs)
+    )
+    comments = "<aside>" + "".join(f"<p>Comment {i}: great read, subscribe for more!</p>" for i in range(200)) + "</aside>"
+    footer = "<footer><p>All rights reserved. Privacy policy. Terms of use.</p></footer>"
+    return f"<html><head>{script}</head><body>{nav}<article>{body}</article>{comments}{footer}</body></html>"
+
+
+def measure(fn, html: str, repeat: int):
+    timings = []
+    output = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = fn(html)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        pages = {path.name: path.read_text(encoding="utf-8", errors="replace") for path in sorted(Path(args.fixtures).glob("*.html"))}
+    else:
+        pages = {"synthetic.html": synthetic_page()}
+
+    candidates = {"original (html.parser)": original_extract}
+    for name in PARAGRAPH_EXTRACTORS:
+        candidates[f"extract_text ({name})"] = lambda html, name=name: extract_text(html, parser=name)
+
+    for page_name, html in pages.items():
+        print(f"{page_name}: {len(html) / 1024:.0f} KiB")
+        for label, fn in candidates.items():
+            parse_ms, chars = measure(fn, html, args.repeat)
+            print(f"  {label:<28} {parse_ms:8.2f} ms  {chars:8d} chars")
+
+
+if __name__ == "__main__":
+    main()
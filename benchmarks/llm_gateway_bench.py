@@ -0,0 +1,137 @@
+"""
+LLM gateway latency and availability against local stub providers.
+
+Starts two Groq-compatible stub servers: a primary that is usually fast but has
+a slow tail (and, with --primary-errors, fails part of its calls) and a steadier
+secondary. The same batch of short chat calls is sent through a gateway with
+only the primary (what a single hardwired model does), with fallback to the
+secondary, and with fallback plus hedging, and p50/p95/p99 and failures are
+reported for each.
+
+    python benchmarks/llm_gateway_bench.py --requests 200 --concurrency 8 --hedge-delay 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("GROQ_MODEL", "stub")
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+from src.social_media_blog.gateway import GatewayChatModel, build_provider  # noqa: E402
+
+
+def stub_handler(fast_ms: float, slow_ms: float, slow_rate: float, error_rate: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if random.random() < error_rate:
+                body = b'{"error": {"message": "overloaded"}}'
+                self.send_response(503)
+            else:
+                time.sleep((slow_ms if random.random() < slow_rate else fast_ms) / 1000)
+                body = json.dumps({
+                    "id": "stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": "stub",
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "langchain"}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11}
+                }).encode("utf-8")
+                self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # The gateway cancelled this call because a hedged one answered first
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(handler) -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+async def run_batch(model: GatewayChatModel, requests: int, concurrency: int) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await model.ainvoke([HumanMessage(content="Route this: what does Mindtype do?")])
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                failures += 1
+
+    await asyncio.gather(*[one() for _ in range(requests)])
+    return latencies, failures
+
+
+async def main_async(args):
+    primary_url = start_stub_server(stub_handler(args.primary_ms, args.primary_slow_ms, args.primary_slow_rate, args.primary_errors))
+    secondary_url = start_stub_server(stub_handler(args.secondary_ms, args.secondary_ms, 0.0, 0.0))
+
+    scenarios = [
+        ("primary only", lambda: GatewayChatModel(providers=[build_provider(f"groq@{primary_url}")], timeout=args.timeout)),
+        ("fallback", lambda: GatewayChatModel(providers=[build_provider(f"groq@{primary_url}"), build_provider(f"groq@{secondary_url}")], timeout=args.timeout)),
+        ("fallback + hedging", lambda: GatewayChatModel(
+            providers=[build_provider(f"groq@{primary_url}"), build_provider(f"groq@{secondary_url}")],
+            timeout=args.timeout,
+            hedge_delay=args.hedge_delay
+        )),
+    ]
+    print(f"{args.requests} calls, concurrency {args.concurrency}; primary {args.primary_ms:.0f} ms "
+          f"({args.primary_slow_rate:.0%} at {args.primary_slow_ms:.0f} ms, {args.primary_errors:.0%} errors), secondary {args.secondary_ms:.0f} ms")
+    for label, factory in scenarios:
+        model = factory()
+        latencies, failures = await run_batch(model, args.requests, args.concurrency)
+        calls = {provider.name.split(":")[-1]: provider.calls for provider in model.providers}
+        print(f"{label:<20} p50={percentile(latencies, 50):7.0f} ms  p95={percentile(latencies, 95):7.0f} ms  "
+              f"p99={percentile(latencies, 99):7.0f} ms  failures={failures}  provider calls={calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--primary-ms", type=float, default=100)
+    parser.add_argument("--primary-slow-ms", type=float, default=3000)
+    parser.add_argument("--primary-slow-rate", type=float, default=0.1)
+    parser.add_argument("--primary-errors", type=float, default=0.05)
+    parser.add_argument("--secondary-ms", type=float, default=300)
+    parser.add_argument("--hedge-delay", type=float, default=0.4)
+    parser.add_argument("--timeout", type=float, default=10)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
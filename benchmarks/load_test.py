@@ -0,0 +1,472 @@
+"""
+Offline load test of /chat with stubbed LLM, retriever and web providers.
+
+Nothing leaves the machine and no provider quota is spent. The harness starts:
+  - a stub LLM server speaking the OpenAI/Groq chat completions API. The chat
+    gateway reaches it as CHAT_PROVIDERS=groq@<url> and the crew agents as
+    openai/gpt-4o(-mini) models via OPENAI_BASE_URL. It answers the router and the
+    assistant, calls web_search_tool once for agents that have tools, and returns
+    a BlogOutput JSON when a response schema is requested.
+  - a stub web server serving article pages for web_search_tool, whose search
+    step is replaced by one returning links to those pages.
+  - the API itself under uvicorn in a subprocess, with a stub retriever in place
+    of the knowledge base, rate limits lifted and every store in a temp dir.
+Each stub's latency is drawn from a lognormal distribution given as MEDIAN:P99
+in milliseconds.
+
+It then drives /chat with a mix of support questions and blog requests at a
+fixed concurrency. It reports throughput, p50/p95/p99 and errors per route, and
+the server's resident memory. Results are compared with the stored baseline of
+the scenario (benchmarks/baselines/load_test.json), and the run exits non-zero
+when p95 or throughput regress by more than --tolerance or errors increase.
+Baselines are specific to the machine they were recorded on; re-record them
+with --save-baseline.
+
+    python benchmarks/load_test.py --requests 300 --concurrency 16 --blog-ratio 0.1
+    python benchmarks/load_test.py --scenario chat-only --blog-ratio 0 --save-baseline
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINES = Path(__file__).resolve().parent / "baselines" / "load_test.json"
+sys.path.insert(0, str(ROOT))
+
+CHAT_QUESTIONS = [
+    "What does Mindtype do?",
+    "Who founded Mindtype?",
+    "What kind of content do you publish?",
+    "How do I contact support?",
+    "Can I suggest a topic for the blog?",
+    "How often do you post new articles?",
+]
+BLOG_TOPICS = ["remote work", "AI in healthcare", "urban gardening", "quantum computing", "sleep science"]
+BLOG_JSON = {
+    "title": "A stub blog post",
+    "blog_post": "Stub paragraph. " * 200,
+    "meta_description": "A stub meta description.",
+    "blog_preview": "Stub preview.",
+}
+
+
+def latency_sampler(spec: str):
+    """Sampler of seconds from a lognormal distribution with the given MEDIAN:P99 milliseconds"""
+    median, _, p99 = spec.partition(":")
+    median = float(median) / 1000
+    p99 = float(p99 or median * 1000) / 1000
+    sigma = math.log(p99 / median) / 2.326 if p99 > median else 0.0
+    return lambda: random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+
+def message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def stub_reply(body: dict) -> dict:
+    """The assistant message the stub LLM answers a chat completions request with"""
+    messages = body.get("messages", [])
+    prompt = "\n".join(message_text(m) for m in messages)
+    if body.get("response_format"):
+        return {"role": "assistant", "content": json.dumps(BLOG_JSON)}
+    if body.get("tools") and not any(m.get("role") == "tool" for m in messages):
+        tool = body["tools"][0]["function"]["name"]
+        return {"role": "assistant", "content": None, "tool_calls": [{
+            "id": f"call_{random.getrandbits(32):x}",
+            "type": "function",
+            "function": {"name": tool, "arguments": json.dumps({"query": "latest research"})},
+        }]}
+    if "routing expert" in prompt:
+        query = prompt.rsplit("User:", 1)[-1].lower()
+        return {"role": "assistant", "content": "crewai" if "write a blog" in query else "langchain"}
+    if "blog_post" in prompt:
+        text = json.dumps(BLOG_JSON)
+    else:
+        text = "Here is a short, helpful stub answer. " * 8
+    if "Final Answer:" in prompt:
+        text = f"Thought: I now can give a great answer\nFinal Answer: {text}"
+    return {"role": "assistant", "content": text}
+
+
+def llm_handler(sample_latency):
+    class StubLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.endswith("chat/completions"):
+                self.send_error(404)
+                return
+            time.sleep(sample_latency())
+            message = stub_reply(body)
+            common = {"id": "stub", "created": int(time.time()), "model": body.get("model", "stub")}
+            # Rough counts (4 characters a token) so prompt size shows up in the server's token metrics
+            prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+            completion_tokens = len(json.dumps(message)) // 4
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens}
+            try:
+                if body.get("stream"):
+                    self.send_stream(common, message, usage)
+                else:
+                    payload = json.dumps({**common, "object": "chat.completion", "usage": usage, "choices": [
+                        {"index": 0, "message": message, "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}
+                    ]}).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def send_stream(self, common: dict, message: dict, usage: dict):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            text = message.get("content") or ""
+            pieces = [text[i:i + 40] for i in range(0, len(text), 40)] or [""]
+            events = [{**common, "object": "chat.completion.chunk", "choices": [
+                {"index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None}
+            ]} for piece in pieces]
+            events.append({**common, "object": "chat.completion.chunk", "usage": usage, "x_groq": {"usage": usage},
+                           "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            for event in events:
+                self.write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.write_chunk(b"data: [DONE]\n\n")
+            self.write_chunk(b"")
+
+        def write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+        def log_message(self, *args):
+            pass
+
+    return StubLLMHandler
+
+
+def web_handler(sample_latency, paragraphs: int):
+    page = "<html><body><article>" + "".join(
+        f"<p>Paragraph {i} of a stub article with enough words to be kept by the extractor, "
+        f"covering findings, methods and context for the research agent.</p>" for i in range(paragraphs)
+    ) + "</article></body></html>"
+    body = page.encode("utf-8")
+
+    class StubWebHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(sample_latency())
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    return StubWebHandler
+
+
+def start_server(handler) -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def serve(args):
+    """Run the API with the stub retriever and search patched in (the --serve subprocess)"""
+    import uvicorn
+    from langchain_core.documents import Document
+    from langchain_core.retrievers import BaseRetriever
+
+    from src.social_media_blog import app as app_module, crew, db_handler
+
+    retriever_latency = latency_sampler(args.retriever_latency)
+    search_latency = latency_sampler(args.search_latency)
+
+    class StubRetriever(BaseRetriever):
+        def _get_relevant_documents(self, query, *, run_manager=None):
+            time.sleep(retriever_latency())
+            return [Document(page_content=f"Stub knowledge base passage {i} about Mindtype.") for i in range(4)]
+
+        async def _aget_relevant_documents(self, query, *, run_manager=None):
+            await asyncio.sleep(retriever_latency())
+            return [Document(page_content=f"Stub knowledge base passage {i} about Mindtype.") for i in range(4)]
+
+    def stub_search(query: str, max_results: int) -> list:
+        time.sleep(search_latency())
+        return [{"title": f"Stub result {i}", "href": f"{args.web_url}/article/{i}?q={abs(hash(query))}"}
+                for i in range(max_results)]
+
+    db_handler._knowledge_base = StubRetriever()
+    crew.search_web = stub_search
+    app_module.limiter.enabled = False
+    uvicorn.run(app_module.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def server_env(args, llm_url: str, crew_llm_url: str, workdir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": str(ROOT) + os.pathsep + env.get("PYTHONPATH", ""),
+        "CHAT_PROVIDERS": f"groq@{llm_url}",
+        "GROQ_API_KEY": "stub",
+        "GROQ_MODEL": "stub-chat",
+        "GOOGLE_API_KEY": "stub",
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"{crew_llm_url}/v1",
+        "STRONG_LLM_MODEL": "openai/gpt-4o",
+        "FAST_LLM_MODEL": "openai/gpt-4o-mini",
+        "CREWAI_DISABLE_TELEMETRY": "true",
+        "OTEL_SDK_DISABLED": "true",
+        "RETRIEVER_BACKEND": "local",
+        "EMBEDDINGS_BACKEND": "hashing",
+        # The stub retriever stands in for the knowledge base, so there is no chunk file for BM25
+        "HYBRID_RETRIEVAL": "false",
+        "LOCAL_INDEX_DIR": os.path.join(workdir, "local_index"),
+        "EMBEDDING_CACHE_DIR": "",
+        "PAGE_CACHE_DIR": "",
+        "JOB_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "BLOG_CACHE_DB_PATH": os.path.join(workdir, "blogs.sqlite3"),
+        "CHECKPOINT_DB_PATH": os.path.join(workdir, "checkpoints.sqlite3"),
+        "ROUTER_LOG_PATH": os.path.join(workdir, "router_decisions.jsonl"),
+        "CREW_MAX_WORKERS": str(args.crew_workers),
+        # Every client may be waiting on a crew at once; the benchmark measures queueing, not rejections
+        "CREW_MAX_WAITING": str(args.concurrency),
+        "CHAT_RATE_PER_MINUTE": "1000000",
+        "CHAT_BURST": "1000000",
+        "BLOG_RATE_PER_MINUTE": "1000000",
+        "BLOG_BURST": "1000000",
+    })
+    return env
+
+
+def rss_mb(pid: int) -> dict:
+    """Current and peak resident memory of a process (Linux /proc); empty elsewhere"""
+    try:
+        fields = dict(line.split(":", 1) for line in Path(f"/proc/{pid}/status").read_text().splitlines() if ":" in line)
+    except OSError:
+        return {}
+    return {key: int(fields[key].split()[0]) / 1024 for key in ("VmRSS", "VmHWM") if key in fields}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+async def drive(url: str, args, pid: int) -> dict:
+    import httpx
+
+    rng = random.Random(args.seed)
+    plan = ["blog" if rng.random() < args.blog_ratio else "chat" for _ in range(args.requests)]
+    queue: asyncio.Queue = asyncio.Queue()
+    for index, kind in enumerate(plan):
+        queue.put_nowait((index, kind))
+    samples = {"chat": [], "blog": []}
+    errors = {"chat": {}, "blog": {}}
+    memory = []
+
+    async def worker(client):
+        while not queue.empty():
+            index, kind = queue.get_nowait()
+            if kind == "blog":
+                # Distinct topics so blogs are generated rather than served from the blog cache
+                topic = f"Write a blog post about {BLOG_TOPICS[index % len(BLOG_TOPICS)]} {index}"
+            else:
+                topic = CHAT_QUESTIONS[index % len(CHAT_QUESTIONS)] + ("" if args.repeat_questions else f" ({index})")
+            started = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/chat", json={"topic": topic, "tone": "informative"})
+                ok = response.status_code == 200 and response.json().get("status", "success") == "success"
+                outcome = "ok" if ok else str(response.status_code if response.status_code != 200 else "error_body")
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            if outcome == "ok":
+                samples[kind].append((time.perf_counter() - started) * 1000)
+            else:
+                errors[kind][outcome] = errors[kind].get(outcome, 0) + 1
+
+    async def sample_memory(stop: asyncio.Event):
+        while not stop.is_set():
+            memory.append(rss_mb(pid).get("VmRSS", 0.0))
+            try:
+                await asyncio.wait_for(stop.wait(), 0.5)
+            except asyncio.TimeoutError:
+                pass
+
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_memory(stop))
+    started = time.perf_counter()
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        await asyncio.gather(*[worker(client) for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+    final_memory = rss_mb(pid)
+
+    routes = {}
+    for kind in ("chat", "blog"):
+        values = samples[kind]
+        if not values and not errors[kind]:
+            continue
+        routes[kind] = {
+            "requests": len(values) + sum(errors[kind].values()),
+            "errors": errors[kind],
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+            "p99_ms": round(percentile(values, 99), 1),
+            "mean_ms": round(statistics.mean(values), 1) if values else 0.0,
+        }
+    completed = sum(len(values) for values in samples.values())
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "blog_ratio": args.blog_ratio,
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+        "routes": routes,
+        "rss_mb_peak_sampled": round(max(memory, default=0.0), 1),
+        "rss_mb_end": round(final_memory.get("VmRSS", 0.0), 1),
+        "rss_mb_high_water": round(final_memory.get("VmHWM", 0.0), 1),
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions of result against baseline: throughput drops, p95 increases beyond tolerance and new errors"""
+    regressions = []
+    if result["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(f"throughput {result['throughput_rps']} rps vs baseline {baseline['throughput_rps']} rps")
+    for kind, route in result["routes"].items():
+        reference = baseline["routes"].get(kind)
+        if reference and route["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{kind} p95 {route['p95_ms']} ms vs baseline {reference['p95_ms']} ms")
+        failed = sum((route["errors"] or {}).values())
+        if reference and failed > sum((reference["errors"] or {}).values()):
+            regressions.append(f"{kind} errors {route['errors']} vs baseline {reference['errors']}")
+    return regressions
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/readyz", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"API server not ready after {timeout:.0f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default="mixed", help="baseline name for this configuration")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--blog-ratio", type=float, default=0.1, help="fraction of requests asking for a blog")
+    parser.add_argument("--repeat-questions", action="store_true",
+                        help="reuse the same few support questions, so response caches are exercised")
+    parser.add_argument("--chat-llm-latency", default="300:1500", help="router/assistant LLM MEDIAN:P99 ms")
+    parser.add_argument("--crew-llm-latency", default="800:4000", help="crew agent LLM MEDIAN:P99 ms")
+    parser.add_argument("--retriever-latency", default="40:200", help="knowledge base MEDIAN:P99 ms")
+    parser.add_argument("--search-latency", default="300:1200", help="web search MEDIAN:P99 ms")
+    parser.add_argument("--fetch-latency", default="150:900", help="article page MEDIAN:P99 ms")
+    parser.add_argument("--article-paragraphs", type=int, default=40)
+    parser.add_argument("--crew-workers", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=600, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression against the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the scenario's baseline")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--web-url", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    random.seed(args.seed)
+    llm_url = start_server(llm_handler(latency_sampler(args.chat_llm_latency)))
+    crew_llm_url = start_server(llm_handler(latency_sampler(args.crew_llm_latency)))
+    web_url = start_server(web_handler(latency_sampler(args.fetch_latency), args.article_paragraphs))
+
+    with tempfile.TemporaryDirectory(prefix="load_test_") as workdir:
+        env = server_env(args, llm_url, crew_llm_url, workdir)
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        command = [sys.executable, __file__, "--serve", "--port", str(port), "--web-url", web_url,
+                   "--retriever-latency", args.retriever_latency, "--search-latency", args.search_latency]
+        log = open(os.path.join(workdir, "server.log"), "w")
+        process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        url = f"http://127.0.0.1:{port}"
+        try:
+            wait_ready(url, process, timeout=180)
+            result = asyncio.run(drive(url, args, process.pid))
+        except Exception:
+            log.flush()
+            print(Path(workdir, "server.log").read_text()[-3000:], file=sys.stderr)
+            raise
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+            log.close()
+
+    result["stubs"] = {key: getattr(args, key) for key in
+                       ("chat_llm_latency", "crew_llm_latency", "retriever_latency", "search_latency", "fetch_latency")}
+    print(f"{args.scenario}: {args.requests} requests at concurrency {args.concurrency} in {result['seconds']} s, "
+          f"{result['throughput_rps']} req/s")
+    for kind, route in result["routes"].items():
+        print(f"  {kind:<5} n={route['requests']:<5} p50={route['p50_ms']:9.1f} ms  p95={route['p95_ms']:9.1f} ms  "
+              f"p99={route['p99_ms']:9.1f} ms  errors={route['errors'] or 0}")
+    print(f"  server RSS peak {result['rss_mb_peak_sampled']} MB, end {result['rss_mb_end']} MB, "
+          f"high water {result['rss_mb_high_water']} MB")
+
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    if args.save_baseline:
+        baselines[args.scenario] = result
+        BASELINES.parent.mkdir(parents=True, exist_ok=True)
+        BASELINES.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"Saved as the '{args.scenario}' baseline in {BASELINES}")
+        return
+    if args.scenario not in baselines:
+        print(f"No '{args.scenario}' baseline yet; record one with --save-baseline")
+        return
+    regressions = compare(result, baselines[args.scenario], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if regressions:
+        sys.exit(1)
+    print(f"Within {args.tolerance:.0%} of the '{args.scenario}' baseline")
+
+
+if __name__ == "__main__":
+    main()
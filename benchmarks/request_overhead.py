@@ -0,0 +1,106 @@
+"""
+Per-request setup overhead of chains and crews, before any LLM time.
+
+Compares building the router/assistant chain on every call (prompt parsing
+plus runnable composition) against fetching it from the ChainRegistry, both
+invoking a fake chat model so only the framework overhead is measured. For
+crews it compares building SocialMediaBlog().crew() per request against
+leasing one from a CrewPool and handing it back after a no-op run.
+
+No API calls are made; dummy keys are set so the crew module imports.
+
+    python benchmarks/request_overhead.py --iterations 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("RETRIEVER_BACKEND", "local")
+
+from langchain_core.language_models import FakeListChatModel  # noqa: E402
+from langchain_core.output_parsers import StrOutputParser  # noqa: E402
+from langchain_core.prompts import ChatPromptTemplate  # noqa: E402
+
+from src.social_media_blog.prompts import ROUTER_MESSAGES, ASSISTANT_MESSAGES  # noqa: E402
+from src.social_media_blog.registry import ChainRegistry, CrewPool  # noqa: E402
+
+
+def report(label: str, samples: list):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    print(f"{label:<36} mean={statistics.mean(samples):9.3f} ms  p95={p95:9.3f} ms")
+
+
+def bench_chains(iterations: int):
+    llm = FakeListChatModel(responses=["langchain"])
+    inputs = {"query": "What does Mindtype do?", "user_query": "What does Mindtype do?", "context": "Mindtype writes blogs.",
+              "history": "(new conversation)"}
+    registry = ChainRegistry()
+    for name, messages in (("router", ROUTER_MESSAGES), ("assistant", ASSISTANT_MESSAGES)):
+        registry.register(name, lambda messages=messages: ChatPromptTemplate.from_messages(messages) | llm | StrOutputParser())
+    registry.compile_all()
+
+    for name, messages in (("router", ROUTER_MESSAGES), ("assistant", ASSISTANT_MESSAGES)):
+        per_call, cached = [], []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            (ChatPromptTemplate.from_messages(messages) | llm | StrOutputParser()).invoke(inputs)
+            per_call.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            registry.get(name).invoke(inputs)
+            cached.append((time.perf_counter() - start) * 1000)
+        report(f"{name} chain built per call", per_call)
+        report(f"{name} chain from registry", cached)
+
+
+class NoopCrew:
+    task_callback = None
+    tasks = ()
+
+    def kickoff(self, inputs):
+        return inputs
+
+
+async def bench_pool(iterations: int):
+    executor = ThreadPoolExecutor(max_workers=2)
+    pool = CrewPool(NoopCrew, 2)
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await pool.kickoff(executor, inputs={"topic": "x", "tone": "y"})
+        samples.append((time.perf_counter() - start) * 1000)
+    executor.shutdown()
+    report("crew lease + no-op run + release", samples)
+
+
+def bench_crew_build(iterations: int):
+    from src.social_media_blog.crew import SocialMediaBlog
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        SocialMediaBlog().crew()
+        samples.append((time.perf_counter() - start) * 1000)
+    report("SocialMediaBlog().crew() per request", samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--crew-iterations", type=int, default=20, help="crew builds are slow; measure fewer")
+    args = parser.parse_args()
+
+    bench_chains(args.iterations)
+    asyncio.run(bench_pool(args.iterations))
+    bench_crew_build(args.crew_iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Query latency and recall of the local index against the remote Pinecone index.
+
+Times each query on the local backend (split into embedding and vector search)
+and, when PINECONE_API_KEY/PINECONE_INDEX are set, on the Pinecone retriever.
+Recall@k is the share of Pinecone's top-k chunks that the local index also
+returns, so both indexes should be built from the same content/ with the same
+embedding model for the number to mean anything.
+
+    python -m src.social_media_blog.ingest --target local   # build db/local_index
+    python benchmarks/retrieval_bench.py --queries queries.txt
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.social_media_blog import db_handler  # noqa: E402
+from src.social_media_blog.local_index import LocalVectorIndex  # noqa: E402
+
+DEFAULT_QUERIES = [
+    "What does Mindtype write about?",
+    "latest music releases",
+    "box office results for new movies",
+    "stock market and personal finance tips",
+    "election news and politics",
+    "how should documents be formatted",
+    "entertainment industry trends",
+    "knowledge base guidelines",
+]
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def summary(label: str, values: list):
+    if values:
+        print(f"{label:<24} p50={statistics.median(values):8.2f} ms  max={max(values):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", help="file with one query per line")
+    parser.add_argument("--k", type=int, default=db_handler.RETRIEVER_K)
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        queries = [line.strip() for line in open(args.queries, encoding="utf-8") if line.strip()]
+
+    embeddings = db_handler.get_embeddings()
+    index = LocalVectorIndex(db_handler.LOCAL_INDEX_DIR)
+
+    remote = None
+    if os.getenv("PINECONE_API_KEY") and db_handler.index_name:
+        from langchain_pinecone import PineconeVectorStore
+        remote = PineconeVectorStore.from_existing_index(index_name=db_handler.index_name, embedding=embeddings)
+
+    embed_ms, search_ms, local_ms, remote_ms, recalls = [], [], [], [], []
+    for query in queries:
+        vector, embed_time = timed(embeddings.embed_query, query)
+        local_results, search_time = timed(index.search, vector, args.k)
+        embed_ms.append(embed_time)
+        search_ms.append(search_time)
+        local_ms.append(embed_time + search_time)
+
+        if remote is not None:
+            remote_docs, remote_time = timed(remote.similarity_search, query, args.k)
+            remote_ms.append(remote_time)
+            expected = {normalize(doc.page_content) for doc in remote_docs}
+            found = {normalize(chunk["text"]) for chunk, _ in local_results}
+            if expected:
+                recalls.append(len(expected & found) / len(expected))
+
+    print(f"{len(queries)} queries, k={args.k}, {len(index.chunks)} local chunks")
+    summary("local embed", embed_ms)
+    summary("local vector search", search_ms)
+    summary("local total", local_ms)
+    if remote is not None:
+        summary("pinecone total", remote_ms)
+        print(f"recall@{args.k} vs pinecone: {statistics.mean(recalls):.2f}" if recalls else "no pinecone results")
+    else:
+        print("PINECONE_API_KEY/PINECONE_INDEX not set; skipped the remote comparison")
+
+
+if __name__ == "__main__":
+    main()
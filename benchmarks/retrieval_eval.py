@@ -0,0 +1,76 @@
+"""
+Offline retrieval eval: vector-only top-k against the hybrid (BM25 + vector) stage.
+
+Each line of the eval set names a query and the content/ PDFs that answer it.
+For both retrievers the script reports recall@k (share of queries whose
+expected source appears in the returned chunks), the number of chunks and the
+prompt tokens the joined context would add, and retrieval latency.
+
+Runs without network access against a local index built with the hashing
+embeddings; with COHERE_API_KEY set and the default embeddings it measures
+the production setup instead.
+
+    EMBEDDINGS_BACKEND=hashing python -m src.social_media_blog.ingest --target local
+    EMBEDDINGS_BACKEND=hashing python benchmarks/retrieval_eval.py
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("RETRIEVER_BACKEND", "local")
+
+from src.social_media_blog import db_handler  # noqa: E402
+from src.social_media_blog.tokens import count_tokens  # noqa: E402
+
+DEFAULT_EVAL_SET = Path(__file__).resolve().parent / "retrieval_eval.jsonl"
+
+
+def evaluate(label: str, retriever, cases: list):
+    hits, chunks, tokens, latencies = [], [], [], []
+    for case in cases:
+        start = time.perf_counter()
+        docs = retriever.invoke(case["query"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        sources = {doc.metadata.get("source") for doc in docs}
+        hits.append(bool(sources & set(case["sources"])))
+        chunks.append(len(docs))
+        tokens.append(count_tokens("\n".join(doc.page_content for doc in docs)))
+    print(
+        f"{label:<8} recall@k={sum(hits) / len(hits):.2f}  chunks={statistics.mean(chunks):.1f}  "
+        f"prompt tokens p50={statistics.median(tokens):.0f} max={max(tokens)}  "
+        f"latency p50={statistics.median(latencies):.2f} ms"
+    )
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--eval-set", default=str(DEFAULT_EVAL_SET))
+    parser.add_argument("--k", type=int, default=db_handler.RETRIEVER_K)
+    parser.add_argument("--verbose", action="store_true", help="list the queries each retriever misses")
+    args = parser.parse_args()
+
+    cases = [json.loads(line) for line in open(args.eval_set, encoding="utf-8") if line.strip()]
+    embeddings = db_handler.get_embeddings()
+    vector = db_handler.get_vector_knowledge_base(embeddings, args.k)
+    if vector is None:
+        sys.exit("No retriever available; build the local index first (see the usage above)")
+    hybrid = db_handler.get_hybrid_knowledge_base(db_handler.get_vector_knowledge_base(embeddings, db_handler.HYBRID_CANDIDATES))
+    hybrid.max_docs = args.k
+
+    print(f"{len(cases)} queries, k={args.k}, hybrid candidates={db_handler.HYBRID_CANDIDATES}, token budget={db_handler.CONTEXT_TOKEN_BUDGET}")
+    for label, retriever in (("vector", vector), ("hybrid", hybrid)):
+        hits = evaluate(label, retriever, cases)
+        if args.verbose:
+            for case, hit in zip(cases, hits):
+                if not hit:
+                    print(f"  missed: {case['query']}")
+
+
+if __name__ == "__main__":
+    main()
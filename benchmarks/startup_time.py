@@ -0,0 +1,119 @@
+"""
+Import and startup time of the API.
+
+Imports src.social_media_blog.app in fresh interpreters under `python -X importtime`
+and reports the median import time and the modules that cost the most. Then
+starts the app (lifespan included) in a fresh interpreter and reports how long
+until /healthz answers and until /readyz reports ready.
+
+The environment is passed through, so the retriever and LLM settings in use are
+the ones measured; dummy API keys are filled in when unset (nothing here calls a
+provider). RETRIEVER_BACKEND=local with EMBEDDINGS_BACKEND=hashing keeps the
+knowledge base load off the network.
+
+    python benchmarks/startup_time.py --runs 5 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MODULE = "src.social_media_blog.app"
+
+STARTUP_SCRIPT = f"""
+import json, sys, time
+started = time.perf_counter()
+from fastapi.testclient import TestClient
+import {MODULE} as m
+imported = time.perf_counter()
+with TestClient(m.app) as client:
+    client.get("/healthz").raise_for_status()
+    live = time.perf_counter()
+    deadline = live + float(sys.argv[1])
+    while client.get("/readyz").status_code != 200 and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    ready = client.get("/readyz")
+    ready_at = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - started,
+    "live_s": live - started,
+    "ready_s": ready_at - started if ready.status_code == 200 else None,
+    "readyz": ready.json(),
+}}))
+"""
+
+
+def child_env() -> dict:
+    env = dict(os.environ)
+    for key in ("GOOGLE_API_KEY", "GROQ_API_KEY", "COHERE_API_KEY"):
+        env.setdefault(key, "benchmark")
+    env.setdefault("GROQ_MODEL", "stub")
+    env["PYTHONPATH"] = str(ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def import_profile() -> tuple:
+    """(total seconds, {module: cumulative seconds}) of one import under -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+                            cwd=ROOT, env=child_env(), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        cumulative[name.strip()] = int(cumulative_us) / 1e6
+    return cumulative[MODULE], cumulative
+
+
+def startup(timeout: float) -> dict:
+    result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, str(timeout)],
+                            cwd=ROOT, env=child_env(), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="heaviest modules to list")
+    parser.add_argument("--ready-timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    totals, profiles = [], []
+    for _ in range(args.runs):
+        total, cumulative = import_profile()
+        totals.append(total)
+        profiles.append(cumulative)
+    print(f"import {MODULE}: median {statistics.median(totals):.2f} s over {args.runs} runs "
+          f"(min {min(totals):.2f}, max {max(totals):.2f})")
+    heaviest = sorted(profiles[-1].items(), key=lambda item: -item[1])
+    # Skip the app module itself and report third-party packages and our own modules by top-level name
+    listed = 0
+    seen = set()
+    for name, seconds in heaviest:
+        top = name if name.startswith("src.") else name.split(".")[0]
+        if name == MODULE or top in seen or name != top:
+            continue
+        seen.add(top)
+        print(f"  {seconds:6.2f} s  {name}")
+        listed += 1
+        if listed == args.top:
+            break
+
+    runs = [startup(args.ready_timeout) for _ in range(args.runs)]
+    for key in ("import_s", "live_s", "ready_s"):
+        values = [run[key] for run in runs if run[key] is not None]
+        summary = f"median {statistics.median(values):.2f} s" if values else "never"
+        print(f"{key:<9} {summary}")
+    print(f"last /readyz: {runs[-1]['readyz']}")
+
+
+if __name__ == "__main__":
+    main()
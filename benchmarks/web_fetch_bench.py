@@ -0,0 +1,89 @@
+"""
+Sequential vs concurrent article fetching against a local stub server.
+
+The stub serves /delay/<ms> pages that sleep before answering, so the run
+shows fetch wall-time going from the sum of the delays (the old loop in
+web_search_tool) to roughly the slowest one (web_fetch.fetch_articles).
+
+    python benchmarks/web_fetch_bench.py --delays 400,800,1200,1600,2000
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Measure the network path, not the page cache
+os.environ.setdefault("PAGE_CACHE_DIR", "")
+
+from src.social_media_blog.extract import extract_text  # noqa: E402
+from src.social_media_blog.web_fetch import fetch_articles  # noqa: E402
+
+PAGE = "<html><body>" + "".join(f"<p>Paragraph {i} of the stub article.</p>" for i in range(50)) + "</body></html>"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        try:
+            delay_ms = int(self.path.rsplit("/", 1)[-1])
+        except ValueError:
+            delay_ms = 0
+        time.sleep(delay_ms / 1000)
+        body = PAGE.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def sequential(urls):
+    articles = {}
+    for url in urls:
+        response = requests.get(url, timeout=8)
+        articles[url] = extract_text(response.text)
+    return articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delays", default="400,800,1200,1600,2000", help="comma separated per-page delays in ms")
+    parser.add_argument("--hosts", type=int, default=5, help="spread pages over this many stub servers (hosts)")
+    args = parser.parse_args()
+
+    servers = [start_stub_server() for _ in range(args.hosts)]
+    delays = [int(d) for d in args.delays.split(",")]
+    # Each stub server listens on its own port, so it counts as a separate host for the per-host limit
+    urls = [f"http://127.0.0.1:{servers[i % args.hosts].server_address[1]}/delay/{d}" for i, d in enumerate(delays)]
+
+    start = time.perf_counter()
+    sequential_result = sequential(urls)
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    concurrent_result = fetch_articles(urls)
+    concurrent_time = time.perf_counter() - start
+
+    print(f"pages: {len(urls)}  sum of delays: {sum(delays) / 1000:.2f}s  slowest: {max(delays) / 1000:.2f}s")
+    print(f"sequential: {sequential_time:.2f}s ({len(sequential_result)} pages)")
+    print(f"concurrent: {concurrent_time:.2f}s ({len(concurrent_result)} pages)")
+    for server in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
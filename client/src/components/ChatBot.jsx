@@ -15,6 +15,8 @@ const Chatbot = () => {
   ])
   const [inputMessage, setInputMessage] = useState("")
   const [isTyping, setIsTyping] = useState(false)
+  // Conversation id issued by the server on the first reply, sent back so follow-ups keep their context
+  const sessionId = useRef(null)
   const messagesEndRef = useRef(null)
 
   useEffect(() => {
@@ -41,7 +43,7 @@ const Chatbot = () => {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ topic: inputMessage }),
+        body: JSON.stringify({ topic: inputMessage, session_id: sessionId.current }),
       })
 
       if (!response.ok) {
@@ -49,6 +51,7 @@ const Chatbot = () => {
       }
 
       const data = await response.json()
+      sessionId.current = data.session_id || sessionId.current
       const botResponseText = data.response || data.content || "An error occurred generating the blog post. Please try again."
 
       const botMessage = {
@@ -9,6 +9,7 @@ const generateBtn = document.getElementById("generateBtn")
 
 // State
 let isLoading = false
+let sessionId = null
 
 // Initialize
 function init() {
@@ -180,7 +181,8 @@ async function sendToAPI(text, endpoint = "chat") {
         "Content-Type": "application/json",
       },
       body: JSON.stringify({ topic: text,
-        tone:"informative" }
+        tone:"informative",
+        session_id: sessionId }
       ),
     })
 
@@ -190,6 +192,8 @@ async function sendToAPI(text, endpoint = "chat") {
 
     const data = await response.json()
     removeLoadingIndicator()
+    // The server issues the conversation id; sending it back keeps the follow-ups in context
+    sessionId = data.session_id || sessionId
 
     // Check if structured response
     if (data.title || data.content) {
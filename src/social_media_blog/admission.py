@@ -0,0 +1,273 @@
+from typing import Dict, Optional
+from contextlib import asynccontextmanager
+from .db_handler import logger
+from .telemetry import ADMISSION_REJECTIONS
+import asyncio
+import math
+import os
+import threading
+import time
+import uuid
+
+# memory keeps the limits per worker process; redis shares them across workers and replicas
+ADMISSION_BACKEND = os.getenv("ADMISSION_BACKEND", "memory")
+# Chat replies are cheap, blog generations run a crew for minutes, so they draw from separate buckets
+CHAT_RATE_PER_MINUTE = float(os.getenv("CHAT_RATE_PER_MINUTE", "20"))
+CHAT_BURST = float(os.getenv("CHAT_BURST", "10"))
+BLOG_RATE_PER_MINUTE = float(os.getenv("BLOG_RATE_PER_MINUTE", "0.5"))
+BLOG_BURST = float(os.getenv("BLOG_BURST", "3"))
+# Batches are charged per item to their own bucket, big enough for an editorial calendar at a time
+BATCH_RATE_PER_MINUTE = float(os.getenv("BATCH_RATE_PER_MINUTE", "1"))
+BATCH_BURST = float(os.getenv("BATCH_BURST", "100"))
+# Crew runs allowed at once across all workers sharing the backend, and how many may wait for a slot
+CREW_MAX_CONCURRENT = int(os.getenv("CREW_MAX_CONCURRENT", os.getenv("CREW_MAX_WORKERS", "2")))
+CREW_MAX_WAITING = int(os.getenv("CREW_MAX_WAITING", "4"))
+# Longest a request waits for a crew slot before it is turned away
+CREW_MAX_WAIT = float(os.getenv("CREW_MAX_WAIT", "300"))
+# Starting estimate of a crew run, refined from observed runs; drives Retry-After
+CREW_EXPECTED_SECONDS = float(os.getenv("CREW_EXPECTED_SECONDS", "120"))
+# A slot not released within this time (its worker died) is given back
+CREW_LEASE_TTL = float(os.getenv("CREW_LEASE_TTL", "1800"))
+POLL_INTERVAL = 0.25
+# Waiters refresh their place on every poll; one that stops polling drops out after this long
+WAITER_TTL = 10.0
+RUN_ALPHA = 0.2
+MAX_MEMORY_BUCKETS = 10000
+# Buckets untouched for this long have refilled and are dropped when the in-process table grows too big
+IDLE_BUCKET_SECONDS = 3600
+
+
+class AdmissionRejected(Exception):
+    """A request over its rate limit, or a crew run that found the wait queue full"""
+
+    def __init__(self, limit: str, retry_after: float):
+        self.limit = limit
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"Too many requests ({limit}), retry after {self.retry_after}s")
+
+
+def reject(limit: str, retry_after: float) -> AdmissionRejected:
+    ADMISSION_REJECTIONS.labels(limit=limit).inc()
+    logger.warning(f"Rejecting request: {limit} limit reached, retry after {retry_after:.0f}s")
+    return AdmissionRejected(limit, retry_after)
+
+
+class MemoryStore:
+    """Token buckets and slot leases in this process"""
+
+    def __init__(self):
+        self._buckets: Dict[str, tuple] = {}
+        self._leases: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: float, cost: float) -> float:
+        """Take cost tokens from the bucket; 0 if they were available, otherwise seconds until they will be"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > MAX_MEMORY_BUCKETS:
+                self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < IDLE_BUCKET_SECONDS}
+        return wait
+
+    def _live(self, key: str, now: float) -> Dict[str, float]:
+        leases = self._leases.setdefault(key, {})
+        for token in [token for token, expires_at in leases.items() if expires_at <= now]:
+            del leases[token]
+        return leases
+
+    async def lease(self, key: str, token: str, limit: int, ttl: float) -> bool:
+        """Add a lease for token if fewer than limit are live"""
+        now = time.monotonic()
+        with self._lock:
+            leases = self._live(key, now)
+            if len(leases) >= limit:
+                return False
+            leases[token] = now + ttl
+            return True
+
+    async def refresh(self, key: str, token: str, ttl: float) -> int:
+        """Add or renew token's lease without a limit; returns the number of live leases"""
+        now = time.monotonic()
+        with self._lock:
+            leases = self._live(key, now)
+            leases[token] = now + ttl
+            return len(leases)
+
+    async def drop(self, key: str, token: str):
+        with self._lock:
+            self._leases.get(key, {}).pop(token, None)
+
+    async def count(self, key: str) -> int:
+        with self._lock:
+            return len(self._live(key, time.monotonic()))
+
+
+TAKE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - updated) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+# Leases are sorted-set members scored by their expiry time, so dead ones are trimmed on every call
+LEASE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local limit = tonumber(ARGV[2])
+if limit >= 0 and redis.call('ZCARD', KEYS[1]) >= limit then
+    return -1
+end
+if ARGV[1] ~= '' then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[1])
+end
+return redis.call('ZCARD', KEYS[1])
+"""
+
+
+class RedisStore:
+    """Token buckets and slot leases in Redis, shared by every worker using the same REDIS_URL"""
+
+    def __init__(self, url: str, prefix: str = "mindtype:admission:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._take = self.client.register_script(TAKE_SCRIPT)
+        self._lease = self.client.register_script(LEASE_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: float, cost: float) -> float:
+        return float(await self._take(keys=[self.prefix + "bucket:" + key], args=[rate, burst, cost]))
+
+    async def lease(self, key: str, token: str, limit: int, ttl: float) -> bool:
+        return await self._lease(keys=[self.prefix + key], args=[token, limit, ttl]) >= 0
+
+    async def refresh(self, key: str, token: str, ttl: float) -> int:
+        return await self._lease(keys=[self.prefix + key], args=[token, -1, ttl])
+
+    async def drop(self, key: str, token: str):
+        await self.client.zrem(self.prefix + key, token)
+
+    async def count(self, key: str) -> int:
+        return await self._lease(keys=[self.prefix + key], args=["", -1, 0])
+
+
+def build_store():
+    """Pick the admission store from ADMISSION_BACKEND (memory or redis)"""
+    if ADMISSION_BACKEND == "redis":
+        return RedisStore(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return MemoryStore()
+
+
+class TokenBucket:
+    """Per-client token bucket refilled at rate_per_minute up to burst"""
+
+    def __init__(self, store, name: str, rate_per_minute: float, burst: float):
+        self.store = store
+        self.name = name
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+
+    async def take(self, client: str, cost: float = 1.0):
+        """Charge the client's bucket or raise AdmissionRejected with the time until it can be charged"""
+        try:
+            wait = await self.store.take(f"{self.name}:{client}", self.rate, self.burst, cost)
+        except Exception as e:
+            # A rate limiter outage should not take the API down with it
+            logger.warning(f"{self.name} rate limit check failed, allowing the request: {e}")
+            return
+        if wait > 0:
+            raise reject(self.name, wait)
+
+
+class CrewAdmission:
+    """Global cap on concurrent crew runs with a bounded wait queue.
+
+    A run holds a slot for its whole duration. When all slots are taken, up to
+    max_waiting requests poll for one, roughly first come first served; beyond
+    that, or after max_wait seconds, the request is rejected with a retry-after
+    estimated from the queue depth and the moving average of crew run time.
+    Slots and waiters are leases that expire, so a crashed worker's are given back.
+    """
+
+    def __init__(self, store, max_concurrent: int = CREW_MAX_CONCURRENT, max_waiting: int = CREW_MAX_WAITING,
+                 max_wait: float = CREW_MAX_WAIT, expected_seconds: float = CREW_EXPECTED_SECONDS, name: str = "crew"):
+        self.store = store
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.run_seconds = expected_seconds
+        self.slots_key = f"{name}:slots"
+        self.waiting_key = f"{name}:waiting"
+
+    def retry_after(self, ahead: int) -> float:
+        """Time until a request behind `ahead` waiters gets a slot, with slots freeing one run at a time"""
+        return (ahead // self.max_concurrent + 1) * self.run_seconds
+
+    async def _acquire(self, token: str, bounded: bool):
+        if not await self.store.count(self.waiting_key) and \
+                await self.store.lease(self.slots_key, token, self.max_concurrent, CREW_LEASE_TTL):
+            return
+        deadline = time.monotonic() + self.max_wait
+        try:
+            waiting = await self.store.refresh(self.waiting_key, token, WAITER_TTL)
+            if bounded and waiting > self.max_waiting:
+                raise reject("crew_queue", self.retry_after(waiting - 1))
+            logger.info(f"All {self.max_concurrent} crew slots are busy, waiting behind {waiting - 1} other runs")
+            while not await self.store.lease(self.slots_key, token, self.max_concurrent, CREW_LEASE_TTL):
+                if bounded and time.monotonic() >= deadline:
+                    raise reject("crew_queue", self.retry_after(waiting - 1))
+                await asyncio.sleep(POLL_INTERVAL)
+                waiting = await self.store.refresh(self.waiting_key, token, WAITER_TTL)
+        finally:
+            await self.store.drop(self.waiting_key, token)
+
+    @asynccontextmanager
+    async def slot(self, bounded: bool = True):
+        """Hold a crew slot for the duration of the block; unbounded callers (queued jobs) wait as long as it takes"""
+        token: Optional[str] = uuid.uuid4().hex
+        try:
+            await self._acquire(token, bounded)
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.warning(f"Crew admission failed, running without a slot: {e}")
+            token = None
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.run_seconds = RUN_ALPHA * (time.monotonic() - started) + (1 - RUN_ALPHA) * self.run_seconds
+            if token is not None:
+                try:
+                    await self.store.drop(self.slots_key, token)
+                except Exception as e:
+                    logger.warning(f"Failed to release crew slot {token}: {e}")
+
+    async def snapshot(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_waiting": self.max_waiting,
+            "active": await self.store.count(self.slots_key),
+            "waiting": await self.store.count(self.waiting_key),
+            "expected_run_seconds": round(self.run_seconds, 1),
+        }
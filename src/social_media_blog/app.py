@@ -1,5 +1,6 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from .chat_models import *
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -7,32 +8,171 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from contextlib import asynccontextmanager
-from langchain.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from .db_handler import logger
-from typing import Union
-from .crew import SocialMediaBlog,llm, knowledge_base
+from .jobs import JobStore, JobQueue
+from .router import FastRouter, parse_route
+from .cache import ResponseCache, build_backend
+from .blog_cache import BlogCache, SingleFlight, blog_key
+from .db_handler import get_embeddings, get_shared_knowledge_base, knowledge_base_status, bm25_corpus_status, CONTEXT_TOKEN_BUDGET
+from .hybrid import pack_context
+from .embedding_cache import LazyEmbeddings, store_stats
+from .prompts import ROUTER_MESSAGES, ASSISTANT_MESSAGES, SUMMARY_TEMPLATE
+from .registry import ChainRegistry, CrewPool
+from .json_repair import parse_blog_output
+from .checkpoints import CheckpointStore
+from .sessions import SessionStore
+from .admission import (
+    AdmissionRejected, CrewAdmission, TokenBucket, build_store, CHAT_RATE_PER_MINUTE, CHAT_BURST, BLOG_RATE_PER_MINUTE, BLOG_BURST,
+    BATCH_RATE_PER_MINUTE, BATCH_BURST
+)
+from .batch import run_batch, BATCH_MAX_PARALLEL
+from .gateway import get_chat_gateway, provider_stats, LLM_HEDGE_DELAY
+from .telemetry import (
+    ROUTER_LATENCY, ROUTE_DECISIONS, RETRIEVAL_LATENCY, span, timed, in_current_context, render_metrics, setup_tracing, instrument_crewai
+)
+from typing import Awaitable, Callable, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+import asyncio
 import os
+import random
+import time
+import uuid
 import json
 
 load_dotenv()
 
 
-limiter = Limiter(key_func=get_remote_address, default_limits=["5/minute"])
+# Point RATE_LIMIT_STORAGE_URI at redis://... so the per-route limits hold across workers
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=["5/minute"],
+    storage_uri=os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+)
+
+# Crew runs are synchronous and take minutes, so they get their own bounded
+# thread pool instead of running on (and starving) the event loop.
+CREW_MAX_WORKERS = int(os.getenv("CREW_MAX_WORKERS", "2"))
+# Independent crew instances; more than CREW_MAX_WORKERS would only sit idle
+CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", str(CREW_MAX_WORKERS)))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# How long a generated blog for the same topic and tone is served from the blog cache
+BLOG_CACHE_MAX_AGE = float(os.getenv("BLOG_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+CREW_STAGES = ["research_task", "writing_task", "summarizing_task"]
+# Re-runs of only the summarizing stage when its output can't be parsed into a BlogOutput
+SUMMARY_RETRIES = int(os.getenv("SUMMARY_RETRIES", "1"))
+# How long completed crew stages are kept for resuming runs and reusing research across tones
+CHECKPOINT_MAX_AGE = float(os.getenv("CHECKPOINT_MAX_AGE", str(24 * 3600)))
+# Fraction of fast-path routing decisions double-checked by the router LLM
+ROUTER_SHADOW_RATE = float(os.getenv("ROUTER_SHADOW_RATE", "0"))
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+# Cosine similarity above which a different but near-identical question is served from cache; unset disables it
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0")) or None
+
+# Built on the first similarity lookup, like the chains and the knowledge base
+cache_embeddings = LazyEmbeddings(get_embeddings) if RESPONSE_CACHE_SIMILARITY else None
+route_cache = ResponseCache(
+    "route",
+    backend=build_backend(RESPONSE_CACHE_MAX_ENTRIES),
+    ttl=RESPONSE_CACHE_TTL,
+    embeddings=cache_embeddings,
+    similarity_threshold=RESPONSE_CACHE_SIMILARITY
+)
+answer_cache = ResponseCache(
+    "assistant",
+    backend=build_backend(RESPONSE_CACHE_MAX_ENTRIES),
+    ttl=RESPONSE_CACHE_TTL,
+    embeddings=cache_embeddings,
+    similarity_threshold=RESPONSE_CACHE_SIMILARITY
+)
+
+fast_router = FastRouter(
+    log_path=os.getenv("ROUTER_LOG_PATH", "db/router_decisions.jsonl"),
+    confidence=float(os.getenv("ROUTER_CONFIDENCE", "0.9")),
+    min_examples=int(os.getenv("ROUTER_MIN_EXAMPLES", "50"))
+)
+
+def crew_project():
+    """A new SocialMediaBlog; crew.py pulls in CrewAI and the Gemini SDK, seconds of imports, so it is loaded on first use"""
+    from .crew import SocialMediaBlog
+
+    instrument_crewai()
+    return SocialMediaBlog()
+
+async def get_crew_pool(app: FastAPI) -> CrewPool:
+    """The crew pool, built by the startup warm-up or by the first request that needs it"""
+    async with app.state.crew_pool_lock:
+        if app.state.crew_pool is None:
+            pool = await asyncio.to_thread(CrewPool, lambda: crew_project().crew(), CREW_POOL_SIZE)
+            if app.state.crew_pool is None:
+                app.state.crew_pool = pool
+            logger.info("Crew initialized successfully")
+    return app.state.crew_pool
+
+async def warm_up(app: FastAPI):
+    """Compile the chains, load the knowledge base and build the crew pool without holding up startup.
+
+    Each step that fails is left to happen on first use; /readyz reports what is done.
+    """
+    try:
+        await asyncio.to_thread(chains.compile_all)
+    except Exception:
+        logger.exception("Failed to compile the chains, they will be compiled on first use")
+    await asyncio.to_thread(get_shared_knowledge_base)
+    try:
+        await get_crew_pool(app)
+    except Exception:
+        logger.exception("Failed to initialize crew, it will be built on first use")
+
+def open_blog_generation(app: FastAPI):
+    """Put what generate_blog_cached needs on app.state: the crew executor, the (lazily built) crew pool,
+    the blog cache, checkpoints, single-flight and crew admission. Returns the admission store."""
+    app.state.crew_pool = None
+    app.state.crew_pool_lock = asyncio.Lock()
+    app.state.crew_executor = ThreadPoolExecutor(max_workers=CREW_MAX_WORKERS, thread_name_prefix="crew")
+    logger.info(f"Crew executor started with {CREW_MAX_WORKERS} workers")
+    app.state.blog_cache = BlogCache(os.getenv("BLOG_CACHE_DB_PATH", "db/blogs.sqlite3"), max_age=BLOG_CACHE_MAX_AGE)
+    app.state.blog_flights = SingleFlight()
+    app.state.checkpoints = CheckpointStore(os.getenv("CHECKPOINT_DB_PATH", "db/checkpoints.sqlite3"), max_age=CHECKPOINT_MAX_AGE)
+    admission_store = build_store()
+    app.state.crew_admission = CrewAdmission(admission_store)
+    return admission_store
 
 @asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Initialize crew instance on startup"""
+async def blog_generation(app: FastAPI):
+    """Blog generation alone, for the batch CLI: no job queue (the API server owns the queued jobs), rate limits or warm-up"""
+    setup_tracing()
+    open_blog_generation(app)
     try:
-        app.state.crew_instance = SocialMediaBlog().crew()
-        logger.info("Crew initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize crew: {e}")
-        raise
-    yield
+        yield app
+    finally:
+        app.state.crew_executor.shutdown(wait=False, cancel_futures=True)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the stores and start the job queue; clients, the retriever and the crews are warmed up in the background"""
+    setup_tracing()
+    admission_store = open_blog_generation(app)
+    app.state.chat_bucket = TokenBucket(admission_store, "chat", CHAT_RATE_PER_MINUTE, CHAT_BURST)
+    app.state.blog_bucket = TokenBucket(admission_store, "blog", BLOG_RATE_PER_MINUTE, BLOG_BURST)
+    app.state.batch_bucket = TokenBucket(admission_store, "batch", BATCH_RATE_PER_MINUTE, BATCH_BURST)
+    app.state.job_queue = JobQueue(
+        JobStore(os.getenv("JOB_DB_PATH", "db/jobs.sqlite3"), max_age=BLOG_CACHE_MAX_AGE),
+        # Queued jobs wait for a crew slot however long it takes instead of being turned away
+        runner=partial(generate_blog_cached, app, bounded=False),
+        workers=JOB_WORKERS
+    )
+    await app.state.job_queue.start()
+    warm_up_task = asyncio.create_task(warm_up(app))
+    yield
+    warm_up_task.cancel()
+    await app.state.job_queue.stop()
+    app.state.crew_executor.shutdown(wait=False, cancel_futures=True)
 
 app = FastAPI(title="AI Blog Post Generator", 
               lifespan=lifespan, 
@@ -40,6 +180,15 @@ app = FastAPI(title="AI Blog Post Generator",
               version="1.1")
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "limit": exc.limit, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 app.add_middleware(SlowAPIMiddleware)
 origins = [
    "https://mindtypex.netlify.app"
@@ -53,200 +202,539 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-def get_langchain_llm():
-    if os.getenv("GOOGLE_API_KEY"):
-        logger.info("Using ChatGoogleGenerativeAI for LangChain components.")
-        return ChatGoogleGenerativeAI(model="gemini-2.5-pro", google_api_key=os.getenv("GOOGLE_API_KEY"), temperature=0.5)
-    else:
-        logger.error("No valid API key found for Gemini.")
-        raise ValueError("GOOGLE_API_KEY not found.")
-    
-general_chat_llm = ChatGroq(
-    model=os.getenv("GROQ_MODEL"),
-    api_key=os.getenv("GROQ_API_KEY"),
-    temperature=0.7
-)
-
-
-langchain_llm = get_langchain_llm()
-
-async def route_query(user_request: str) -> str:
+@lru_cache(maxsize=1)
+def general_chat_llm():
+    """LLM gateway shared by the router and the assistant, built when their chains are first compiled"""
+    # Router and assistant calls are short, so they may be hedged across providers
+    return get_chat_gateway(hedge_delay=LLM_HEDGE_DELAY)
+
+chains = ChainRegistry()
+chains.register("router", lambda: ChatPromptTemplate.from_messages(ROUTER_MESSAGES) | general_chat_llm() | StrOutputParser())
+chains.register("assistant", lambda: ChatPromptTemplate.from_messages(ASSISTANT_MESSAGES) | general_chat_llm() | StrOutputParser())
+chains.register("summary", lambda: ChatPromptTemplate.from_template(SUMMARY_TEMPLATE) | general_chat_llm() | StrOutputParser())
+
+async def summarize_conversation(summary: str, transcript: str) -> str:
+    """Fold older chat turns into a session's running summary"""
+    with span("summarize_conversation"):
+        return await chains.get("summary").ainvoke({
+            "summary": summary or "(none yet)",
+            "transcript": transcript,
+            # Roughly three words per four tokens
+            "max_words": sessions.summary_tokens * 3 // 4 })
+
+# Per process: follow-ups only find their history when the API runs as a single worker (see SessionStore)
+sessions = SessionStore(summarize_conversation)
+
+async def route_query(user_request: str, fallback: Optional[str] = "langchain") -> Optional[str]:
     """Route queries intelligently between CrewAI (health) or LangChain (general chat)."""
-    router_prompt = ChatPromptTemplate.from_template(
-        """
-        You are a routing expert. Decide whether to route the user query to 
-        'crewai' (for content generation) or 'langchain' (for general chat).
-        Beforemaking the decision, thoroughly analyze the user's input. If they directly mention to generate a blog, in whatever way, then you know definitely the route is crewai. If the user's input is unclear, ask it is definitely langchain. General queries for example, what mindtype does and what type of content they generate, that is a langchain query. Intelligently analyze the user's request to determine clearly and without a doubt, what route is to be taken.
-        Respond with one word only: crewai or langchain.
-        
-        User: "{query}"
-        Response:
-        """
+    try:
+        answer = await chains.get("router").ainvoke({"query": user_request})
+    except Exception as e:
+        logger.exception(f"Router LLM failed. Proceeding with {fallback}")
+        return fallback
+    decision = parse_route(answer)
+    if decision is None:
+        # Never let an off-format answer into the route cache or the fast router's training data
+        logger.warning(f"Router LLM answered {answer[:80]!r}, which is not a route. Proceeding with {fallback}")
+        return fallback
+    return decision
+
+async def route_query_fast(user_request: str) -> str:
+    """Route locally when the fast router is confident, otherwise fall back to the router LLM."""
+    with span("route_query") as current:
+        started = time.perf_counter()
+        path, decision = await _route(user_request)
+        ROUTER_LATENCY.labels(path=path).observe(time.perf_counter() - started)
+        ROUTE_DECISIONS.labels(route=decision, path=path).inc()
+        if current is not None:
+            current.set_attribute("route", decision)
+            current.set_attribute("route.path", path)
+        return decision
+
+async def _route(user_request: str):
+    """(path, route): which of the fast router, the route cache or the router LLM decided, and its decision"""
+    guess = fast_router.classify(user_request)
+    if fast_router.is_confident(guess):
+        fast_router.record_fast_path(guess)
+        logger.info(f"Fast router chose '{guess.route}' ({guess.source}, p={guess.confidence:.2f})")
+        if ROUTER_SHADOW_RATE and random.random() < ROUTER_SHADOW_RATE:
+            asyncio.create_task(shadow_route_check(user_request, guess))
+        return "fast", guess.route
+
+    cached = await route_cache.get(user_request)
+    if cached is not None:
+        return "cache", cached
+
+    decision = await route_query(user_request, fallback=None)
+    if decision is None:
+        return "fallback", "langchain"
+    fast_router.record_llm_decision(user_request, decision, guess)
+    await route_cache.set(user_request, decision)
+    return "llm", decision
+
+async def shadow_route_check(user_request: str, guess):
+    """Ask the router LLM about a fast-path decision to measure agreement"""
+    decision = await route_query(user_request, fallback=None)
+    if decision is not None:
+        fast_router.record_llm_decision(user_request, decision, guess, shadow=True)
+
+async def retrieve_context(user_query: str) -> str:
+    try:
+        # Loading (or retrying) the knowledge base may block on the network, so it happens off the event loop
+        if knowledge_base_status() == "ready":
+            knowledge_base = get_shared_knowledge_base()
+        else:
+            knowledge_base = await asyncio.to_thread(get_shared_knowledge_base)
+        if knowledge_base is None:
+            return ""
+        with span("retrieve"), timed(RETRIEVAL_LATENCY, stage="total"):
+            docs = await knowledge_base.ainvoke(user_query)
+        # Whatever the retriever, duplicates are dropped and the context never exceeds its token budget
+        return pack_context(docs, CONTEXT_TOKEN_BUDGET) if docs else ""
+    except Exception as e:
+        logger.exception(f"Retriever failed")
+        return ""
+
+async def assistant(user_query: str, session_id: Optional[str] = None):
+    with span("assistant"):
+        # A reply that builds on earlier turns is specific to the session, so it skips the shared answer cache
+        history = sessions.history(session_id)
+        answer = None if history else await answer_cache.get(user_query)
+        if answer is None:
+            context = await retrieve_context(user_query)
+            answer = await chains.get("assistant").ainvoke({
+                "user_query": user_query,
+                "context": context,
+                "history": history or "(new conversation)" })
+            if answer and not history:
+                await answer_cache.set(user_query, answer)
+        if answer:
+            sessions.record(session_id, user_query, answer)
+        return answer
+
+async def assistant_stream(user_query: str, session_id: Optional[str] = None):
+    """Same as assistant(), but yields the reply in chunks as the LLM produces them."""
+    with span("assistant_stream"):
+        history = sessions.history(session_id)
+        cached = None if history else await answer_cache.get(user_query)
+        if cached is not None:
+            sessions.record(session_id, user_query, cached)
+            yield cached
+            return
+
+        context = await retrieve_context(user_query)
+        parts = []
+        async for chunk in chains.get("assistant").astream({
+            "user_query": user_query,
+            "context": context,
+            "history": history or "(new conversation)" }):
+            parts.append(chunk)
+            yield chunk
+        if parts:
+            answer = "".join(parts)
+            if not history:
+                await answer_cache.set(user_query, answer)
+            sessions.record(session_id, user_query, answer)
+
+def blog_error_response(content: str = "Blog generation failed due to an unexpected error. Please try again later.",
+                        meta_description: str = "Error in processing the request.") -> BlogResponse:
+    """Default error response for a failed blog generation"""
+    return BlogResponse(
+        status="error",
+        title="Blog Generation Failed",
+        content=content,
+        meta_description=meta_description,
+        blog_preview=""
     )
-    router_chain = router_prompt | general_chat_llm| StrOutputParser()
 
+def blog_output_from(response) -> Optional[BlogOutput]:
+    """BlogOutput of a crew run: the structured output if CrewAI produced one, otherwise the repaired raw reply"""
+    if isinstance(getattr(response, "pydantic", None), BlogOutput):
+        return response.pydantic
+    return parse_blog_output(response.raw)
+
+def kickoff_resumed(completed: dict, inputs: dict, task_callback=None):
+    """Build a crew for the stages missing from `completed` and run it; both happen in the calling (crew worker) thread"""
+    crew = crew_project().resume_crew(completed)
+    crew.task_callback = task_callback
+    return crew.kickoff(inputs=inputs)
+
+async def run_stages(app: FastAPI, topic: str, tone: str, completed: dict, task_callback=None) -> tuple:
+    """Run the crew stages missing from `completed`; returns every stage's output and the BlogOutput (None if unusable)"""
+    inputs = {'topic': topic, "tone": tone}
+    if not completed:
+        crew_pool = await get_crew_pool(app)
+        response = await crew_pool.kickoff(app.state.crew_executor, inputs=inputs, task_callback=task_callback)
+    elif len(completed) < len(CREW_STAGES):
+        logger.info(f"Resuming crew for '{topic}' ({tone}) after {', '.join(completed)}")
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(app.state.crew_executor,
+                                              in_current_context(partial(kickoff_resumed, completed, inputs, task_callback)))
+    else:
+        return completed, parse_blog_output(completed["summarizing_task"].raw)
+    remaining = [stage for stage in CREW_STAGES if stage not in completed]
+    return {**completed, **dict(zip(remaining, response.tasks_output))}, blog_output_from(response)
+
+async def retry_summarizing(app: FastAPI, outputs: dict, topic: str, tone: str, task_callback=None) -> Optional[BlogOutput]:
+    """Re-run only the summarizing stage on the research and writing outputs of a finished run"""
+    completed = {name: output for name, output in outputs.items() if name != "summarizing_task"}
+    loop = asyncio.get_running_loop()
+    for attempt in range(1, SUMMARY_RETRIES + 1):
+        logger.warning(f"Summarizing output was unusable, re-running the summarizing stage ({attempt}/{SUMMARY_RETRIES})")
+        retried = await loop.run_in_executor(
+            app.state.crew_executor,
+            in_current_context(partial(kickoff_resumed, completed, {'topic': topic, "tone": tone}, task_callback))
+        )
+        output = blog_output_from(retried)
+        if output is not None:
+            return output
+    return None
+
+async def generate_with_crew(app: FastAPI, topic: str, tone: str, task_callback=None, resume: bool = True) -> BlogResponse:
+    """Run the CrewAI pipeline in the crew executor and turn its output into a BlogResponse.
+
+    Each task's output is checkpointed as it completes. With resume, stages already
+    checkpointed for these inputs (research for the topic in any tone) are not re-run.
+    A task_callback sees this run's task outputs, restored ones first; it is invoked
+    from the crew's worker thread.
+    """
+    run_id = uuid.uuid4().hex
+    checkpoints = app.state.checkpoints
+
+    def save_checkpoint(output):
+        try:
+            checkpoints.save(run_id, topic, tone, output)
+        except Exception:
+            logger.exception(f"Failed to checkpoint {output.name} of run {run_id}")
+
+    def on_task_complete(output):
+        save_checkpoint(output)
+        if task_callback is not None:
+            task_callback(output)
 
     try:
-        decision = await router_chain.ainvoke({"query": user_request})
-        return decision.strip().lower()
-    except Exception as e:
-        logger.exception("Router LLM failed. Proceeding with langchain")
-        return "langchain"
+        completed = await asyncio.to_thread(checkpoints.load, CREW_STAGES, topic, tone) if resume else {}
+        if task_callback is not None:
+            for output in completed.values():
+                task_callback(output)
+        with span("crew_kickoff", topic=topic, tone=str(tone), resumed_stages=len(completed)):
+            outputs, output = await run_stages(app, topic, tone, completed, on_task_complete)
+        logger.info("CREW Pipeline completed successfully")
+
+        if output is None and SUMMARY_RETRIES:
+            with span("crew_retry_summarizing"):
+                output = await retry_summarizing(app, outputs, topic, tone, save_checkpoint)
+        if output is None:
+            logger.error(f"CrewAI output is not a valid blog after repair and retries: {outputs['summarizing_task'].raw[:200]!r}")
+            return blog_error_response("CrewAI output was not valid JSON. Check agent prompts.", "Invalid JSON structure.")
+
+        return BlogResponse(
+            status="success",
+            title=output.title,
+            content=output.blog_post,
+            meta_description=output.meta_description,
+            blog_preview=output.blog_preview
+        )
 
-def assistant(user_query: str):
-    chat_prompt_template = ChatPromptTemplate.from_template(
+    except Exception as e:
+        logger.exception("Crew pipeline failed during execution.")
+        return blog_error_response("Blog generation failed. An internal CrewAI error occurred.", "CrewAI execution error.")
+
+async def generate_blog_cached(app: FastAPI, topic: str, tone: str, force_refresh: bool = False, task_callback=None,
+                               bounded: bool = True, charge: Optional[Callable[[], Awaitable]] = None) -> BlogResponse:
+    """Serve a fresh cached blog for (topic, tone) or generate one, sharing a single crew run between identical concurrent requests.
+
+    The SQLite blog cache is read and written in a worker thread, off the event loop.
+    charge() is awaited only when this call is about to start a crew run (it may
+    raise AdmissionRejected); cache hits and joined runs are free.
+    A generation waits for one of the global crew slots; when bounded, it raises
+    AdmissionRejected instead if the wait queue is full or the wait too long.
     """
-You are the official general support AI Chatbot for **Mindtype**.
-Mindtype is a company founded by **DirectEd scholars** after working on a project, and we focus on high-quality **blog posts and content**.
+    blog_cache = app.state.blog_cache
+    if not force_refresh:
+        cached = await asyncio.to_thread(blog_cache.get, topic, tone)
+        if cached is not None:
+            logger.info(f"Serving cached blog for topic '{topic}' ({tone})")
+            return BlogResponse(
+                status="success",
+                title=cached.title,
+                content=cached.blog_post,
+                meta_description=cached.meta_description,
+                blog_preview=cached.blog_preview
+            )
+
+    async def run() -> BlogResponse:
+        async with app.state.crew_admission.slot(bounded=bounded):
+            # A forced refresh regenerates every stage instead of resuming from checkpoints
+            response = await generate_with_crew(app, topic, tone, task_callback=task_callback, resume=not force_refresh)
+        if response.status == "success":
+            await asyncio.to_thread(blog_cache.set, topic, tone, BlogOutput(
+                title=response.title,
+                blog_post=response.content,
+                meta_description=response.meta_description,
+                blog_preview=response.blog_preview
+            ))
+        return response
+
+    key = blog_key(topic, tone)
+    if charge is not None and key not in app.state.blog_flights:
+        await charge()
+    return await app.state.blog_flights.run(key, run)
 
-Keep replies **brief, realistic, and chat-like** — like a responsive support assistant.
-Do **not** repeat long intros or greetings in every reply.
+@app.get("/")
+async def root():
+    return {"message": "Loaded successfully! Visit /docs"}
 
----
-If a user's question or input is unclear, handle it intelligently by either asking for more information or mention that you did not understand them. Be intelligent.
 
-### 📘 Knowledge Base (for reference only, do not dump unless asked):
-- **Focus:** High-quality blog posts, insights, and content creation.
-- **Founding:** Established by DirectEd scholars following a successful project.
-- **Core Process:** Blog generation is handled by a specialized **CrewAI team** (internal process).
-- **General Support:** This LangChain-based chat handles general questions, company info, and navigation.
-- **Goal:** To share knowledge and foster discussion.
+@app.get("/healthz")
+@limiter.exempt
+async def healthz():
+    """Liveness: the process is up and its event loop is serving requests"""
+    return {"status": "ok"}
 
----
 
-### 🚨 Handling Off-topic:
-- If question is unrelated → Answer briefly, but politely warn in a warm but professional method. For example:
-  *"Note: I can mainly assist with Mindtype, our content, or company info. But you can only inform them perdiodically, not after every single chat. For example you warn the first time then a subtle warning the third time followed bu another warning the 5th"* Alternate the way you produce this message so that it does not appear as a hardcoded  message but instead a real-time chatbot or a human.
+@app.get("/readyz")
+@limiter.exempt
+async def readyz(request: Request):
+    """Readiness: chains compiled and crew pool built; the knowledge base and BM25 chunk file are reported but not required"""
+    ready = {"chains": chains.compiled(), "crew": request.app.state.crew_pool is not None}
+    status = "ready" if all(ready.values()) else "starting"
+    return JSONResponse(
+        status_code=200 if status == "ready" else 503,
+        content={"status": status, **ready, "knowledge_base": knowledge_base_status(), "bm25_corpus": bm25_corpus_status()}
+    )
 
----
 
-### ⚡ Style:
-- **Tone:** Professional, knowledgeable, and concise.
-- **Length:** 1–3 short sentences.
-- **Formatting:** Use simple lists/emojis if it aids clarity.
+@app.get("/cache/stats")
+@limiter.exempt
+async def cache_stats():
+    """Hit/miss counters for the router, assistant response and embedding caches, and the live chat sessions"""
+    return {"route": route_cache.snapshot(), "assistant": answer_cache.snapshot(), "embeddings": store_stats(),
+            "sessions": sessions.snapshot()}
 
----
 
-    Context: {context}
-👤 User: {user_query}
-💬 Chatbot:
-    """
-)
+@app.get("/router/stats")
+@limiter.exempt
+async def router_stats():
+    """Fast-path hit rate and agreement with the router LLM"""
+    return fast_router.snapshot()
 
-    try:
-        docs = knowledge_base.invoke(user_query)
-        context = "\n".join([doc.page_content for doc in docs]).strip() if docs else ""
-    except Exception as e:
-        logger.exception(f"Retriever failed")
-        context = ""
 
-    chain = chat_prompt_template | general_chat_llm| StrOutputParser()
+@app.get("/metrics")
+@limiter.exempt
+async def metrics():
+    """Prometheus metrics: router, retrieval, LLM, crew task and web fetch latencies, cache and parse counters"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
-    return chain.invoke({
-        "user_query": user_query,
-        "context": context })
 
-@app.get("/")
-async def root():
-    return {"message": "Loaded successfully! Visit /docs"}
+@app.get("/admission/stats")
+@limiter.exempt
+async def admission_stats(request: Request):
+    """Crew slots in use, runs waiting for one and the run time Retry-After is estimated from"""
+    return await request.app.state.crew_admission.snapshot()
+
+
+@app.get("/llm/stats")
+@limiter.exempt
+async def llm_stats():
+    """Calls, failures, moving-average latency and token usage per LLM provider"""
+    return provider_stats()
 
 
 @app.post("/chat", response_model=Union[BlogResponse, ChatResponse])
-@limiter.limit("5/minute")
+@limiter.exempt
 async def generate_blog(request: Request, body: BlogRequest):
-    route_decision = await route_query(user_request=body.topic)
-    
-    # Initialize a default error response for robust fallback
-    error_response = BlogResponse(
-        status="error",
-        title="Blog Generation Failed",
-        content="Blog generation failed due to an unexpected error. Please try again later.",
-        meta_description="Error in processing the request.",
-        blog_preview=""
-    )
+    """Answer with the assistant or generate a blog; rate limited by the chat and blog token buckets"""
+    # Before routing, so a client over its limit doesn't cost a router call
+    await admit(request)
+    route_decision = await route_query_fast(user_request=body.topic)
+    session_id = sessions.resolve(body.session_id)
 
     try:
         if route_decision == "langchain":
             logger.info("Routing conversation to Langchain...")
-            response_text = assistant(body.topic)
+            response_text = await assistant(body.topic, session_id)
             if response_text:
                 logger.info("Chatbot returned an answer!")
-                return ChatResponse(response=response_text)
+                return ChatResponse(response=response_text, session_id=session_id)
             else:
                 logger.warning("Langchain returned no response.")
-                return ChatResponse(response="Sorry, I couldn't generate a response.")
+                return ChatResponse(response="Sorry, I couldn't generate a response.", session_id=session_id)
                 
         elif route_decision == "crewai":
             logger.info("Routing conversation to Crewai")
-            crew_instance = request.app.state.crew_instance
-            
-            try:
-                # 1. Execute CrewAI pipeline
-                response = crew_instance.kickoff(inputs={'topic': body.topic, "tone": body.tone})
-                raw_output = response.raw
-                logger.info("CREW Pipeline completed successfully")
-
-                # --- START: Robust JSON Wrangle Logic (The fix!) ---
-                cleaned_output = raw_output.strip()
-                logger.debug(f"Raw output size: {len(raw_output)}. Cleaned output size: {len(cleaned_output)}")
-                
-                # Check for and remove common markdown code fences (```json ... ```)
-                if cleaned_output.startswith("```"):
-                    logger.debug("Attempting to clean markdown fences.")
-                    try:
-                        # Split after the first line (e.g., ```json) and before the last line (e.g., ```)
-                        # This handles multiple lines of output
-                        cleaned_output = cleaned_output.split('\n', 1)[1].rsplit('\n', 1)[0].strip()
-                    except IndexError:
-                        pass
-                
-                # 2. Basic validation check after cleaning
-                if not cleaned_output or not (cleaned_output.startswith('{') and cleaned_output.endswith('}')):
-                    logger.error(f"CrewAI output is empty or not a valid JSON structure after cleaning: {repr(cleaned_output[:50])}...")
-                    error_response.content = "CrewAI output was not valid JSON. Check agent prompts."
-                    error_response.meta_description = "Invalid JSON structure."
-                    return error_response
-
-                # 3. Attempt JSON loading on the cleaned string
-                try: 
-                    result = json.loads(cleaned_output)
-                    
-                    # 4. Extract fields from the resulting dictionary
-                    title = result.get("title", "Untitled")
-                    content = result.get("blog_post", "")
-                    meta_description = result.get("meta_description", "")
-                    blog_preview = result.get("blog_preview", "")
-                    
-                    return BlogResponse(
-                        status="success",
-                        title=title,
-                        content=content,
-                        meta_description=meta_description,
-                        blog_preview=blog_preview
-                    )
-                except json.JSONDecodeError as e:
-                    logger.exception(f"JSON Decode Error after cleaning. Problematic output: {repr(cleaned_output)}")
-                    error_response.content = "Failed to parse final output as JSON. Check agent output structure."
-                    error_response.meta_description = "JSON decoding failed."
-                    return error_response
-                # --- END: Robust JSON Wrangle Logic ---
-
-            except Exception as e:
-                logger.exception("Crew pipeline failed during execution.")
-                error_response.content = "Blog generation failed. An internal CrewAI error occurred."
-                error_response.meta_description = "CrewAI execution error."
-                return error_response
+            response = await generate_blog_cached(request.app, body.topic, body.tone.value, force_refresh=body.force_refresh,
+                                                  charge=blog_charge(request))
+            return remember_blog(session_id, body, response)
 
         else:
             # Handle invalid route decision
-            error_response.content = "Invalid route or unsupported query type."
-            error_response.meta_description = "Routing decision failed."
-            return error_response
-            
+            return blog_error_response("Invalid route or unsupported query type.", "Routing decision failed.")
+
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logger.exception("Top-level exception in generate_blog")
-        return error_response
+        return blog_error_response()
+
+
+async def admit(request: Request):
+    """Charge the client's chat bucket for a /chat request, whichever way it is routed"""
+    await request.app.state.chat_bucket.take(get_remote_address(request))
+
+
+def blog_charge(request: Request) -> Callable[[], Awaitable]:
+    """Charge to the client's blog bucket, taken once the request is about to start a crew run"""
+    return partial(request.app.state.blog_bucket.take, get_remote_address(request))
+
+
+def remember_blog(session_id: str, body: BlogRequest, response: BlogResponse) -> BlogResponse:
+    """Note a generated blog in the conversation, so follow-up questions can refer to it; returns the response for that session"""
+    if response.status == "success":
+        sessions.record(session_id, body.topic, f'Generated a {body.tone.value} blog post titled "{response.title}".')
+    # A copy, as the response may be shared with other requests for the same blog
+    return response.model_copy(update={"session_id": session_id})
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def chat_event_stream(app: FastAPI, body: BlogRequest, route_decision: str, session_id: Optional[str] = None,
+                            charge: Optional[Callable[[], Awaitable]] = None):
+    """Yield the /chat/stream events: route, progress/token updates, then the final payload."""
+    yield sse_event("route", {"route": route_decision})
+
+    try:
+        if route_decision == "langchain":
+            logger.info("Streaming conversation from Langchain...")
+            parts = []
+            async for chunk in assistant_stream(body.topic, session_id):
+                parts.append(chunk)
+                yield sse_event("token", {"text": chunk})
+            response_text = "".join(parts)
+            final = ChatResponse(response=response_text or "Sorry, I couldn't generate a response.", session_id=session_id)
+
+        elif route_decision == "crewai":
+            logger.info("Streaming conversation from Crewai")
+            loop = asyncio.get_running_loop()
+            events: asyncio.Queue = asyncio.Queue()
+
+            def on_task_complete(output):
+                loop.call_soon_threadsafe(events.put_nowait, output)
+
+            run = asyncio.create_task(generate_blog_cached(
+                app, body.topic, body.tone.value, force_refresh=body.force_refresh, task_callback=on_task_complete, charge=charge
+            ))
+            run.add_done_callback(lambda _: events.put_nowait(None))
+
+            completed = 0
+            yield sse_event("progress", {"stage": CREW_STAGES[0], "state": "started"})
+            while True:
+                try:
+                    output = await asyncio.wait_for(events.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                if output is None:
+                    break
+                stage = CREW_STAGES[completed] if completed < len(CREW_STAGES) else f"task_{completed + 1}"
+                completed += 1
+                yield sse_event("progress", {"stage": stage, "state": "completed"})
+                if stage == "writing_task":
+                    # The full report is the first readable text of the run
+                    yield sse_event("token", {"text": output.raw})
+                if completed < len(CREW_STAGES):
+                    yield sse_event("progress", {"stage": CREW_STAGES[completed], "state": "started"})
+            final = remember_blog(session_id, body, run.result())
+
+        else:
+            final = blog_error_response("Invalid route or unsupported query type.", "Routing decision failed.")
+
+    except AdmissionRejected as e:
+        # Headers are already sent, so the 429 travels as an event
+        yield sse_event("error", {"status": 429, "detail": str(e), "retry_after": e.retry_after})
+        final = blog_error_response("Too many blogs are being generated right now. Please try again later.", f"{e.limit} limit reached.")
+    except Exception as e:
+        logger.exception("Top-level exception in chat_event_stream")
+        final = blog_error_response()
+
+    yield sse_event("final", final.model_dump())
+
+
+@app.post("/chat/stream")
+@limiter.exempt
+async def stream_chat(request: Request, body: BlogRequest):
+    """Streaming variant of /chat using Server-Sent Events."""
+    # Before routing, so a client over its limit doesn't cost a router call
+    await admit(request)
+    route_decision = await route_query_fast(user_request=body.topic)
+    session_id = sessions.resolve(body.session_id)
+    return StreamingResponse(
+        chat_event_stream(request.app, body, route_decision, session_id=session_id, charge=blog_charge(request)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/jobs", response_model=JobSubmitResponse, status_code=202)
+@limiter.exempt
+async def submit_job(request: Request, body: BlogRequest):
+    """Queue a blog generation and return its job id immediately.
+
+    Only a job that will run the crew is charged to the blog bucket, not one that
+    joins an existing job or will be served from the blog cache.
+    """
+    app, topic, tone = request.app, body.topic, body.tone.value
+    queue = app.state.job_queue
+    if queue.reusable(topic, tone, force_refresh=body.force_refresh) is None and \
+            (body.force_refresh or await asyncio.to_thread(app.state.blog_cache.get, topic, tone) is None):
+        await blog_charge(request)()
+    job, deduplicated = queue.submit(topic, tone, force_refresh=body.force_refresh)
+    return JobSubmitResponse(job_id=job["id"], status=job["status"], deduplicated=deduplicated)
+
+
+@app.post("/batch")
+@limiter.exempt
+async def generate_batch(request: Request, body: BatchRequest):
+    """Generate a blog per (topic, tone) item, streaming each result as a JSON line as soon as it is done.
+
+    Items skip the router and go straight to the crew, sharing research between
+    tones of the same topic. They wait for crew slots rather than being turned away.
+    """
+    if len(body.items) > BATCH_BURST:
+        raise HTTPException(status_code=422, detail=f"A batch may have at most {BATCH_BURST:.0f} items")
+    await request.app.state.batch_bucket.take(get_remote_address(request), cost=len(body.items))
+    generate = partial(generate_blog_cached, request.app, force_refresh=body.force_refresh, bounded=False)
+    max_parallel = min(body.max_parallel or BATCH_MAX_PARALLEL, BATCH_MAX_PARALLEL)
+
+    async def lines():
+        async for result in run_batch(body.items, generate, max_parallel):
+            yield result.model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+@limiter.exempt
+async def get_job(request: Request, job_id: str):
+    """Report the status of a queued blog generation and its result once finished; exempt from rate limits as clients poll it."""
+    job = request.app.state.job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return JobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        topic=job["topic"],
+        tone=job["tone"],
+        result=BlogResponse(**json.loads(job["result"])) if job["result"] else None,
+        error=job["error"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"]
+    )
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
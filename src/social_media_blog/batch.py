@@ -0,0 +1,61 @@
+from typing import AsyncIterator, Awaitable, Callable, Dict, List
+from .db_handler import logger
+from .cache import normalize_query
+from .chat_models import BatchItem, BatchItemResult, BlogResponse
+import asyncio
+import os
+import time
+
+# Blogs of one batch generated at once; the crew slots still cap runs across all requests
+BATCH_MAX_PARALLEL = int(os.getenv("BATCH_MAX_PARALLEL", os.getenv("CREW_MAX_WORKERS", "2")))
+
+
+async def run_batch(items: List[BatchItem], generate: Callable[..., Awaitable[BlogResponse]],
+                    max_parallel: int = BATCH_MAX_PARALLEL) -> AsyncIterator[BatchItemResult]:
+    """Generate a blog for every item, at most max_parallel at a time, yielding results as they complete.
+
+    generate(topic, tone, task_callback=...) produces one blog. Research does not
+    depend on the tone, so of the items sharing a topic only the first runs it;
+    the others start once its research is done and resume from the checkpoint.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+    research_done: Dict[str, asyncio.Event] = {}
+
+    async def run_item(index: int, item: BatchItem) -> BatchItemResult:
+        key = normalize_query(item.topic)
+        leader = key not in research_done
+        if leader:
+            done = research_done[key] = asyncio.Event()
+        else:
+            await research_done[key].wait()
+
+        def on_task_complete(output):
+            if leader and output.name == "research_task":
+                loop.call_soon_threadsafe(done.set)
+
+        started = time.perf_counter()
+        try:
+            async with semaphore:
+                response = await generate(item.topic, item.tone.value, task_callback=on_task_complete)
+            return BatchItemResult(index=index, topic=item.topic, tone=item.tone, result=response,
+                                   seconds=round(time.perf_counter() - started, 2))
+        except Exception as e:
+            logger.exception(f"Batch item {index} ('{item.topic}', {item.tone.value}) failed")
+            return BatchItemResult(index=index, topic=item.topic, tone=item.tone, error=str(e),
+                                   seconds=round(time.perf_counter() - started, 2))
+        finally:
+            if leader:
+                # Followers go ahead even if the leader failed or was served from the blog cache
+                done.set()
+
+    topics = len({normalize_query(item.topic) for item in items})
+    logger.info(f"Running a batch of {len(items)} blogs on {topics} topics, {max_parallel} at a time")
+    tasks = [asyncio.create_task(run_item(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        # Items not started yet are dropped when the consumer goes away; started crew runs finish and are cached
+        for task in tasks:
+            task.cancel()
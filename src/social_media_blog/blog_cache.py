@@ -0,0 +1,85 @@
+from typing import Awaitable, Callable, Optional
+from pathlib import Path
+from .db_handler import logger
+from .chat_models import BlogOutput
+from .cache import normalize_query
+from .telemetry import CACHE_REQUESTS
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+def blog_key(topic: str, tone: str) -> str:
+    """Cache key for a blog: the canonicalized topic plus the tone value"""
+    tone = getattr(tone, "value", tone)
+    return hashlib.sha256(f"{normalize_query(topic)}|{tone}".encode("utf-8")).hexdigest()
+
+
+class BlogCache:
+    """SQLite-backed store of generated blogs keyed by (topic, tone), with a freshness window"""
+
+    def __init__(self, path: str, max_age: float):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS blogs (
+                    key TEXT PRIMARY KEY,
+                    topic TEXT NOT NULL,
+                    tone TEXT NOT NULL,
+                    output TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+        logger.info(f"Blog cache ready at {path} (max age {max_age:.0f}s)")
+
+    def get(self, topic: str, tone: str) -> Optional[BlogOutput]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output, created_at FROM blogs WHERE key = ?", (blog_key(topic, tone),)
+            ).fetchone()
+        if row is None:
+            CACHE_REQUESTS.labels(cache="blog", result="miss").inc()
+            return None
+        output, created_at = row
+        if time.time() - created_at > self.max_age:
+            logger.info(f"Cached blog for '{topic}' is stale")
+            CACHE_REQUESTS.labels(cache="blog", result="stale").inc()
+            return None
+        CACHE_REQUESTS.labels(cache="blog", result="hit").inc()
+        return BlogOutput.model_validate_json(output)
+
+    def set(self, topic: str, tone: str, output: BlogOutput):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blogs (key, topic, tone, output, created_at) VALUES (?, ?, ?, ?, ?)",
+                (blog_key(topic, tone), topic, getattr(tone, "value", tone), output.model_dump_json(), time.time())
+            )
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution"""
+
+    def __init__(self):
+        self._inflight: dict = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def run(self, key: str, factory: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.info("Joining in-flight run for an identical request")
+        # Shielded so a disconnecting caller does not cancel the run for everyone else
+        return await asyncio.shield(task)
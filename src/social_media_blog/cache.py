@@ -0,0 +1,165 @@
+from collections import Counter, OrderedDict
+from typing import Optional
+from .db_handler import logger
+from .telemetry import CACHE_REQUESTS
+import hashlib
+import os
+import re
+import time
+
+import numpy as np
+
+PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial variations share a key"""
+    return " ".join(PUNCTUATION.sub(" ", text.lower()).split())
+
+
+class MemoryBackend:
+    """In-process TTL + LRU key/value store"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float):
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisBackend:
+    """Shared backend so several workers or replicas see the same cache entries"""
+
+    def __init__(self, url: str, prefix: str = "mindtype:cache:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        await self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+
+class ResponseCache:
+    """Response cache keyed on normalized query text with an optional embedding-similarity tier.
+
+    Exact matches are looked up in the backend. When an embeddings object and a
+    similarity threshold are given, misses are embedded and compared against the
+    vectors of recently cached queries; a close enough neighbour is served instead.
+    The similarity vectors are kept per process even when the backend is shared.
+    """
+
+    def __init__(self, name: str, backend=None, ttl: float = 3600, embeddings=None,
+                 similarity_threshold: Optional[float] = None, max_vectors: int = 1000):
+        self.name = name
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.embeddings = embeddings if similarity_threshold else None
+        self.similarity_threshold = similarity_threshold
+        self.max_vectors = max_vectors
+        self.stats = Counter()
+        self._vectors: OrderedDict = OrderedDict()
+        self._matrix = None
+        self._keys: list = []
+        self._last_embedded = None
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.name}|{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    async def get(self, text: str) -> Optional[str]:
+        key = self.key(text)
+        try:
+            value = await self.backend.get(key)
+            if value is not None:
+                self.stats["exact_hits"] += 1
+                CACHE_REQUESTS.labels(cache=self.name, result="exact_hit").inc()
+                return value
+            if self.embeddings is not None and self._vectors:
+                value = await self._get_similar(text)
+                if value is not None:
+                    self.stats["semantic_hits"] += 1
+                    CACHE_REQUESTS.labels(cache=self.name, result="semantic_hit").inc()
+                    return value
+        except Exception as e:
+            logger.warning(f"{self.name} cache lookup failed: {e}")
+            self.stats["errors"] += 1
+        self.stats["misses"] += 1
+        CACHE_REQUESTS.labels(cache=self.name, result="miss").inc()
+        return None
+
+    async def set(self, text: str, value: str):
+        key = self.key(text)
+        try:
+            await self.backend.set(key, value, self.ttl)
+            if self.embeddings is not None and key not in self._vectors:
+                vector = await self._embed(text)
+                self._vectors[key] = vector
+                while len(self._vectors) > self.max_vectors:
+                    self._vectors.popitem(last=False)
+                self._matrix = None
+        except Exception as e:
+            logger.warning(f"{self.name} cache store failed: {e}")
+            self.stats["errors"] += 1
+
+    async def _embed(self, text: str) -> np.ndarray:
+        normalized = normalize_query(text)
+        # A miss is usually followed by set() for the same text; embed it once
+        if self._last_embedded is not None and self._last_embedded[0] == normalized:
+            return self._last_embedded[1]
+        vector = np.asarray(await self.embeddings.aembed_query(normalized), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        vector = vector / norm if norm else vector
+        self._last_embedded = (normalized, vector)
+        return vector
+
+    async def _get_similar(self, text: str) -> Optional[str]:
+        if self._matrix is None:
+            self._keys = list(self._vectors.keys())
+            self._matrix = np.stack([self._vectors[k] for k in self._keys])
+        # Another coroutine may rebuild the matrix while this one awaits the embedding
+        keys, matrix = self._keys, self._matrix
+        scores = matrix @ await self._embed(text)
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        key = keys[best]
+        value = await self.backend.get(key)
+        if value is None:
+            # Entry expired or was evicted from the backend
+            self._vectors.pop(key, None)
+            self._matrix = None
+        return value
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["exact_hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        return {
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "vectors": len(self._vectors),
+        }
+
+
+def build_backend(max_entries: int):
+    """Pick the cache backend from RESPONSE_CACHE_BACKEND (memory or redis)"""
+    if os.getenv("RESPONSE_CACHE_BACKEND", "memory") == "redis":
+        return RedisBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return MemoryBackend(max_entries=max_entries)
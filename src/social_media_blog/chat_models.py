@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 
@@ -12,6 +12,8 @@ class ToneEnum(str, Enum):
 class BlogRequest(BaseModel):
     topic: str = Field(..., min_length=1, max_length=500, description="The topic for the blog post")
     tone: ToneEnum = Field(default=ToneEnum.informative, description="The tone of the blog post")
+    force_refresh: bool = Field(default=False, description="Generate a new blog even if a fresh cached one exists")
+    session_id: Optional[str] = Field(default=None, min_length=1, max_length=128, description="session_id of an earlier reply to continue that conversation; omit it to start a new one, whose id is returned")
 
 class BlogOutput(BaseModel): # This is what comes from summarizing Task
     """Output model for the blog generation crew"""
@@ -26,7 +28,50 @@ class BlogResponse(BaseModel):
     content: str = Field(..., description="The generated blog content")
     meta_description: str = Field(..., description="SEO meta description")
     blog_preview: str = Field(..., description="Brief preview of the blog post")
+    session_id: Optional[str] = Field(default=None, description="Conversation this blog was generated in (chat endpoints only)")
 
 
 class ChatResponse(BaseModel):
     response: str
+    session_id: Optional[str] = None
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+class JobSubmitResponse(BaseModel):
+    job_id: str = Field(..., description="Identifier to poll with GET /jobs/{job_id}")
+    status: JobStatus
+    deduplicated: bool = Field(default=False, description="True if an existing job for the same topic and tone was returned")
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+    topic: str
+    tone: ToneEnum
+    result: Optional[BlogResponse] = Field(default=None, description="The generated blog once the job has finished")
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+
+class BatchItem(BaseModel):
+    topic: str = Field(..., min_length=1, max_length=500, description="The topic for the blog post")
+    tone: ToneEnum = Field(default=ToneEnum.informative, description="The tone of the blog post")
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem] = Field(..., min_length=1, max_length=100, description="Blogs to generate; topics may repeat with different tones")
+    max_parallel: Optional[int] = Field(default=None, ge=1, description="Blogs generated at once, up to the server's BATCH_MAX_PARALLEL")
+    force_refresh: bool = Field(default=False, description="Generate new blogs even if fresh cached ones exist")
+
+class BatchItemResult(BaseModel):
+    """One line of the /batch JSONL stream, emitted when the item finishes"""
+    index: int = Field(..., description="Position of the item in the request")
+    topic: str
+    tone: ToneEnum
+    result: Optional[BlogResponse] = None
+    error: Optional[str] = None
+    seconds: float = Field(..., description="Time from the item starting to its result")
@@ -0,0 +1,80 @@
+from typing import Dict, TYPE_CHECKING
+from pathlib import Path
+from .db_handler import logger
+from .cache import normalize_query
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+if TYPE_CHECKING:
+    from crewai.tasks.task_output import TaskOutput
+
+# Stages whose output does not depend on the tone, so runs with other tones can reuse them
+TONE_INDEPENDENT_STAGES = {"research_task"}
+
+
+def checkpoint_key(stage: str, topic: str, tone: str) -> str:
+    tone = "" if stage in TONE_INDEPENDENT_STAGES else getattr(tone, "value", tone)
+    return hashlib.sha256(f"{stage}|{normalize_query(topic)}|{tone}".encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """SQLite store of completed crew task outputs, keyed by stage and the inputs the stage depends on.
+
+    A run saves each task's output as soon as it finishes; a later run with the
+    same inputs (a retry, or the same request after a worker restart) loads the
+    completed stages and only executes the rest.
+    """
+
+    def __init__(self, path: str, max_age: float):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    key TEXT PRIMARY KEY,
+                    stage TEXT NOT NULL,
+                    run_id TEXT NOT NULL,
+                    output TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("DELETE FROM checkpoints WHERE created_at < ?", (time.time() - max_age,))
+        logger.info(f"Checkpoint store ready at {path} (max age {max_age:.0f}s)")
+
+    def save(self, run_id: str, topic: str, tone: str, output: "TaskOutput"):
+        record = {
+            "name": output.name,
+            "description": output.description,
+            "expected_output": output.expected_output,
+            "agent": output.agent,
+            "raw": output.raw,
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (key, stage, run_id, output, created_at) VALUES (?, ?, ?, ?, ?)",
+                (checkpoint_key(output.name, topic, tone), output.name, run_id, json.dumps(record), time.time())
+            )
+
+    def load(self, stages: list, topic: str, tone: str) -> Dict[str, "TaskOutput"]:
+        """Fresh outputs of the leading completed stages; a stage is only usable if all before it are too"""
+        from crewai.tasks.task_output import TaskOutput
+
+        completed = {}
+        for stage in stages:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT run_id, output, created_at FROM checkpoints WHERE key = ?", (checkpoint_key(stage, topic, tone),)
+                ).fetchone()
+            if row is None or time.time() - row[2] > self.max_age:
+                break
+            completed[stage] = TaskOutput(**json.loads(row[1]))
+            logger.info(f"Reusing {stage} output of run {row[0]} for '{topic}' ({tone})")
+        return completed
@@ -1,28 +1,28 @@
 from crewai import Agent, Crew, Process, Task, LLM
-from crewai.project import CrewBase, agent, crew, task
+from crewai.tasks.task_output import TaskOutput
+from crewai.project import CrewBase, agent, crew, task, llm as llm_tier
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from crewai.tools import tool
-from typing import List
+from typing import Dict, List
 from dotenv import load_dotenv
-from ddgs import DDGS
-from bs4 import BeautifulSoup
-from crewai.tools import tool
-from dotenv import load_dotenv
-import pandas as pd
 from pathlib import Path
-from .db_handler import logger, get_knowledge_base
+from .db_handler import logger, get_shared_knowledge_base
 from .chat_models import BlogOutput
+from .web_fetch import fetch_articles, search_web
+from .telemetry import span
 import os
-import requests
 
 
 load_dotenv()
-knowledge_base = get_knowledge_base()
 
-def get_llm():
+# Model tiers the agents/tasks pick from with `llm: strong_llm` or `llm: fast_llm` in the YAML config
+STRONG_LLM_MODEL = os.getenv("STRONG_LLM_MODEL", "gemini/gemini-2.5-pro")
+FAST_LLM_MODEL = os.getenv("FAST_LLM_MODEL", "gemini/gemini-2.5-flash")
+
+def get_llm(model: str = STRONG_LLM_MODEL):
     try:
         return LLM(
-            model="gemini/gemini-2.5-pro",
+            model=model,
             api_key=os.getenv("GOOGLE_API_KEY"),
             temperature=0.5
         )
@@ -30,75 +30,78 @@ def get_llm():
         logger.error(f"Failed to connect to Gemini... : {e}")
         raise ValueError(f"Failed to connect to Gemini")
 
-llm = get_llm()
+# Total characters of article text web_search_tool returns for one query
+RESEARCH_MAX_CHARS = int(os.getenv("RESEARCH_MAX_CHARS", "15000"))
 
 @tool
 def web_search_tool(query: str) -> str:
     """A tool to search the web for current information."""
-    try:
-        max_results= 5
-        logger.info(f"Web Search Tool: searching for: {query}")
-        results_txt = ""
+    with span("web_search_tool", query=query):
+        try:
+            max_results= 5
+            logger.info(f"Web Search Tool: searching for: {query}")
+            results_txt = ""
 
-        with DDGS() as ddgs:
-            results = [r for r in ddgs.text(query=query, max_results=max_results)]
+            results = search_web(query, max_results)
         
-        if not results:
-            return "No results found for your query"
+            if not results:
+                return "No results found for your query"
         
-        logger.info(f"Web search Tool: Retrieved {len(results)} search results.")
-        articles = []
-
-        for i, result in enumerate(results, 1):
-            title = result.get("title", "No title")
-            link = result.get("href", None)
-            snippet = result.get("body", "")
-            if not link:
-                continue
-
-            logger.info(f"Fetching article {i}: {title} ({link})")
-
-            try:
-                response = requests.get(link, timeout=8)
-                soup = BeautifulSoup(response.text, "html.parser")
-
-                paragraphs = [p.get_text() for p in soup.find_all("p")]
-                article_text = "\n".join(paragraphs[:-1])
-
+            logger.info(f"Web search Tool: Retrieved {len(results)} search results.")
+            links = [result["href"] for result in results if result.get("href")]
+            logger.info(f"Fetching {len(links)} articles concurrently")
+            fetched = fetch_articles(links)
+            articles = []
+            budget = RESEARCH_MAX_CHARS
+
+            for result in results:
+                title = result.get("title", "No title")
+                link = result.get("href", None)
+                article_text = fetched.get(link)
+                if not article_text:
+                    continue
+                if budget < 200:
+                    break
+                if len(article_text) > budget:
+                    # Keep the tool output within the total budget so it does not flood the LLM context
+                    article_text = article_text[:budget].rsplit("\n", 1)[0]
                 articles.append(f"### {title}\n🔗 {link}\n\n{article_text}\n")
-            except Exception as e:
-                logger.warning(f"Skipping {link}: {e}")
-                continue
+                budget -= len(article_text)
 
-        if not articles:
-            return "No readable articles found from the search results."
+            if not articles:
+                return "No readable articles found from the search results."
         
-        results_text = "\n\n---\n\n".join(articles)
-        logger.info("Web Search Tool: Successfully extracted article content.")
-        return results_text
+            results_text = "\n\n---\n\n".join(articles)
+            logger.info("Web Search Tool: Successfully extracted article content.")
+            return results_text
 
-    except Exception as e:
-        logger.exception(f"Web Search Tool failed: {e}")
-        return f"Error searching the web: {e}"
+        except Exception as e:
+            logger.exception(f"Web Search Tool failed: {e}")
+            return f"Error searching the web: {e}"
 
 
 @tool
 def rag_tool(query: str) -> str:
     """A tool to retrieve relevant context from the Pinecone knowledge base."""
-    try:
-        logger.info(f"RAG Tool: Searching for documents related to the topic: '{query}'...")
-        retrieved_docs = knowledge_base.get_relevant_documents(query)
-        context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+    with span("rag_tool", query=query):
+        try:
+            logger.info(f"RAG Tool: Searching for documents related to the topic: '{query}'...")
+            knowledge_base = get_shared_knowledge_base()
+            if knowledge_base is None:
+                logger.warning("RAG Tool: Knowledge base is unavailable.")
+                return "The knowledge base is currently unavailable. Please proceed without it."
+            retrieved_docs = knowledge_base.invoke(query)
+            context = "\n\n".join([doc.page_content for doc in retrieved_docs])
         
-        if not context:
-            logger.warning("RAG Tool: No relevant information found.")
-            return "No relevant information found in the knowledge base."
+            if not context:
+                logger.warning("RAG Tool: No relevant information found.")
+                return "No relevant information found in the knowledge base."
         
-        logger.info(f"RAG Tool: Successfully retrieved context.")
-        return context
-    except Exception as e:
-        logger.error(f"RAG Tool: Error during retrieval - {e}", exc_info=True)
-        return f"Error retrieving context from knowledge base: {e}. Please proceed without."
+            logger.info(f"RAG Tool: Successfully retrieved context.")
+            return context
+        except Exception as e:
+            logger.error(f"RAG Tool: Error during retrieval - {e}", exc_info=True)
+            return f"Error retrieving context from knowledge base: {e}. Please proceed without."
 
 
 @CrewBase
@@ -125,53 +128,70 @@ class SocialMediaBlog():
         self.agents: List[BaseAgent] = []
         self.tasks: List[Task] = []
 
+    @llm_tier
+    def strong_llm(self) -> LLM:
+        return get_llm(STRONG_LLM_MODEL)
+
+    @llm_tier
+    def fast_llm(self) -> LLM:
+        return get_llm(FAST_LLM_MODEL)
+
+    def task_config(self, name: str, task_agent: Agent) -> dict:
+        """Config of a task; an `llm` tier set on the task overrides the one of its agent"""
+        config = dict(self.tasks_config[name])
+        tier = config.pop("llm", None)
+        if tier:
+            task_agent.llm = getattr(self, tier)() if isinstance(tier, str) else tier
+        return config
+
     @agent
     def research_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["research_agent"],
             tools=[web_search_tool],
-            verbose=True,
-            llm=llm
+            verbose=True
         )
 
     @agent
     def writing_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["writing_agent"],
-            verbose=True,
-            llm=llm
+            verbose=True
         )
 
     @agent
     def summarizing_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["summarizing_agent"],
-            verbose=True,
-            llm=llm
+            verbose=True
         )
 
     @task
     def research_task(self) -> Task:
+        research_agent = self.research_agent()
         return Task(
-            config=self.tasks_config["research_task"],
-            agent=self.research_agent()
+            config=self.task_config("research_task", research_agent),
+            agent=research_agent
                             )
     
     @task
     def writing_task(self) -> Task:
+        writing_agent = self.writing_agent()
         return Task(
-            config=self.tasks_config["writing_task"],
-            agent=self.writing_agent(),
+            config=self.task_config("writing_task", writing_agent),
+            agent=writing_agent,
             depends_on=[self.research_task()],
             run_mode=Process.sequential
         )
 
     @task
     def summarizing_task(self) -> Task:
+        summarizing_agent = self.summarizing_agent()
         return Task(
-            config=self.tasks_config["summarizing_task"],
-            agent=self.summarizing_agent(),
-            output_pydantic_model=BlogOutput,
+            config=self.task_config("summarizing_task", summarizing_agent),
+            agent=summarizing_agent,
+            # Also passed to the LLM as its response schema, since this agent has no tools
+            output_pydantic=BlogOutput,
             depends_on=[self.writing_task()],
             run_mode=Process.sequential
         )
@@ -183,5 +203,26 @@ class SocialMediaBlog():
             tasks=self.tasks,
             process=Process.sequential,
             verbose=True,
-            llm=llm
-        )
\ No newline at end of file
+            llm=self.strong_llm()
+        )
+
+    def resume_crew(self, completed: Dict[str, TaskOutput]) -> Crew:
+        """Crew that runs only the tasks missing from `completed` (task name -> output).
+
+        Completed tasks are not re-run; their outputs reach the remaining tasks
+        as context, as they would in a full sequential run.
+        """
+        tasks = self.crew().tasks
+        remaining = []
+        for position, task in enumerate(tasks):
+            if task.name in completed:
+                task.output = completed[task.name]
+            else:
+                task.context = tasks[:position]
+                remaining.append(task)
+        return Crew(
+            agents=[task.agent for task in remaining],
+            tasks=remaining,
+            process=Process.sequential,
+            verbose=True
+        )
@@ -1,12 +1,9 @@
-# from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
-from langchain_cohere import CohereEmbeddings
-from langchain_pinecone import PineconeVectorStore
-# from pinecone import Pinecone, ServerlessSpec
 from dotenv import load_dotenv
-# from pathlib import Path
+from pathlib import Path
 import logging
 import os
+import threading
+import time
 
 load_dotenv()
 def logger():
@@ -17,92 +14,159 @@ def logger():
 index_name = os.getenv("PINECONE_INDEX")
 logger = logger()
 
-# try:
-
-#     main_directory = Path(__file__).resolve().parent.parent.parent
-#     logger.info(f"Registered the file's directory as: {main_directory}")
-#     pdf_directory = main_directory/"content"
-#     logger.info(f"Registered the pdfs location as : {pdf_directory}")
-#     persist_directory = main_directory/"db"
-#     logger.info(f"Registered the db directory as: {persist_directory}")
-# except Exception as e:
-#     logger.exception("Failed to load the necessary folders")
-
-# try:
-#     loader = DirectoryLoader(pdf_directory,
-#                                     loader_cls=PyPDFLoader,
-#                                     glob="*.pdf")
-#     logger.info("Created the loader")
-# except Exception as e:
-#     logger.exception("Failed to initialize the loader")
-# try:
-#     text_splitter = RecursiveCharacterTextSplitter(chunk_size=50, chunk_overlap=20)
-#     logger.info("Initialized the text splitter")
-# except Exception as e:
-#     logger.exception("Failed to initialize the text splitter")
-
-# try:
-#     pdf_data = loader.load()
-#     logger.info("Successfully loaded the pdf files")
-#     pdf_chunks = text_splitter.split_documents(pdf_data)
-#     logger.info("Successfully created chunks of the loaded data")
-# except Exception as e:
-#     logger.exception("Error in handling of the loaded pdf files")
-
-
-# try:
-#     pc=Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-#     logger.info("Initialized Pinecone")
-#     existing_indexes = pc.list_indexes().names()
-#     logger.info(f"Existing Pinecone indexes: {existing_indexes}")
-
-#     if index_name not in existing_indexes:
-#         logger.info(f"Pinecone index '{index_name}' does not exist. Creating new index...")
-#         pc.create_index(
-#             name=index_name,
-#             dimension=1024,
-#             metric="cosine",
-#             spec=ServerlessSpec(cloud="aws", region='us-east-1')
-#         )
-#         while not pc.describe_index(index_name).status['ready']:
-#             import time
-#             logger.info(f"Waiting for index '{index_name}' to be ready...")
-#             time.sleep(0.5)
-#         logger.info(f"Pinecone index '{index_name}' created and ready.")
-#         logger.info(f"Populating Pinecone index '{index_name}' with {len(pdf_chunks)} documents...")
-#         PineconeVectorStore.from_texts(
-#             [t.page_content for t in pdf_chunks],
-#             embedding=embeddings,
-#             index_name=index_name
-#         )
-#         logger.info(f"Pinecone index '{index_name}' populated successfully.")
-#     else:
-#         logger.info(f"Pinecone index '{index_name}' already exists. Continuing")
-# except Exception as e:
-#     logger.exception("Error accessing Pinecone Index")
+# "pinecone" (remote index) or "local" (memory-mapped index built from content/)
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "pinecone")
+# "cohere" or "hashing" (in-process, no network; only pair it with a local index built the same way)
+EMBEDDINGS_BACKEND = os.getenv("EMBEDDINGS_BACKEND", "cohere")
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "4"))
+main_directory = Path(__file__).resolve().parent.parent.parent
+PDF_DIRECTORY = os.getenv("PDF_DIRECTORY", str(main_directory / "content"))
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", str(main_directory / "db" / "local_index"))
+# Fuse BM25 over the local chunks with the vector results, then re-rank and trim to a token budget
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "10"))
+# Chunk texts BM25 is built from when the vectors are in Pinecone; ingest.py keeps it in step with the index
+PINECONE_CHUNK_FILE = os.getenv("PINECONE_CHUNK_FILE", str(main_directory / "db" / "pinecone_chunks.jsonl"))
+# Hard cap on the retrieved context put in the assistant prompt, whichever retriever is in use
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "800"))
+# Persistent query/document embedding cache; set EMBEDDING_CACHE_DIR="" to disable
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", str(main_directory / "db" / "embedding_cache"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+COHERE_EMBEDDING_MODEL = "embed-english-v3.0"
+# How long to wait before trying again to load a knowledge base that failed to load (e.g. Pinecone unreachable)
+KNOWLEDGE_BASE_RETRY_SECONDS = float(os.getenv("KNOWLEDGE_BASE_RETRY_SECONDS", "30"))
 
-def get_knowledge_base():
+_knowledge_base = None
+_knowledge_base_failed_at = None
+_knowledge_base_lock = threading.Lock()
+
+# Ingestion of the content/ PDFs into the index lives in ingest.py
+
+def with_embedding_cache(embeddings, model):
+    """Wrap embeddings in the persistent cache if one is configured; either way embedding time is recorded"""
+    from .embedding_cache import CachedEmbeddings, TimedEmbeddings, get_store
+
+    if not EMBEDDING_CACHE_DIR:
+        return TimedEmbeddings(embeddings)
+    try:
+        return CachedEmbeddings(embeddings, get_store(EMBEDDING_CACHE_DIR, model, EMBEDDING_CACHE_MAX_ENTRIES))
+    except Exception as e:
+        logger.exception("Failed to open the embedding cache, embedding without it")
+        return TimedEmbeddings(embeddings)
+
+def get_embeddings():
+    if EMBEDDINGS_BACKEND == "hashing":
+        from .local_index import HashingEmbeddings
+        logger.info("Using in-process hashing embeddings")
+        embeddings = HashingEmbeddings()
+        return with_embedding_cache(embeddings, f"hashing-{embeddings.dimensions}")
 
     try:
+        from langchain_cohere import CohereEmbeddings
+
         embeddings = CohereEmbeddings(
-            model="embed-english-v3.0",
+            model=COHERE_EMBEDDING_MODEL,
             cohere_api_key=os.getenv("COHERE_API_KEY")
         )
         logger.info("Successfully created the embedding model")
+        return with_embedding_cache(embeddings, COHERE_EMBEDDING_MODEL)
     except Exception as e:
         logger.exception("Failed to initialize the embedding model")
+        return None
+
+def get_local_knowledge_base(embeddings, k=RETRIEVER_K):
+    from .local_index import LocalVectorIndex, LocalRetriever
+
+    try:
+        if not LocalVectorIndex.exists(LOCAL_INDEX_DIR):
+            logger.error(f"No local index at {LOCAL_INDEX_DIR}. Build it with: python -m src.social_media_blog.ingest --target local")
+            return None
+        return LocalRetriever(index=LocalVectorIndex(LOCAL_INDEX_DIR), embeddings=embeddings, k=k)
+    except Exception as e:
+        logger.exception("Error loading the local index...")
+        return None
+
+def get_vector_knowledge_base(embeddings, k=RETRIEVER_K):
+    if RETRIEVER_BACKEND == "local":
+        return get_local_knowledge_base(embeddings, k)
 
     try:
+        from langchain_pinecone import PineconeVectorStore
+
         knowledge_base = PineconeVectorStore.from_existing_index(
             index_name=index_name,
             embedding=embeddings
-        ).as_retriever()
+        ).as_retriever(search_kwargs={"k": k})
         logger.info(f"Successfully connected to existing Pinecone index '{index_name}'.")
         return knowledge_base
     except Exception as e:
         logger.exception("Error with Pinecone index...")
         return None
 
+def bm25_corpus_path() -> str:
+    """The chunk file ingest.py writes for the configured retriever backend"""
+    from .local_index import LocalVectorIndex
+
+    if RETRIEVER_BACKEND == "local":
+        return str(Path(LOCAL_INDEX_DIR) / LocalVectorIndex.CHUNKS)
+    return PINECONE_CHUNK_FILE
+
+def bm25_corpus_status() -> str:
+    """Whether hybrid retrieval has a chunk file to build its BM25 index from: ready, missing or disabled"""
+    if not HYBRID_RETRIEVAL:
+        return "disabled"
+    return "ready" if Path(bm25_corpus_path()).exists() else "missing"
+
+def get_hybrid_knowledge_base(vector_retriever):
+    from .hybrid import BM25Index, HybridRetriever
+
+    # Without the chunk file the vector candidates are still deduplicated, re-ranked and trimmed,
+    # but keyword matches are lost; /readyz reports the chunk file as missing
+    bm25 = BM25Index.from_chunk_file(bm25_corpus_path())
+    if bm25 is None:
+        logger.error(f"No chunk file at {bm25_corpus_path()}; hybrid retrieval runs without BM25. "
+                     f"Build it with: python -m src.social_media_blog.ingest --target {RETRIEVER_BACKEND}")
+    return HybridRetriever(
+        vector_retriever=vector_retriever,
+        bm25=bm25,
+        candidates=HYBRID_CANDIDATES,
+        max_docs=RETRIEVER_K,
+        token_budget=CONTEXT_TOKEN_BUDGET
+    )
+
+def get_knowledge_base():
+
+    embeddings = get_embeddings()
+    if not HYBRID_RETRIEVAL:
+        return get_vector_knowledge_base(embeddings)
+
+    vector_retriever = get_vector_knowledge_base(embeddings, HYBRID_CANDIDATES)
+    if vector_retriever is None:
+        return None
+    return get_hybrid_knowledge_base(vector_retriever)
+
+def get_shared_knowledge_base():
+    """The process-wide knowledge base, loaded on first use; None while it is unavailable.
+
+    A failed load is retried on a later call, at most every KNOWLEDGE_BASE_RETRY_SECONDS,
+    so a vector store outage degrades retrieval instead of stopping the process.
+    """
+    global _knowledge_base, _knowledge_base_failed_at
+    if _knowledge_base is not None:
+        return _knowledge_base
+    with _knowledge_base_lock:
+        if _knowledge_base is None:
+            if _knowledge_base_failed_at is not None and time.monotonic() - _knowledge_base_failed_at < KNOWLEDGE_BASE_RETRY_SECONDS:
+                return None
+            _knowledge_base = get_knowledge_base()
+            _knowledge_base_failed_at = time.monotonic() if _knowledge_base is None else None
+        return _knowledge_base
+
+def knowledge_base_status() -> str:
+    if _knowledge_base is not None:
+        return "ready"
+    return "not_loaded" if _knowledge_base_failed_at is None else "unavailable"
+
 if __name__ == "__main__":
     knowledge_base = get_knowledge_base()
     logger.info("Knowledge base ready")
@@ -0,0 +1,279 @@
+from typing import Callable, Dict, List, Optional
+from pathlib import Path
+from langchain_core.embeddings import Embeddings
+from .db_handler import logger
+from .telemetry import CACHE_REQUESTS, RETRIEVAL_LATENCY, timed
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+_stores: Dict[str, "EmbeddingStore"] = {}
+_stores_lock = threading.Lock()
+
+
+def normalize_text(text: str) -> str:
+    # Whitespace only: unlike response-cache keys, case and punctuation change the embedding
+    return " ".join(text.split())
+
+
+def embedding_key(kind: str, text: str) -> str:
+    """Key of one embedding; queries and documents are embedded differently (e.g. Cohere input_type)"""
+    return hashlib.sha256(f"{kind}|{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Persistent LRU store of float32 vectors for one embedding model.
+
+    Vectors live in a flat <model>.f32 file, one fixed-size row each; a SQLite
+    index maps keys to rows and tracks last use. Once max_entries is reached the
+    least recently used row is overwritten, so the file never grows past
+    max_entries * dimensions * 4 bytes. Row allocation happens inside a SQLite
+    write transaction, which keeps several worker processes from handing out
+    the same row.
+    """
+
+    def __init__(self, directory: str, model: str, max_entries: int):
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model)
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(directory / f"{slug}.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.dimensions = self._load_dimensions()
+        vectors_path = directory / f"{slug}.f32"
+        vectors_path.touch(exist_ok=True)
+        self._vectors = open(vectors_path, "r+b")
+        logger.info(f"Embedding cache for {model} ready at {directory} ({len(self)} entries, max {max_entries})")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _load_dimensions(self) -> Optional[int]:
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dimensions'").fetchone()
+        return int(row[0]) if row else None
+
+    def _read(self, row: int) -> np.ndarray:
+        size = self.dimensions * 4
+        self._vectors.seek(row * size)
+        return np.frombuffer(self._vectors.read(size), dtype=np.float32)
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            # Another process may have stored the first vector since this one started
+            self.dimensions = self.dimensions or self._load_dimensions()
+            if self.dimensions is None:
+                self.misses += len(keys)
+                CACHE_REQUESTS.labels(cache="embedding", result="miss").inc(len(keys))
+                return found
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, row in self._conn.execute(f"SELECT key, row FROM entries WHERE key IN ({placeholders})", batch):
+                    found[key] = self._read(row)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        CACHE_REQUESTS.labels(cache="embedding", result="hit").inc(len(found))
+        CACHE_REQUESTS.labels(cache="embedding", result="miss").inc(len(keys) - len(found))
+        return found
+
+    def put_many(self, vectors: Dict[str, List[float]]):
+        if not vectors:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._load_dimensions() is None:
+                    self._conn.execute("INSERT INTO meta (name, value) VALUES ('dimensions', ?)", (str(len(next(iter(vectors.values())))),))
+                self.dimensions = self._load_dimensions()
+                count, next_row = self._conn.execute("SELECT COUNT(*), COALESCE(MAX(row) + 1, 0) FROM entries").fetchone()
+                now = time.time()
+                for key, vector in vectors.items():
+                    existing = self._conn.execute("SELECT row FROM entries WHERE key = ?", (key,)).fetchone()
+                    if existing is not None:
+                        row = existing[0]
+                    elif count < self.max_entries:
+                        row, next_row, count = next_row, next_row + 1, count + 1
+                    else:
+                        evicted, row = self._conn.execute("SELECT key, row FROM entries ORDER BY last_used LIMIT 1").fetchone()
+                        self._conn.execute("DELETE FROM entries WHERE key = ?", (evicted,))
+                    self._vectors.seek(row * self.dimensions * 4)
+                    self._vectors.write(np.asarray(vector, dtype=np.float32).tobytes())
+                    self._conn.execute("INSERT OR REPLACE INTO entries (key, row, last_used) VALUES (?, ?, ?)", (key, row, now))
+                # Vectors reach the file before the index rows that point at them become visible
+                self._vectors.flush()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def snapshot(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "model": self.model,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def get_store(directory: str, model: str, max_entries: int) -> EmbeddingStore:
+    """One store per (directory, model) per process, shared by every CachedEmbeddings"""
+    with _stores_lock:
+        key = f"{directory}|{model}"
+        if key not in _stores:
+            _stores[key] = EmbeddingStore(directory, model, max_entries)
+        return _stores[key]
+
+
+def store_stats() -> list:
+    with _stores_lock:
+        stores = list(_stores.values())
+    return [store.snapshot() for store in stores]
+
+
+class LazyEmbeddings(Embeddings):
+    """Embeddings built by factory() on first use, so holding one at import time opens no client or cache.
+
+    The async methods build it in a worker thread. A factory that returns None
+    (provider unavailable) is retried on the next call.
+    """
+
+    def __init__(self, factory: Callable[[], Optional[Embeddings]]):
+        self.factory = factory
+        self._embeddings: Optional[Embeddings] = None
+        self._lock = threading.Lock()
+
+    def _get(self) -> Embeddings:
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    self._embeddings = self.factory()
+        if self._embeddings is None:
+            raise RuntimeError("embeddings are unavailable")
+        return self._embeddings
+
+    async def _aget(self) -> Embeddings:
+        return self._embeddings or await asyncio.to_thread(self._get)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._get().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._get().embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await (await self._aget()).aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await (await self._aget()).aembed_query(text)
+
+
+class TimedEmbeddings(Embeddings):
+    """Embeddings wrapper that records embedding time in RETRIEVAL_LATENCY (queries as embed, documents as embed_documents)"""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with timed(RETRIEVAL_LATENCY, stage="embed_documents"):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with timed(RETRIEVAL_LATENCY, stage="embed"):
+            return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        with timed(RETRIEVAL_LATENCY, stage="embed_documents"):
+            return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with timed(RETRIEVAL_LATENCY, stage="embed"):
+            return await self.embeddings.aembed_query(text)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated query and document texts from an EmbeddingStore.
+
+    Embedding time is recorded like TimedEmbeddings does, except that a query
+    served from the store is recorded as embed_cached. The async methods read
+    and write the store in a worker thread, off the event loop.
+    """
+
+    def __init__(self, embeddings: Embeddings, store: EmbeddingStore):
+        self.embeddings = embeddings
+        self.store = store
+
+    @staticmethod
+    def _observe(stage: str, started: float):
+        RETRIEVAL_LATENCY.labels(stage=stage).observe(time.perf_counter() - started)
+
+    def _lookup(self, kind: str, texts: List[str]) -> tuple:
+        keys = [embedding_key(kind, text) for text in texts]
+        found = self.store.get_many(list(dict.fromkeys(keys)))
+        # Each distinct missing text is embedded once, however often it repeats in the batch
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        return keys, found, missing
+
+    def _finish(self, keys: List[str], found: dict, missing: dict, vectors: Optional[List[List[float]]]) -> List[List[float]]:
+        if missing:
+            computed = dict(zip(missing, vectors))
+            try:
+                self.store.put_many(computed)
+            except Exception:
+                logger.exception("Failed to write to the embedding cache")
+            found.update({key: np.asarray(vector, dtype=np.float32) for key, vector in computed.items()})
+        return [found[key].tolist() for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        keys, found, missing = self._lookup("document", texts)
+        vectors = self.embeddings.embed_documents(list(missing.values())) if missing else None
+        result = self._finish(keys, found, missing, vectors)
+        self._observe("embed_documents", started)
+        return result
+
+    def embed_query(self, text: str) -> List[float]:
+        started = time.perf_counter()
+        keys, found, missing = self._lookup("query", [text])
+        vectors = [self.embeddings.embed_query(text)] if missing else None
+        result = self._finish(keys, found, missing, vectors)[0]
+        self._observe("embed" if missing else "embed_cached", started)
+        return result
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        keys, found, missing = await asyncio.to_thread(self._lookup, "document", texts)
+        vectors = await self.embeddings.aembed_documents(list(missing.values())) if missing else None
+        result = await asyncio.to_thread(self._finish, keys, found, missing, vectors)
+        self._observe("embed_documents", started)
+        return result
+
+    async def aembed_query(self, text: str) -> List[float]:
+        started = time.perf_counter()
+        keys, found, missing = await asyncio.to_thread(self._lookup, "query", [text])
+        vectors = [await self.embeddings.aembed_query(text)] if missing else None
+        result = (await asyncio.to_thread(self._finish, keys, found, missing, vectors))[0]
+        self._observe("embed" if missing else "embed_cached", started)
+        return result
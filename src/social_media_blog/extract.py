@@ -0,0 +1,98 @@
+from bs4 import BeautifulSoup
+from .db_handler import logger
+import os
+import re
+
+# Per-article character budget for the text handed to the research agent
+ARTICLE_MAX_CHARS = int(os.getenv("ARTICLE_MAX_CHARS", "4000"))
+# Paragraphs shorter than this are mostly captions, bylines and buttons
+MIN_PARAGRAPH_CHARS = int(os.getenv("MIN_PARAGRAPH_CHARS", "40"))
+
+BOILERPLATE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "figure", "svg", "iframe"]
+BOILERPLATE_TEXT = re.compile(
+    r"(cookie|subscribe|newsletter|sign up|log in|all rights reserved|advertisement|share this|"
+    r"read more|related articles|privacy policy|terms of (use|service))",
+    re.IGNORECASE
+)
+WHITESPACE = re.compile(r"\s+")
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+
+def _paragraphs_selectolax(html: str) -> list:
+    tree = HTMLParser(html)
+    for node in tree.css(",".join(BOILERPLATE_TAGS)):
+        node.decompose()
+    return [node.text(separator=" ") for node in tree.css("p")]
+
+
+def _paragraphs_lxml(html: str) -> list:
+    try:
+        doc = lxml.html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        return []
+    etree.strip_elements(doc, *BOILERPLATE_TAGS, with_tail=False)
+    return [p.text_content() for p in doc.iter("p")]
+
+
+def _paragraphs_bs4(html: str) -> list:
+    soup = BeautifulSoup(html, "html.parser")
+    for node in soup.find_all(BOILERPLATE_TAGS):
+        node.decompose()
+    return [p.get_text(" ") for p in soup.find_all("p")]
+
+
+PARAGRAPH_EXTRACTORS = {"html.parser": _paragraphs_bs4}
+if lxml is not None:
+    PARAGRAPH_EXTRACTORS["lxml"] = _paragraphs_lxml
+if HTMLParser is not None:
+    PARAGRAPH_EXTRACTORS["selectolax"] = _paragraphs_selectolax
+
+# Fastest available parser unless HTML_PARSER picks one explicitly
+PARSER = os.getenv("HTML_PARSER") or next(
+    name for name in ("selectolax", "lxml", "html.parser") if name in PARAGRAPH_EXTRACTORS
+)
+logger.info(f"Article extraction using the {PARSER} parser")
+
+
+def clean_paragraphs(paragraphs: list) -> list:
+    """Normalize whitespace and drop short, boilerplate and repeated paragraphs"""
+    seen = set()
+    kept = []
+    for paragraph in paragraphs:
+        text = WHITESPACE.sub(" ", paragraph).strip()
+        if len(text) < MIN_PARAGRAPH_CHARS or text in seen:
+            continue
+        if len(text) < 200 and BOILERPLATE_TEXT.search(text):
+            continue
+        seen.add(text)
+        kept.append(text)
+    return kept
+
+
+def truncate(paragraphs: list, max_chars: int) -> str:
+    """Join paragraphs up to max_chars, cutting at a paragraph boundary where possible"""
+    out = []
+    used = 0
+    for paragraph in paragraphs:
+        if used + len(paragraph) > max_chars:
+            if not out:
+                out.append(paragraph[:max_chars].rsplit(" ", 1)[0])
+            break
+        out.append(paragraph)
+        used += len(paragraph) + 1
+    return "\n".join(out)
+
+
+def extract_text(html: str, max_chars: int = ARTICLE_MAX_CHARS, parser: str = PARSER) -> str:
+    """Main readable text of an HTML page, within a character budget"""
+    return truncate(clean_paragraphs(PARAGRAPH_EXTRACTORS[parser](html)), max_chars)
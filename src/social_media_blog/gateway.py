@@ -0,0 +1,317 @@
+from typing import Any, AsyncIterator, Dict, List, Optional
+from contextlib import asynccontextmanager
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.messages.ai import add_usage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from .db_handler import logger
+from .telemetry import LLM_LATENCY, LLM_TOKENS
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+
+# Per-attempt timeout; a provider that does not answer in time is skipped for the next one
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_PROVIDER_CONCURRENCY = int(os.getenv("LLM_PROVIDER_CONCURRENCY", "8"))
+# Seconds to wait on the first provider before racing the second one; 0 disables hedging
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "0"))
+# After this many consecutive failures a provider is tried after the healthy ones for LLM_COOLDOWN seconds
+LLM_FAILURE_THRESHOLD = int(os.getenv("LLM_FAILURE_THRESHOLD", "3"))
+LLM_COOLDOWN = float(os.getenv("LLM_COOLDOWN", "30"))
+# Latency samples older than this are dropped so a provider that was slow once gets measured again
+LLM_LATENCY_TTL = float(os.getenv("LLM_LATENCY_TTL", "60"))
+# Ordered provider names: groq, gemini, or groq@<base url> for any Groq/OpenAI-compatible server
+CHAT_PROVIDERS = [p.strip() for p in os.getenv("CHAT_PROVIDERS", "groq,gemini").split(",") if p.strip()]
+GEMINI_CHAT_MODEL = os.getenv("GEMINI_CHAT_MODEL", "gemini-2.5-flash")
+# Weight of the newest sample in the moving latency average
+LATENCY_ALPHA = 0.3
+
+_providers: Dict[str, "Provider"] = {}
+_http_clients: Optional[tuple] = None
+_lock = threading.Lock()
+
+
+def get_http_clients() -> tuple:
+    """Keep-alive HTTP clients shared by every provider that accepts one"""
+    global _http_clients
+    with _lock:
+        if _http_clients is None:
+            limits = httpx.Limits(max_connections=LLM_PROVIDER_CONCURRENCY * 4, max_keepalive_connections=LLM_PROVIDER_CONCURRENCY * 2)
+            _http_clients = (httpx.Client(limits=limits), httpx.AsyncClient(limits=limits))
+        return _http_clients
+
+
+class Provider:
+    """One chat model behind the gateway, with its concurrency limit and health/latency stats"""
+
+    def __init__(self, name: str, model: BaseChatModel, limit: int = LLM_PROVIDER_CONCURRENCY, cooldown: float = LLM_COOLDOWN):
+        self.name = name
+        self.model = model
+        self.limit = limit
+        self.cooldown = cooldown
+        self.latency: Optional[float] = None
+        self.latency_at = 0.0
+        self.inflight = 0
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def rank(self) -> tuple:
+        # Healthy before cooling down, free before saturated, then fastest; providers without
+        # a sample yet sort first so each one gets measured
+        now = time.monotonic()
+        latency = self.latency if self.latency is not None and now - self.latency_at < LLM_LATENCY_TTL else 0.0
+        return (now < self.cooldown_until, self.inflight >= self.limit, latency)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        async with self._semaphore:
+            self.inflight += 1
+            try:
+                yield
+            finally:
+                self.inflight -= 1
+
+    def record_success(self, seconds: float):
+        LLM_LATENCY.labels(model=self.name, outcome="success").observe(seconds)
+        self.calls += 1
+        now = time.monotonic()
+        if self.latency is None or now - self.latency_at >= LLM_LATENCY_TTL:
+            self.latency = seconds
+        else:
+            self.latency = LATENCY_ALPHA * seconds + (1 - LATENCY_ALPHA) * self.latency
+        self.latency_at = now
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def record_failure(self, seconds: float):
+        LLM_LATENCY.labels(model=self.name, outcome="error").observe(seconds)
+        self.calls += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= LLM_FAILURE_THRESHOLD:
+            self.cooldown_until = time.monotonic() + self.cooldown
+
+    def record_usage(self, usage: Optional[dict]):
+        """Count and log the token usage the provider reported for a call, if it reported any"""
+        if not usage:
+            return
+        prompt, completion = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self.cached_tokens += cached
+        LLM_TOKENS.labels(model=self.name, kind="prompt").inc(prompt)
+        LLM_TOKENS.labels(model=self.name, kind="completion").inc(completion)
+        LLM_TOKENS.labels(model=self.name, kind="cached").inc(cached)
+        logger.info(f"LLM provider '{self.name}': {prompt} prompt tokens ({cached} cached), {completion} completion tokens")
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "inflight": self.inflight,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "cooling_down": time.monotonic() < self.cooldown_until,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+def build_provider(name: str) -> Provider:
+    if name == "groq" or name.startswith("groq@"):
+        from langchain_groq import ChatGroq
+
+        http_client, http_async_client = get_http_clients()
+        model = ChatGroq(
+            model=os.getenv("GROQ_MODEL"),
+            api_key=os.getenv("GROQ_API_KEY"),
+            base_url=name.partition("@")[2] or None,
+            temperature=0.7,
+            timeout=LLM_TIMEOUT,
+            # Retries are the gateway's job: it moves on to the next provider instead
+            max_retries=0,
+            http_client=http_client,
+            http_async_client=http_async_client
+        )
+    elif name == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        model = ChatGoogleGenerativeAI(
+            model=GEMINI_CHAT_MODEL,
+            google_api_key=os.getenv("GOOGLE_API_KEY"),
+            temperature=0.5,
+            timeout=LLM_TIMEOUT,
+            max_retries=0
+        )
+    else:
+        raise ValueError(f"Unknown LLM provider '{name}'")
+    logger.info(f"LLM provider '{name}' ready")
+    return Provider(name, model)
+
+
+def get_provider(name: str) -> Provider:
+    """Providers are created once per process so every chain shares their clients and stats"""
+    with _lock:
+        provider = _providers.get(name)
+    if provider is None:
+        provider = build_provider(name)
+        with _lock:
+            provider = _providers.setdefault(name, provider)
+    return provider
+
+
+def provider_stats() -> dict:
+    with _lock:
+        providers = dict(_providers)
+    return {name: provider.snapshot() for name, provider in providers.items()}
+
+
+class GatewayChatModel(BaseChatModel):
+    """Chat model that spreads calls over several providers.
+
+    Each call goes to the best-ranked provider (healthy, not at its concurrency
+    limit, lowest moving-average latency) and falls back down the list on errors
+    or timeouts. With a hedge_delay, a call still unanswered after that many
+    seconds is also sent to the next provider and the first answer wins.
+    Streaming falls back only until the first chunk has been emitted.
+    """
+
+    providers: List[Any]
+    timeout: float = LLM_TIMEOUT
+    hedge_delay: float = 0.0
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @property
+    def _llm_type(self) -> str:
+        return "gateway"
+
+    def _ordered(self) -> List[Provider]:
+        return sorted(self.providers, key=lambda provider: provider.rank())
+
+    async def _call(self, provider: Provider, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs) -> BaseMessage:
+        async with provider.slot():
+            started = time.perf_counter()
+            try:
+                message = await asyncio.wait_for(provider.model.ainvoke(messages, stop=stop, **kwargs), self.timeout)
+            except Exception as e:
+                provider.record_failure(time.perf_counter() - started)
+                logger.warning(f"LLM provider '{provider.name}' failed: {type(e).__name__}: {e}")
+                raise
+            provider.record_success(time.perf_counter() - started)
+            provider.record_usage(getattr(message, "usage_metadata", None))
+            return message
+
+    async def _hedged(self, first: Provider, second: Provider, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs) -> BaseMessage:
+        pending = {asyncio.ensure_future(self._call(first, messages, stop, **kwargs))}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_delay)
+            if done:
+                task = done.pop()
+                if task.exception() is None:
+                    return task.result()
+                pending = set()
+            logger.info(f"Hedging LLM call from '{first.name}' to '{second.name}'")
+            pending.add(asyncio.ensure_future(self._call(second, messages, stop, **kwargs)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs) -> ChatResult:
+        ordered = self._ordered()
+        error = None
+        if self.hedge_delay and len(ordered) > 1:
+            try:
+                message = await self._hedged(ordered[0], ordered[1], messages, stop, **kwargs)
+                return ChatResult(generations=[ChatGeneration(message=message)])
+            except Exception as e:
+                error = e
+            ordered = ordered[2:]
+        for provider in ordered:
+            try:
+                message = await self._call(provider, messages, stop, **kwargs)
+                return ChatResult(generations=[ChatGeneration(message=message)])
+            except Exception as e:
+                error = e
+        raise RuntimeError(f"All LLM providers failed: {error}") from error
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        error = None
+        for provider in self._ordered():
+            emitted = False
+            usage = None
+            started = time.perf_counter()
+            try:
+                async with provider.slot():
+                    started = time.perf_counter()
+                    async for chunk in provider.model.astream(messages, stop=stop, **kwargs):
+                        emitted = True
+                        # Usage arrives on the final chunk or spread over several, so it is summed
+                        if getattr(chunk, "usage_metadata", None):
+                            usage = add_usage(usage, chunk.usage_metadata)
+                        if run_manager:
+                            await run_manager.on_llm_new_token(chunk.content, chunk=chunk)
+                        yield ChatGenerationChunk(message=chunk)
+                    provider.record_success(time.perf_counter() - started)
+                    provider.record_usage(usage)
+                    return
+            except Exception as e:
+                provider.record_failure(time.perf_counter() - started)
+                logger.warning(f"LLM provider '{provider.name}' failed while streaming: {type(e).__name__}: {e}")
+                if emitted:
+                    raise
+                error = e
+        raise RuntimeError(f"All LLM providers failed: {error}") from error
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs) -> ChatResult:
+        error = None
+        for provider in self._ordered():
+            started = time.perf_counter()
+            try:
+                message = provider.model.invoke(messages, stop=stop, **kwargs)
+            except Exception as e:
+                provider.record_failure(time.perf_counter() - started)
+                logger.warning(f"LLM provider '{provider.name}' failed: {type(e).__name__}: {e}")
+                error = e
+                continue
+            provider.record_success(time.perf_counter() - started)
+            provider.record_usage(getattr(message, "usage_metadata", None))
+            return ChatResult(generations=[ChatGeneration(message=message)])
+        raise RuntimeError(f"All LLM providers failed: {error}") from error
+
+
+def get_chat_gateway(hedge_delay: float = 0.0) -> GatewayChatModel:
+    """Gateway over CHAT_PROVIDERS; providers that cannot be configured are left out"""
+    providers = []
+    for name in CHAT_PROVIDERS:
+        try:
+            providers.append(get_provider(name))
+        except Exception as e:
+            logger.exception(f"Skipping LLM provider '{name}'")
+    if not providers:
+        raise ValueError(f"No usable LLM provider in CHAT_PROVIDERS={','.join(CHAT_PROVIDERS)}")
+    return GatewayChatModel(providers=providers, hedge_delay=hedge_delay)
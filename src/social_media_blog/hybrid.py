@@ -0,0 +1,154 @@
+from collections import Counter, defaultdict
+from typing import List, Optional
+from pathlib import Path
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from .db_handler import logger
+from .tokens import count_tokens
+from .telemetry import RETRIEVAL_LATENCY, timed
+import hashlib
+import json
+import math
+import re
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me of on or our tell that the this to was what when "
+    "where which who why will with you your".split()
+)
+# Reciprocal rank fusion constant; 60 is the usual choice and is insensitive to score scales
+RRF_K = 60
+
+
+def terms(text: str) -> list:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(" ".join(text.split()).lower().encode("utf-8")).hexdigest()
+
+
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 scoring"""
+
+    def __init__(self, chunks: List[dict], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.lengths = []
+        for position, chunk in enumerate(chunks):
+            counts = Counter(terms(chunk["text"]))
+            self.lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings[term].append((position, frequency))
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        total = len(chunks)
+        self.idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    @classmethod
+    def from_chunk_file(cls, path: str) -> Optional["BM25Index"]:
+        if not Path(path).exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            chunks = [json.loads(line) for line in f]
+        logger.info(f"Built BM25 index over {len(chunks)} chunks from {path}")
+        return cls(chunks)
+
+    def search(self, query: str, k: int) -> List[tuple]:
+        """Return [(chunk, score)] for the k best matching chunks"""
+        scores = defaultdict(float)
+        for term in set(terms(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position, frequency in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / self.average_length)
+                scores[position] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.chunks[position], score) for position, score in best]
+
+
+def select_context(query: str, ranked: List[Document], max_docs: int, token_budget: int) -> List[Document]:
+    """Re-rank fused candidates by query-term coverage and keep what fits the token budget"""
+    query_terms = set(terms(query))
+
+    def coverage(doc: Document) -> float:
+        if not query_terms:
+            return 0.0
+        return len(query_terms & set(terms(doc.page_content))) / len(query_terms)
+
+    # Fusion score decides ties; coverage of the query's terms moves exact matches up
+    scored = sorted(ranked, key=lambda doc: doc.metadata["fusion_score"] * (1 + coverage(doc)), reverse=True)
+    selected = []
+    used = 0
+    for doc in scored:
+        if len(selected) == max_docs:
+            break
+        tokens = count_tokens(doc.page_content)
+        if used + tokens > token_budget:
+            continue
+        selected.append(doc)
+        used += tokens
+    return selected
+
+
+def pack_context(docs: List[Document], token_budget: int) -> str:
+    """Distinct document texts in rank order, as many as fit the token budget, joined for the prompt"""
+    seen, parts, used = set(), [], 0
+    for doc in docs:
+        text = doc.page_content.strip()
+        key = text_key(text)
+        if not text or key in seen:
+            continue
+        seen.add(key)
+        tokens = count_tokens(text)
+        if used + tokens > token_budget:
+            continue
+        parts.append(text)
+        used += tokens
+    if len(parts) < len(docs):
+        logger.info(f"Context packed to {len(parts)} of {len(docs)} documents ({used}/{token_budget} tokens)")
+    return "\n".join(parts)
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuses vector retrieval with BM25 over the local chunks, then deduplicates, re-ranks and trims to a token budget"""
+
+    vector_retriever: BaseRetriever
+    bm25: Optional[BM25Index] = None
+    candidates: int = 10
+    max_docs: int = 4
+    token_budget: int = 800
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _fuse(self, query: str, vector_docs: List[Document]) -> List[Document]:
+        fused = {}
+        with timed(RETRIEVAL_LATENCY, stage="bm25"):
+            lexical = self.bm25.search(query, self.candidates) if self.bm25 is not None else []
+        lexical_docs = [
+            Document(page_content=chunk["text"], metadata=dict(chunk.get("metadata", {})))
+            for chunk, _ in lexical
+        ]
+        for ranking in (vector_docs, lexical_docs):
+            for rank, doc in enumerate(ranking):
+                key = text_key(doc.page_content)
+                if key not in fused:
+                    fused[key] = Document(page_content=doc.page_content, metadata={**doc.metadata, "fusion_score": 0.0})
+                fused[key].metadata["fusion_score"] += 1.0 / (RRF_K + rank + 1)
+        return select_context(query, list(fused.values()), self.max_docs, self.token_budget)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        with timed(RETRIEVAL_LATENCY, stage="vector"):
+            vector_docs = self.vector_retriever.invoke(query)
+        return self._fuse(query, vector_docs)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        with timed(RETRIEVAL_LATENCY, stage="vector"):
+            vector_docs = await self.vector_retriever.ainvoke(query)
+        return self._fuse(query, vector_docs)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from .db_handler import logger, get_embeddings, index_name, main_directory, PDF_DIRECTORY, LOCAL_INDEX_DIR, PINECONE_CHUNK_FILE, RETRIEVER_BACKEND
+from .local_index import LocalVectorIndex
+from .tokens import count_tokens
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "400"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "60"))
+# Cohere accepts at most 96 texts per embedding request
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "96"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+UPSERT_BATCH_SIZE = 100
+WHITESPACE = re.compile(r"[^\S\n]+")
+BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source: str, text: str) -> str:
+    return hashlib.sha256(f"{source}|{text}".encode("utf-8")).hexdigest()[:32]
+
+
+def parse_pdf(path: str) -> tuple:
+    """Extract page texts from one PDF. Runs in a worker process."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    pages = []
+    for page in reader.pages:
+        # Plain mode emits some of these PDFs one word per line, which wastes prompt tokens
+        text = page.extract_text(extraction_mode="layout") or ""
+        text = "\n".join(WHITESPACE.sub(" ", line).strip() for line in text.splitlines())
+        pages.append(BLANK_LINES.sub("\n\n", text).strip())
+    return Path(path).name, pages
+
+
+def split_pages(source: str, pages: list) -> list:
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_TOKENS,
+        chunk_overlap=CHUNK_OVERLAP_TOKENS,
+        length_function=count_tokens
+    )
+    chunks = []
+    for page_number, text in enumerate(pages):
+        for piece in splitter.split_text(text):
+            chunks.append({
+                "id": chunk_id(source, piece),
+                "text": piece,
+                "metadata": {"source": source, "page": page_number}
+            })
+    return chunks
+
+
+def embed_with_retry(embeddings, texts: list) -> list:
+    for attempt in range(1, EMBED_MAX_RETRIES + 1):
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception as e:
+            if attempt == EMBED_MAX_RETRIES:
+                raise
+            delay = min(30, 2 ** attempt)
+            logger.warning(f"Embedding batch failed (attempt {attempt}/{EMBED_MAX_RETRIES}): {e}. Retrying in {delay}s")
+            time.sleep(delay)
+
+
+def embed_chunks(embeddings, chunks: list) -> np.ndarray:
+    vectors = []
+    for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+        batch = chunks[start:start + EMBED_BATCH_SIZE]
+        vectors.extend(embed_with_retry(embeddings, [chunk["text"] for chunk in batch]))
+        logger.info(f"Embedded {min(start + EMBED_BATCH_SIZE, len(chunks))}/{len(chunks)} chunks")
+    return np.asarray(vectors, dtype=np.float32).reshape(len(chunks), -1)
+
+
+class LocalTarget:
+    """Writes chunks into the memory-mapped local index, reusing vectors of unchanged chunks"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.existing = {}
+        if LocalVectorIndex.exists(directory):
+            index = LocalVectorIndex(directory)
+            self.existing = {chunk["id"]: (chunk, index.vectors[row]) for row, chunk in enumerate(index.chunks) if "id" in chunk}
+
+    def known_ids(self) -> set:
+        return set(self.existing)
+
+    def commit(self, keep_ids: set, new_chunks: list, new_vectors: np.ndarray):
+        # Chunks embedded again (all of them with --force) replace their stored copies
+        keep_ids = keep_ids - {chunk["id"] for chunk in new_chunks}
+        chunks = [self.existing[i][0] for i in self.existing if i in keep_ids]
+        vectors = [self.existing[i][1] for i in self.existing if i in keep_ids]
+        chunks.extend(new_chunks)
+        vectors.extend(new_vectors)
+        dimensions = len(vectors[0]) if vectors else 0
+        LocalVectorIndex.write(self.directory, np.asarray(vectors, dtype=np.float32).reshape(len(chunks), dimensions), chunks)
+
+
+class PineconeTarget:
+    """Upserts chunks into the Pinecone index in the layout langchain_pinecone reads (text in metadata).
+
+    The chunk texts are also kept in chunk_file, in the local index's format, for the
+    BM25 side of hybrid retrieval.
+    """
+
+    def __init__(self, manifest: dict, chunk_file: str = PINECONE_CHUNK_FILE):
+        from pinecone import Pinecone
+
+        self.index = Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(index_name)
+        self.manifest = manifest
+        # Read before ingest() updates the manifest, so chunks of changed and removed PDFs can be deleted
+        self.indexed_ids = {i for entry in manifest.values() for i in entry.get("chunk_ids", [])}
+        self.chunk_file = Path(chunk_file)
+        self.existing = {}
+        if self.chunk_file.exists():
+            with open(self.chunk_file, "r", encoding="utf-8") as f:
+                self.existing = {chunk["id"]: chunk for chunk in map(json.loads, f)}
+
+    def known_ids(self) -> set:
+        # A chunk missing from the chunk file is embedded again so its text gets written there too
+        return self.indexed_ids & set(self.existing)
+
+    def commit(self, keep_ids: set, new_chunks: list, new_vectors: np.ndarray):
+        stale = list(self.indexed_ids - keep_ids)
+        for start in range(0, len(stale), 1000):
+            self.index.delete(ids=stale[start:start + 1000])
+        records = [
+            {"id": chunk["id"], "values": vector.tolist(), "metadata": {**chunk["metadata"], "text": chunk["text"]}}
+            for chunk, vector in zip(new_chunks, new_vectors)
+        ]
+        for start in range(0, len(records), UPSERT_BATCH_SIZE):
+            self.index.upsert(vectors=records[start:start + UPSERT_BATCH_SIZE])
+        logger.info(f"Pinecone: upserted {len(records)} chunks, deleted {len(stale)}")
+
+        new_ids = {chunk["id"] for chunk in new_chunks}
+        chunks = [chunk for i, chunk in self.existing.items() if i in keep_ids and i not in new_ids]
+        chunks.extend(new_chunks)
+        self.chunk_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.chunk_file.with_name(f"{self.chunk_file.name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(json.dumps(chunk) + "\n")
+        tmp.replace(self.chunk_file)
+        logger.info(f"Wrote {len(chunks)} chunks to {self.chunk_file}")
+
+
+def ingest(pdf_directory: str, target: str, workers: int = None, force: bool = False) -> dict:
+    """Parse, chunk and embed the PDFs that changed since the last run and update the target index."""
+    started = time.perf_counter()
+    # The local manifest lives next to the index it describes
+    manifest_path = Path(LOCAL_INDEX_DIR) / "manifest.json" if target == "local" else main_directory / "db" / "ingest_manifest_pinecone.json"
+    manifest = {} if force or not manifest_path.exists() else json.loads(manifest_path.read_text())
+    store = LocalTarget(LOCAL_INDEX_DIR) if target == "local" else PineconeTarget(manifest)
+    if target == "pinecone" and manifest and not store.chunk_file.exists():
+        # An index built before the chunk file was kept is ingested again once, so BM25 covers all of it
+        logger.warning(f"No chunk file at {store.chunk_file}, re-ingesting every PDF")
+        force, manifest = True, {}
+
+    pdfs = {path.name: path for path in sorted(Path(pdf_directory).glob("*.pdf"))}
+    hashes = {name: file_hash(path) for name, path in pdfs.items()}
+    changed = [name for name in pdfs if manifest.get(name, {}).get("hash") != hashes[name]]
+    removed = [name for name in manifest if name not in pdfs]
+    logger.info(f"{len(pdfs)} PDFs: {len(changed)} new or changed, {len(removed)} removed")
+
+    known_ids = set() if force else store.known_ids()
+
+    pages = 0
+    all_chunks = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for source, page_texts in pool.map(parse_pdf, [str(pdfs[name]) for name in changed]):
+            pages += len(page_texts)
+            chunks = split_pages(source, page_texts)
+            manifest[source] = {"hash": hashes[source], "chunk_ids": [chunk["id"] for chunk in chunks]}
+            all_chunks.extend(chunks)
+    parsed = time.perf_counter()
+
+    for name in removed:
+        manifest.pop(name, None)
+    keep_ids = {i for entry in manifest.values() for i in entry["chunk_ids"]}
+    # Chunks whose text is unchanged keep their existing vectors
+    new_chunks = list({chunk["id"]: chunk for chunk in all_chunks if chunk["id"] not in known_ids}.values())
+    vectors = embed_chunks(get_embeddings(), new_chunks) if new_chunks else np.zeros((0, 0), dtype=np.float32)
+    embedded = time.perf_counter()
+
+    if changed or removed or force:
+        store.commit(keep_ids, new_chunks, vectors)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "files_changed": len(changed),
+        "files_removed": len(removed),
+        "pages": pages,
+        "chunks": len(all_chunks),
+        "chunks_embedded": len(new_chunks),
+        "parse_seconds": round(parsed - started, 2),
+        "embed_seconds": round(embedded - parsed, 2),
+        "total_seconds": round(elapsed, 2),
+        "pages_per_second": round(pages / (parsed - started), 1) if pages else 0.0,
+        "chunks_per_second": round(len(new_chunks) / (embedded - parsed), 1) if new_chunks else 0.0,
+    }
+    logger.info(f"Ingestion finished: {report}")
+    return report
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Ingest the content/ PDFs into the knowledge base index")
+    parser.add_argument("--target", choices=["local", "pinecone"], default=RETRIEVER_BACKEND)
+    parser.add_argument("--pdf-directory", default=PDF_DIRECTORY)
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="re-parse and re-embed everything")
+    args = parser.parse_args()
+    print(json.dumps(ingest(args.pdf_directory, args.target, args.workers, args.force), indent=2))
+
+
+if __name__ == "__main__":
+    run()
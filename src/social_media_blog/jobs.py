@@ -0,0 +1,161 @@
+from typing import Awaitable, Callable, Optional
+from pathlib import Path
+from .db_handler import logger
+from .chat_models import BlogResponse
+from .cache import normalize_query
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import uuid
+
+
+def job_key(topic: str, tone: str) -> str:
+    """Deduplication key for a (topic, tone) request"""
+    return hashlib.sha256(f"{normalize_query(topic)}|{tone}".encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """SQLite-backed persistence for blog generation jobs.
+
+    A succeeded job is handed out again for the same request only while it is
+    younger than max_age, the same freshness window as the blog cache.
+    """
+
+    def __init__(self, path: str, max_age: float = float("inf")):
+        self.max_age = max_age
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    dedup_key TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    tone TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    force_refresh INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            # Job databases created before force_refresh existed get the column with its default
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "force_refresh" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN force_refresh INTEGER NOT NULL DEFAULT 0")
+                logger.info("Added the force_refresh column to the jobs table")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedup_key ON jobs (dedup_key, created_at)")
+        logger.info(f"Job store ready at {path}")
+
+    def create(self, topic: str, tone: str, force_refresh: bool = False) -> dict:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, dedup_key, topic, tone, status, force_refresh, created_at, updated_at) VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, job_key(topic, tone), topic, tone, int(force_refresh), now, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def find_reusable(self, topic: str, tone: str) -> Optional[dict]:
+        """Latest job for the same request that is pending or succeeded within max_age"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE dedup_key = ? AND (status IN ('queued', 'running') OR "
+                "(status = 'succeeded' AND updated_at >= ?)) ORDER BY created_at DESC LIMIT 1",
+                (job_key(topic, tone), time.time() - self.max_age)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def update(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id)
+            )
+
+    def unfinished(self) -> list:
+        """Jobs left queued or running, e.g. by a restart, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+
+class JobQueue:
+    """Runs queued jobs on a fixed number of asyncio workers"""
+
+    def __init__(self, store: JobStore, runner: Callable[..., Awaitable[BlogResponse]], workers: int = 2):
+        self.store = store
+        self.runner = runner
+        self.workers = max(1, workers)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: list = []
+
+    async def start(self):
+        for job_id in self.store.unfinished():
+            self.store.update(job_id, "queued")
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Job queue started with {self.workers} workers ({self._queue.qsize()} resumed)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def reusable(self, topic: str, tone: str, force_refresh: bool = False) -> Optional[dict]:
+        """The existing job a submission would be answered with; a forced refresh only joins a pending one"""
+        existing = self.store.find_reusable(topic, tone)
+        if existing is not None and (existing["status"] != "succeeded" or not force_refresh):
+            return existing
+        return None
+
+    def submit(self, topic: str, tone: str, force_refresh: bool = False) -> tuple:
+        """Queue a job, or return the existing one for the same request. Returns (job, deduplicated)."""
+        existing = self.reusable(topic, tone, force_refresh)
+        if existing is not None:
+            logger.info(f"Reusing job {existing['id']} ({existing['status']}) for topic '{topic}'")
+            return existing, True
+        job = self.store.create(topic, tone, force_refresh=force_refresh)
+        self._queue.put_nowait(job["id"])
+        logger.info(f"Queued job {job['id']} for topic '{topic}'")
+        return job, False
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.store.get(job_id)
+                if job is None or job["status"] not in ("queued", "running"):
+                    continue
+                self.store.update(job_id, "running")
+                logger.info(f"Job worker {worker_id} running job {job_id}")
+                result = await self.runner(job["topic"], job["tone"], force_refresh=bool(job["force_refresh"]))
+                if result.status == "success":
+                    self.store.update(job_id, "succeeded", result=result.model_dump_json())
+                else:
+                    self.store.update(job_id, "failed", result=result.model_dump_json(), error=result.meta_description)
+                logger.info(f"Job {job_id} finished with status '{result.status}'")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Job {job_id} failed")
+                self.store.update(job_id, "failed", error=str(e))
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,110 @@
+from typing import Optional
+from pydantic import ValidationError
+from .chat_models import BlogOutput
+from .db_handler import logger
+from .telemetry import JSON_PARSE_FAILURES
+import json
+
+CLOSERS = {"{": "}", "[": "]"}
+# Keys models sometimes use instead of the BlogOutput field names
+FIELD_ALIASES = {"content": "blog_post", "body": "blog_post", "preview": "blog_preview", "description": "meta_description"}
+
+
+def repair_json(text: str) -> Optional[str]:
+    """Best-effort repair of the first JSON object in an LLM reply.
+
+    Scans the text once, keeping track of strings and open brackets, and
+    - skips anything before the first '{' (prose, ```json fences),
+    - stops after the object closes (trailing fences or commentary),
+    - escapes raw newlines and tabs inside strings,
+    - drops trailing commas before a closing bracket,
+    - closes an unterminated string and any brackets left open by a truncated reply.
+    Returns None when there is no object to repair.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+    out = []
+    stack = []
+    in_string = False
+    escaped = False
+    for char in text[start:]:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char == "\n":
+                char = "\\n"
+            elif char == "\r":
+                char = "\\r"
+            elif char == "\t":
+                char = "\\t"
+            out.append(char)
+            continue
+        if char == '"':
+            in_string = True
+        elif char in CLOSERS:
+            stack.append(CLOSERS[char])
+        elif char in "}]":
+            if not stack or stack[-1] != char:
+                continue
+            # A trailing comma is invalid JSON but common in model output
+            while out and out[-1] in " \n\r\t":
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            stack.pop()
+            out.append(char)
+            if not stack:
+                break
+            continue
+        out.append(char)
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    while stack:
+        while out and out[-1] in " \n\r\t,":
+            out.pop()
+        if out and out[-1] == ":":
+            out.append('""')
+        out.append(stack.pop())
+    return "".join(out)
+
+
+def parse_blog_output(raw: str) -> Optional[BlogOutput]:
+    """BlogOutput from the summarizing stage's raw reply, repairing it if needed; None if it can't be used"""
+    if not raw or not raw.strip():
+        JSON_PARSE_FAILURES.labels(reason="empty").inc()
+        return None
+    candidates = [raw.strip()]
+    repaired = repair_json(raw)
+    if repaired is not None and repaired != candidates[0]:
+        candidates.append(repaired)
+    for candidate in candidates:
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(data, dict):
+            continue
+        for alias, field in FIELD_ALIASES.items():
+            if alias in data and field not in data:
+                data[field] = data.pop(alias)
+        try:
+            output = BlogOutput.model_validate(data)
+        except ValidationError as e:
+            logger.warning(f"Summarizing output is JSON but not a valid BlogOutput: {e.errors()[:3]}")
+            JSON_PARSE_FAILURES.labels(reason="invalid_schema").inc()
+            return None
+        if not output.title.strip() or not output.blog_post.strip():
+            logger.warning("Summarizing output has an empty title or blog post")
+            JSON_PARSE_FAILURES.labels(reason="empty_fields").inc()
+            return None
+        return output
+    logger.warning(f"Summarizing output could not be repaired into JSON: {raw[:80]!r}...")
+    JSON_PARSE_FAILURES.labels(reason="invalid_json").inc()
+    return None
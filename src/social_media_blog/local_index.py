@@ -0,0 +1,125 @@
+from typing import List
+from pathlib import Path
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from .db_handler import logger
+from .telemetry import RETRIEVAL_LATENCY, timed
+import hashlib
+import json
+import re
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic in-process embeddings (signed feature hashing of words and word pairs).
+
+    Much weaker than a trained model, but needs no network, which makes it
+    useful for offline tests and benchmarks of the local index.
+    """
+
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        words = TOKEN_PATTERN.findall(text.lower())
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimensions] += 1.0 if value & (1 << 63) else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class LocalVectorIndex:
+    """Flat cosine-similarity index stored as a float32 .npy matrix plus a JSONL chunk file.
+
+    The matrix is memory-mapped read-only, so several workers share one copy
+    through the page cache and startup does not read the whole file.
+    """
+
+    VECTORS = "vectors.npy"
+    CHUNKS = "chunks.jsonl"
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.vectors = np.load(self.directory / self.VECTORS, mmap_mode="r")
+        with open(self.directory / self.CHUNKS, "r", encoding="utf-8") as f:
+            self.chunks = [json.loads(line) for line in f]
+        if len(self.chunks) != self.vectors.shape[0]:
+            raise ValueError(f"Local index at {directory} is inconsistent: {len(self.chunks)} chunks, {self.vectors.shape[0]} vectors")
+        logger.info(f"Loaded local index with {len(self.chunks)} chunks from {directory}")
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return (Path(directory) / LocalVectorIndex.VECTORS).exists() and (Path(directory) / LocalVectorIndex.CHUNKS).exists()
+
+    @classmethod
+    def write(cls, directory: str, vectors: np.ndarray, chunks: List[dict]):
+        """Write an index atomically (new files are moved into place once complete)"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        with open(directory / f"{cls.VECTORS}.tmp", "wb") as f:
+            np.save(f, vectors)
+        with open(directory / f"{cls.CHUNKS}.tmp", "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(json.dumps(chunk) + "\n")
+        (directory / f"{cls.VECTORS}.tmp").replace(directory / cls.VECTORS)
+        (directory / f"{cls.CHUNKS}.tmp").replace(directory / cls.CHUNKS)
+        logger.info(f"Wrote local index with {len(chunks)} chunks to {directory}")
+
+    def search(self, vector, k: int = 4) -> List[tuple]:
+        """Return [(chunk, score)] for the k most similar chunks"""
+        if not self.chunks:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.chunks[i], float(scores[i])) for i in top]
+
+
+class LocalRetriever(BaseRetriever):
+    """LangChain retriever over a LocalVectorIndex"""
+
+    index: LocalVectorIndex
+    embeddings: Embeddings
+    k: int = 4
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _to_documents(self, results: List[tuple]) -> List[Document]:
+        return [
+            Document(page_content=chunk["text"], metadata={**chunk.get("metadata", {}), "score": score})
+            for chunk, score in results
+        ]
+
+    def _search(self, vector) -> List[Document]:
+        with timed(RETRIEVAL_LATENCY, stage="vector_search"):
+            return self._to_documents(self.index.search(vector, self.k))
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        vector = self.embeddings.embed_query(query)
+        return self._search(vector)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        vector = await self.embeddings.aembed_query(query)
+        return self._search(vector)
@@ -1,10 +1,14 @@
 #!/usr/bin/env python
+import argparse
+import asyncio
+import json
 import sys
 import warnings
 
 from datetime import datetime
+from functools import partial
 
-from crew import SocialMediaBlog
+from .crew import SocialMediaBlog
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
@@ -28,6 +32,43 @@ def run():
         raise Exception(f"An error occurred while running the crew: {e}")
 
 
+def read_batch_items(path: str, tone: str) -> list:
+    """Items from a file of topics, one per line, or JSON lines with "topic" and optionally "tone"; "-" reads stdin"""
+    from .chat_models import BatchItem
+
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+        lines = [line.strip() for line in f if line.strip()]
+    return [
+        BatchItem(**{"tone": tone, **json.loads(line)}) if line.startswith("{") else BatchItem(topic=line, tone=tone)
+        for line in lines
+    ]
+
+
+def batch():
+    """
+    Generate blogs for a list of topics, printing each result as a JSON line as soon as it finishes.
+    """
+    from .app import app, blog_generation, generate_blog_cached
+    from .batch import run_batch, BATCH_MAX_PARALLEL
+
+    parser = argparse.ArgumentParser(description="Generate a blog for every topic in an editorial calendar")
+    parser.add_argument("topics", help='file with one topic per line or JSON lines {"topic": ..., "tone": ...}; - for stdin')
+    parser.add_argument("--tone", default="informative", help="tone of items that do not set one")
+    parser.add_argument("--max-parallel", type=int, default=BATCH_MAX_PARALLEL)
+    parser.add_argument("--force-refresh", action="store_true", help="regenerate blogs that are cached")
+    args = parser.parse_args()
+    items = read_batch_items(args.topics, args.tone)
+
+    async def generate_all():
+        # The same blog cache, checkpoints and crew slots the API uses, without its job queue
+        async with blog_generation(app):
+            generate = partial(generate_blog_cached, app, force_refresh=args.force_refresh, bounded=False)
+            async for result in run_batch(items, generate, args.max_parallel):
+                print(result.model_dump_json(), flush=True)
+
+    asyncio.run(generate_all())
+
+
 def train():
     """
     Train the crew for a given number of iterations.
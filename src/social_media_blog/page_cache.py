@@ -0,0 +1,132 @@
+from pathlib import Path
+from typing import Optional
+from .db_handler import logger
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    """On-disk cache of extracted article text and search results.
+
+    Article text is stored content-addressed under blobs/<sha256 of text>, with a
+    small metadata record per URL under pages/<sha256 of url> holding the blob
+    hash and the ETag/Last-Modified validators for revalidation. Search results
+    live under search/. The total size is kept under max_bytes by evicting the
+    least recently used entries.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, fresh_for: float, search_ttl: float):
+        self.root = Path(directory)
+        self.max_bytes = max_bytes
+        self.fresh_for = fresh_for
+        self.search_ttl = search_ttl
+        for sub in ("pages", "blobs", "search"):
+            (self.root / sub).mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size = sum(f.stat().st_size for f in self.root.rglob("*") if f.is_file())
+        logger.info(f"Page cache ready at {self.root} ({self._size / 1e6:.1f} MB)")
+
+    def _write(self, path: Path, data: str):
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, path)
+        with self._lock:
+            self._size += path.stat().st_size
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def _read_json(self, path: Path) -> Optional[dict]:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    # --- article pages ---
+
+    def lookup(self, url: str) -> Optional[dict]:
+        """Cached entry for a URL with its text, or None. entry["fresh"] tells if it can skip revalidation."""
+        meta_path = self.root / "pages" / _digest(url)
+        entry = self._read_json(meta_path)
+        if entry is None:
+            return None
+        blob_path = self.root / "blobs" / entry["blob"]
+        try:
+            entry["text"] = blob_path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+        # Both files of the entry are marked used, so eviction doesn't drop the URL's record under a live blob
+        now = time.time()
+        os.utime(blob_path, (now, now))
+        os.utime(meta_path, (now, now))
+        entry["fresh"] = now - entry["fetched_at"] < self.fresh_for
+        return entry
+
+    def validators(self, entry: Optional[dict]) -> dict:
+        """Conditional request headers for revalidating a cached entry"""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        blob = _digest(text)
+        blob_path = self.root / "blobs" / blob
+        if blob_path.exists():
+            now = time.time()
+            os.utime(blob_path, (now, now))
+        else:
+            self._write(blob_path, text)
+        meta = {"url": url, "blob": blob, "etag": etag, "last_modified": last_modified, "fetched_at": time.time()}
+        self._write(self.root / "pages" / _digest(url), json.dumps(meta))
+
+    def revalidated(self, url: str, entry: dict):
+        """Record a 304 Not Modified so the entry is fresh again"""
+        self.store(url, entry["text"], entry.get("etag"), entry.get("last_modified"))
+
+    # --- search results ---
+
+    def search_results(self, query: str, max_results: int) -> Optional[list]:
+        entry = self._read_json(self.root / "search" / _digest(f"{max_results}|{query.strip().lower()}"))
+        if entry is None or time.time() - entry["fetched_at"] > self.search_ttl:
+            return None
+        return entry["results"]
+
+    def store_search_results(self, query: str, max_results: int, results: list):
+        path = self.root / "search" / _digest(f"{max_results}|{query.strip().lower()}")
+        self._write(path, json.dumps({"query": query, "results": results, "fetched_at": time.time()}))
+
+    # --- eviction ---
+
+    def evict(self):
+        """Delete least recently used files until the cache is at 90% of max_bytes"""
+        with self._lock:
+            files = []
+            for f in self.root.rglob("*"):
+                if f.is_file():
+                    stat = f.stat()
+                    files.append((stat.st_mtime, stat.st_size, f))
+            total = sum(size for _, size, _ in files)
+            target = int(self.max_bytes * 0.9)
+            removed = 0
+            for _, size, f in sorted(files, key=lambda item: item[0]):
+                if total <= target:
+                    break
+                try:
+                    f.unlink()
+                    total -= size
+                    removed += 1
+                except OSError:
+                    continue
+            self._size = total
+        logger.info(f"Page cache evicted {removed} files, now {total / 1e6:.1f} MB")
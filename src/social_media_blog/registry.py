@@ -0,0 +1,105 @@
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, Optional
+from functools import partial
+from .db_handler import logger
+from .telemetry import in_current_context
+import asyncio
+import threading
+
+
+class ChainRegistry:
+    """Named LangChain runnables, each compiled once and shared by all requests.
+
+    Runnables built from a prompt, a chat model and a parser hold no
+    per-request state, so one instance can serve concurrent calls.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable] = {}
+        self._chains: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable):
+        self._factories[name] = factory
+
+    def get(self, name: str):
+        chain = self._chains.get(name)
+        if chain is None:
+            with self._lock:
+                chain = self._chains.get(name)
+                if chain is None:
+                    chain = self._chains[name] = self._factories[name]()
+        return chain
+
+    def compiled(self) -> bool:
+        return len(self._chains) == len(self._factories)
+
+    def compile_all(self):
+        for name in self._factories:
+            self.get(name)
+        logger.info(f"Compiled chains: {', '.join(self._factories)}")
+
+
+class CrewPool:
+    """Fixed set of independent crew instances, each running one kickoff at a time.
+
+    A Crew keeps its tasks' outputs, callbacks and agent state on the instance,
+    so sharing one between concurrent kickoffs lets runs overwrite each other.
+    A request leases an idle crew for the duration of its run; when all are busy
+    it waits for one to come back.
+    """
+
+    def __init__(self, factory: Callable, size: int):
+        self.factory = factory
+        self.size = size
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(factory())
+        logger.info(f"Crew pool ready with {size} crews")
+
+    @staticmethod
+    def _set_task_callback(crew, task_callback: Optional[Callable]):
+        # Crew.kickoff copies task_callback only into tasks that have no callback yet,
+        # so each task would keep calling the first run's callback unless it is replaced
+        crew.task_callback = task_callback
+        for task in crew.tasks:
+            task.callback = task_callback
+
+    def _run(self, loop: asyncio.AbstractEventLoop, crew, inputs: dict):
+        """Kick off a leased crew and give it back to the pool, both in the worker thread,
+        so rebuilding a crew after a failed run doesn't block the event loop"""
+        failed = True
+        try:
+            result = crew.kickoff(inputs=inputs)
+            failed = False
+            return result
+        finally:
+            self._set_task_callback(crew, None)
+            if failed:
+                # A run that blew up may have left the crew half-updated; start the next one clean
+                try:
+                    crew = self.factory()
+                except Exception:
+                    logger.exception("Failed to rebuild a crew after a failed run, reusing the old one")
+            loop.call_soon_threadsafe(self._idle.put_nowait, crew)
+
+    def _returned_unrun(self, crew, future: Future):
+        # A run cancelled before it started (executor shutdown) never reaches _run's hand-back
+        if future.cancelled():
+            self._set_task_callback(crew, None)
+            self._idle.put_nowait(crew)
+
+    async def kickoff(self, executor: Executor, inputs: dict, task_callback: Optional[Callable] = None):
+        """Run a kickoff on a leased crew in the executor"""
+        crew = await self._idle.get()
+        self._set_task_callback(crew, task_callback)
+        loop = asyncio.get_running_loop()
+        try:
+            future = executor.submit(in_current_context(partial(self._run, loop, crew, inputs)))
+        except Exception:
+            self._set_task_callback(crew, None)
+            self._idle.put_nowait(crew)
+            raise
+        # Returned when the thread is done with it, not when the caller stops waiting
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._returned_unrun, crew, f))
+        return await asyncio.wrap_future(future)
@@ -0,0 +1,174 @@
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from .db_handler import logger
+import json
+import math
+import re
+import threading
+
+ROUTES = ("crewai", "langchain")
+
+# "How do I write a post?" is a support question even though it mentions writing
+HOW_TO_RULE = re.compile(r"(^how\s+to\b|\b(how|where)\s+(do|can|could|should)\s+(i|we)\b)")
+# Words allowed between the verb and "blog"/"post": determiners and adjectives ("write me a short,
+# engaging blog"), told apart from nouns by a few common adjective endings; "create an account and
+# post comments" has a noun in between and is not a request for a post
+FILLER = r"(a|an|the|some|my|our|your|one|two|three|few|another|\d+|me|us|short|long|quick|brief|good|great|new|fresh|full|seo|[a-z]+(ly|ive|al|ful|ous|ic|ing|y)|[a-z]+-[a-z]+)"
+# Phrasings that unambiguously ask for a generated post (crewai) or are plainly
+# conversational (langchain). Anything else goes to the classifier.
+CREWAI_RULES = [
+    re.compile(
+        r"\b(write|generate|create|draft|compose|produce|make)(\s+" + FILLER + r",?){0,4}\s+(blog|article|post|write-?up|essay)s?\b"
+        # "make a post public" is about a post that already exists
+        r"(?!\s+(public|private|visible|hidden|live)\b)"
+    ),
+    re.compile(r"\b(blog|article)\s+(post\s+)?(about|on|regarding|covering)\b"),
+]
+LANGCHAIN_RULES = [
+    re.compile(r"^(hi|hello|hey|yo|thanks|thank you|good (morning|afternoon|evening)|bye|goodbye)\b[\s!.?]*$"),
+    re.compile(r"\b(what|who|how|where|when|why)\b.{0,40}\bmindtype\b"),
+    re.compile(r"\b(contact|support|pricing|account|login|sign ?up|password)\b"),
+]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+WORD_PATTERN = re.compile(r"[a-z]+")
+
+
+def tokenize(text: str) -> list:
+    words = TOKEN_PATTERN.findall(text.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+def parse_route(answer: str) -> Optional[str]:
+    """The route named in a router LLM answer ("Crewai.", "route: langchain"); None unless exactly one is named"""
+    words = set(WORD_PATTERN.findall(answer.lower()))
+    named = [route for route in ROUTES if route in words]
+    return named[0] if len(named) == 1 else None
+
+
+@dataclass
+class RouteGuess:
+    route: Optional[str]
+    confidence: float
+    source: str  # "rule", "model" or "none"
+
+
+class NaiveBayesRouter:
+    """Multinomial naive Bayes over unigrams and bigrams, trained from logged router decisions"""
+
+    def __init__(self):
+        self.doc_counts = Counter()
+        self.token_counts = {route: Counter() for route in ROUTES}
+        self.token_totals = Counter()
+        self.vocabulary = set()
+
+    @property
+    def examples(self) -> int:
+        return sum(self.doc_counts.values())
+
+    def learn(self, text: str, route: str):
+        if route not in ROUTES:
+            return
+        tokens = tokenize(text)
+        self.doc_counts[route] += 1
+        self.token_counts[route].update(tokens)
+        self.token_totals[route] += len(tokens)
+        self.vocabulary.update(tokens)
+
+    def predict(self, text: str) -> tuple:
+        """Return (route, probability) for the most likely route"""
+        tokens = tokenize(text)
+        total_docs = self.examples
+        vocab_size = len(self.vocabulary) or 1
+        log_scores = {}
+        for route in ROUTES:
+            score = math.log((self.doc_counts[route] + 1) / (total_docs + len(ROUTES)))
+            denominator = self.token_totals[route] + vocab_size
+            for token in tokens:
+                score += math.log((self.token_counts[route][token] + 1) / denominator)
+            log_scores[route] = score
+        best = max(log_scores, key=log_scores.get)
+        peak = log_scores[best]
+        normalizer = sum(math.exp(score - peak) for score in log_scores.values())
+        return best, 1.0 / normalizer
+
+
+class FastRouter:
+    """Local routing stage that answers confident cases without calling the router LLM"""
+
+    def __init__(self, log_path: Optional[str] = None, confidence: float = 0.9, min_examples: int = 50):
+        self.log_path = Path(log_path) if log_path else None
+        self.confidence = confidence
+        self.min_examples = min_examples
+        self.model = NaiveBayesRouter()
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.log_path or not self.log_path.exists():
+            return
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self.model.learn(entry["query"], entry["route"])
+                except (ValueError, KeyError):
+                    continue
+        logger.info(f"Fast router trained on {self.model.examples} logged decisions")
+
+    def classify(self, query: str) -> RouteGuess:
+        text = " ".join(query.lower().split())
+        if HOW_TO_RULE.search(text):
+            return RouteGuess("langchain", 1.0, "rule")
+        if any(rule.search(text) for rule in CREWAI_RULES):
+            return RouteGuess("crewai", 1.0, "rule")
+        if any(rule.search(text) for rule in LANGCHAIN_RULES):
+            return RouteGuess("langchain", 1.0, "rule")
+        if self.model.examples < self.min_examples:
+            return RouteGuess(None, 0.0, "none")
+        route, probability = self.model.predict(text)
+        return RouteGuess(route, probability, "model")
+
+    def is_confident(self, guess: RouteGuess) -> bool:
+        return guess.route is not None and guess.confidence >= self.confidence
+
+    def record_fast_path(self, guess: RouteGuess):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats[f"{guess.source}_hits"] += 1
+
+    def record_llm_decision(self, query: str, decision: str, guess: Optional[RouteGuess] = None, shadow: bool = False):
+        """Count an LLM decision, compare it with the local guess and keep it as training data"""
+        with self._lock:
+            if shadow:
+                self.stats["shadow_checks"] += 1
+            else:
+                self.stats["requests"] += 1
+                self.stats["llm_fallbacks"] += 1
+            if guess is not None and guess.route is not None:
+                self.stats["compared"] += 1
+                if guess.route == decision:
+                    self.stats["agreements"] += 1
+            if decision not in ROUTES:
+                return
+            self.model.learn(query, decision)
+            if self.log_path:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"query": query, "route": decision}) + "\n")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        requests = stats.get("requests", 0)
+        fast_hits = stats.get("rule_hits", 0) + stats.get("model_hits", 0)
+        compared = stats.get("compared", 0)
+        return {
+            **stats,
+            "fast_path_hit_rate": fast_hits / requests if requests else 0.0,
+            "llm_agreement_rate": stats.get("agreements", 0) / compared if compared else None,
+            "training_examples": self.model.examples,
+        }
@@ -0,0 +1,159 @@
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Optional
+from .db_handler import logger
+from .tokens import count_tokens, truncate_tokens
+import asyncio
+import os
+import secrets
+import time
+
+# Recent turns are kept verbatim up to this many tokens; older ones are folded into the summary
+SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", "800"))
+# Cap on the running summary of folded turns
+SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", "200"))
+# Sessions untouched for this long are dropped
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+# Folding stops once the window is down to this fraction of its budget, so summaries aren't rewritten every turn
+FOLD_TARGET = 0.5
+EVICT_INTERVAL = 60
+
+
+class Session:
+    """One conversation: a running summary and the recent turns as (text, tokens) pairs"""
+
+    __slots__ = ("summary", "turns", "tokens", "last_used", "folding")
+
+    def __init__(self):
+        self.summary = ""
+        self.turns: deque = deque()
+        self.tokens = 0
+        self.last_used = time.monotonic()
+        self.folding = False
+
+
+class SessionStore:
+    """In-process conversation memory keyed by server-issued session ids.
+
+    Sessions live in this process only: run the API as a single worker process
+    (the default uvicorn command), or route each client to the same worker, for
+    follow-ups to find their history. A follow-up that reaches a process without
+    its session is given a new, empty one rather than failing.
+
+    Ids are issued by resolve() and are unguessable; a client-chosen id is never
+    adopted, so one conversation's history can't be read by guessing its id.
+
+    Each session keeps its latest turns verbatim within a token budget. When the
+    window overflows, the oldest turns are folded into a short running summary by
+    the summarize(summary, transcript) coroutine in the background, so the history
+    given to the assistant stays the same size however long the conversation runs.
+    Sessions idle for idle_seconds, and the least recently used beyond
+    max_sessions, are evicted.
+    """
+
+    def __init__(self, summarize: Callable[[str, str], Awaitable[str]], window_tokens: int = SESSION_HISTORY_TOKENS,
+                 summary_tokens: int = SESSION_SUMMARY_TOKENS, idle_seconds: float = SESSION_IDLE_SECONDS,
+                 max_sessions: int = SESSION_MAX_SESSIONS):
+        self.summarize = summarize
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._folds: set = set()
+        self._last_eviction = time.monotonic()
+
+    def _evict(self, now: float):
+        # Sessions are kept in least recently used order, so the idle ones are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used < self.idle_seconds and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+        self._last_eviction = now
+
+    def _touch(self, session_id: str, create: bool) -> Optional[Session]:
+        now = time.monotonic()
+        if now - self._last_eviction > EVICT_INTERVAL or len(self._sessions) > self.max_sessions:
+            self._evict(now)
+        session = self._sessions.get(session_id)
+        if session is not None and now - session.last_used >= self.idle_seconds:
+            del self._sessions[session_id]
+            session = None
+        if session is None and create:
+            session = self._sessions[session_id] = Session()
+        if session is not None:
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def resolve(self, session_id: Optional[str]) -> str:
+        """The id of the session a request's session_id refers to, issuing a new one if it is omitted or names no live session"""
+        if session_id and self._touch(session_id, create=False) is not None:
+            return session_id
+        session_id = secrets.token_urlsafe(24)
+        self._touch(session_id, create=True)
+        return session_id
+
+    def history(self, session_id: Optional[str]) -> str:
+        """Summary and recent turns of a session, at most window_tokens + summary_tokens; empty for a new one"""
+        if not session_id:
+            return ""
+        session = self._touch(session_id, create=False)
+        if session is None:
+            return ""
+        # Newest turns first until the budget is spent; older ones are (or are about to be) in the summary
+        budget, recent = self.window_tokens, []
+        for text, tokens in reversed(session.turns):
+            if tokens > budget:
+                break
+            budget -= tokens
+            recent.append(text)
+        parts = [f"Summary of earlier conversation: {session.summary}"] if session.summary else []
+        return "\n".join(parts + recent[::-1])
+
+    def record(self, session_id: Optional[str], user_message: str, reply: str):
+        """Append a turn to a session issued by resolve() and fold the oldest turns into the summary if the window is over budget"""
+        session = self._touch(session_id, create=False) if session_id else None
+        if session is None:
+            return
+        # A long turn is stored cut down, so one pasted document can't take the whole window
+        text = truncate_tokens(f"User: {user_message}\nAssistant: {reply}", self.window_tokens // 2)
+        tokens = count_tokens(text)
+        session.turns.append((text, tokens))
+        session.tokens += tokens
+        if session.tokens > self.window_tokens and not session.folding:
+            session.folding = True
+            task = asyncio.create_task(self._fold(session_id, session))
+            self._folds.add(task)
+            task.add_done_callback(self._folds.discard)
+
+    async def _fold(self, session_id: str, session: Session):
+        target = int(self.window_tokens * FOLD_TARGET)
+        count, remaining = 0, session.tokens
+        while count < len(session.turns) - 1 and remaining > target:
+            remaining -= session.turns[count][1]
+            count += 1
+        if count == 0:
+            session.folding = False
+            return
+        folded = [session.turns[i] for i in range(count)]
+        try:
+            summary = await self.summarize(session.summary, "\n".join(text for text, _ in folded))
+            session.summary = truncate_tokens(summary.strip(), self.summary_tokens)
+        except Exception as e:
+            # Dropping the turns keeps the session bounded; the conversation loses some detail
+            logger.warning(f"Failed to summarize session {session_id}, dropping {count} old turns: {e}")
+        finally:
+            # New turns are only ever appended, so the folded ones are still the oldest
+            for _ in range(count):
+                _, tokens = session.turns.popleft()
+                session.tokens -= tokens
+            session.folding = False
+
+    def snapshot(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "turns": sum(len(session.turns) for session in self._sessions.values()),
+            "summarizing": len(self._folds),
+        }
@@ -0,0 +1,171 @@
+from contextlib import contextmanager
+from functools import partial
+from .db_handler import logger
+import contextvars
+import os
+import threading
+import time
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+FAST_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+CREW_BUCKETS = (1, 5, 10, 20, 30, 60, 90, 120, 180, 300, 600)
+BYTE_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2e6)
+
+
+class NoopMetric:
+    """Stands in for a metric when prometheus_client is not installed"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+
+def histogram(name: str, documentation: str, labels=(), buckets=FAST_BUCKETS):
+    if prometheus_client is None:
+        return NoopMetric()
+    return prometheus_client.Histogram(name, documentation, labels, buckets=buckets)
+
+
+def counter(name: str, documentation: str, labels=()):
+    if prometheus_client is None:
+        return NoopMetric()
+    return prometheus_client.Counter(name, documentation, labels)
+
+
+ROUTER_LATENCY = histogram("router_latency_seconds", "Time to a routing decision", ["path"])
+ROUTE_DECISIONS = counter("route_decisions_total", "Routing decisions", ["route", "path"])
+# Stages: embed and embed_cached (query embedding, any backend), embed_documents (ingestion), vector_search (local index),
+# vector (whole vector retriever) and bm25 (hybrid), total (per query)
+RETRIEVAL_LATENCY = histogram("retrieval_latency_seconds", "Knowledge base retrieval time by stage", ["stage"])
+LLM_LATENCY = histogram("llm_latency_seconds", "LLM call latency", ["model", "outcome"], buckets=LLM_BUCKETS)
+# Kinds: prompt, completion, and cached (prompt tokens the provider served from its prompt cache)
+LLM_TOKENS = counter("llm_tokens_total", "Tokens sent to and generated by LLM providers", ["model", "kind"])
+CREW_TASK_DURATION = histogram("crew_task_duration_seconds", "Crew task wall time", ["task"], buckets=CREW_BUCKETS)
+WEB_FETCH_DURATION = histogram("web_fetch_duration_seconds", "Article fetch time", ["source"], buckets=LLM_BUCKETS)
+WEB_FETCH_BYTES = histogram("web_fetch_bytes", "Downloaded article size", buckets=BYTE_BUCKETS)
+CACHE_REQUESTS = counter("cache_requests_total", "Cache lookups", ["cache", "result"])
+ADMISSION_REJECTIONS = counter("admission_rejections_total", "Requests turned away with 429", ["limit"])
+JSON_PARSE_FAILURES = counter("blog_output_parse_failures_total", "Summarizing outputs that could not be used", ["reason"])
+
+
+@contextmanager
+def timed(metric, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        (metric.labels(**labels) if labels else metric).observe(time.perf_counter() - started)
+
+
+def render_metrics() -> tuple:
+    """Body and content type for /metrics; aggregates worker processes when PROMETHEUS_MULTIPROC_DIR is set"""
+    if prometheus_client is None:
+        return b"# prometheus_client is not installed\n", "text/plain; charset=utf-8"
+    registry = prometheus_client.REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """OpenTelemetry span around a unit of work; a no-op unless a tracer provider is configured"""
+    if trace is None:
+        yield None
+        return
+    with trace.get_tracer("social_media_blog").start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def in_current_context(fn):
+    """Bind fn to a copy of the caller's context so spans started in another thread keep their parent"""
+    return partial(contextvars.copy_context().run, fn)
+
+
+def setup_tracing():
+    """Export spans over OTLP when OTEL_EXPORTER_OTLP_ENDPOINT is set and the SDK is installed"""
+    if trace is None or not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        logger.warning(f"OTEL_EXPORTER_OTLP_ENDPOINT is set but the OpenTelemetry SDK is missing: {e}")
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "social-media-blog")}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    logger.info(f"Exporting traces to {os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')}")
+
+
+_crew_listeners_registered = False
+_started_at = {}
+_started_lock = threading.Lock()
+
+
+def instrument_crewai():
+    """Observe crew task durations and CrewAI LLM call latency from CrewAI's event bus"""
+    global _crew_listeners_registered
+    if _crew_listeners_registered:
+        return
+    from crewai.events import (
+        crewai_event_bus, LLMCallStartedEvent, LLMCallCompletedEvent, LLMCallFailedEvent, TaskStartedEvent, TaskCompletedEvent
+    )
+
+    def started(key, event):
+        with _started_lock:
+            _started_at[key] = event.timestamp
+
+    def elapsed(key, event):
+        with _started_lock:
+            start = _started_at.pop(key, None)
+        return (event.timestamp - start).total_seconds() if start is not None else None
+
+    @crewai_event_bus.on(LLMCallStartedEvent)
+    def on_llm_started(source, event):
+        started(("llm", event.call_id), event)
+
+    @crewai_event_bus.on(LLMCallCompletedEvent)
+    def on_llm_completed(source, event):
+        seconds = elapsed(("llm", event.call_id), event)
+        if seconds is not None:
+            LLM_LATENCY.labels(model=event.model or "unknown", outcome="success").observe(seconds)
+
+    @crewai_event_bus.on(LLMCallFailedEvent)
+    def on_llm_failed(source, event):
+        seconds = elapsed(("llm", event.call_id), event)
+        if seconds is not None:
+            LLM_LATENCY.labels(model=event.model or "unknown", outcome="error").observe(seconds)
+
+    @crewai_event_bus.on(TaskStartedEvent)
+    def on_task_started(source, event):
+        started(("task", event.task_id), event)
+
+    @crewai_event_bus.on(TaskCompletedEvent)
+    def on_task_completed(source, event):
+        seconds = elapsed(("task", event.task_id), event)
+        if seconds is not None:
+            CREW_TASK_DURATION.labels(task=event.task_name or "unknown").observe(seconds)
+
+    _crew_listeners_registered = True
+    logger.info("Recording crew task and LLM metrics from CrewAI events")
@@ -0,0 +1,35 @@
+from functools import lru_cache
+from .db_handler import logger
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # tiktoken missing or its encoding file not downloadable (offline)
+        logger.warning(f"tiktoken unavailable, estimating tokens from characters: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count of a text, exact with tiktoken, otherwise ~4 characters per token"""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text: str, max_tokens: int, keep: str = "head") -> str:
+    """The first (keep="head") or last (keep="tail") max_tokens tokens of a text"""
+    encoding = _encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens] if keep == "head" else tokens[-max_tokens:])
+    chars = max_tokens * 4
+    if len(text) <= chars:
+        return text
+    return text[:chars] if keep == "head" else text[-chars:]
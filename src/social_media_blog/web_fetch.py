@@ -0,0 +1,175 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+from ddgs import DDGS
+from requests.adapters import HTTPAdapter
+from .db_handler import logger
+from .page_cache import PageCache
+from .extract import extract_text
+from .telemetry import CACHE_REQUESTS, WEB_FETCH_BYTES, WEB_FETCH_DURATION, span, in_current_context
+import os
+import threading
+import time
+import requests
+
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "8"))
+# Overall budget for fetching all articles of one search; whatever finished in time is used
+FETCH_DEADLINE = float(os.getenv("FETCH_DEADLINE", "10"))
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "8"))
+FETCH_PER_HOST_LIMIT = int(os.getenv("FETCH_PER_HOST_LIMIT", "2"))
+# Per-host semaphores kept for the most recently fetched hosts. Hosts in flight are among the most recent,
+# so in practice only idle hosts are dropped
+FETCH_MAX_HOSTS = int(os.getenv("FETCH_MAX_HOSTS", "256"))
+# Bodies are read up to this many bytes; the article text is near the top anyway
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(1024 * 1024)))
+USER_AGENT = "Mozilla/5.0 (compatible; MindtypeResearchBot/1.0)"
+# Set PAGE_CACHE_DIR to an empty string to disable the on-disk page cache
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", "db/page_cache")
+PAGE_CACHE_MAX_MB = float(os.getenv("PAGE_CACHE_MAX_MB", "200"))
+# Cached pages younger than this are used without revalidating against the origin
+PAGE_CACHE_FRESH = float(os.getenv("PAGE_CACHE_FRESH", str(24 * 3600)))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "900"))
+
+_session = None
+_page_cache = None
+_executor = None
+_host_limits: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Shared HTTP session so article fetches reuse pooled connections"""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=FETCH_MAX_WORKERS * 2, pool_maxsize=FETCH_MAX_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT})
+            _session = session
+        return _session
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="fetch")
+        return _executor
+
+
+def get_page_cache():
+    global _page_cache
+    if not PAGE_CACHE_DIR:
+        return None
+    with _lock:
+        if _page_cache is None:
+            _page_cache = PageCache(PAGE_CACHE_DIR, int(PAGE_CACHE_MAX_MB * 1e6), PAGE_CACHE_FRESH, SEARCH_CACHE_TTL)
+        return _page_cache
+
+
+def search_web(query: str, max_results: int) -> list:
+    """DuckDuckGo text search, served from the page cache for SEARCH_CACHE_TTL seconds"""
+    cache = get_page_cache()
+    if cache is not None:
+        results = cache.search_results(query, max_results)
+        if results is not None:
+            logger.info(f"Using cached search results for: {query}")
+            return results
+
+    with DDGS() as ddgs:
+        results = [r for r in ddgs.text(query=query, max_results=max_results)]
+    if cache is not None and results:
+        cache.store_search_results(query, max_results, results)
+    return results
+
+
+def host_limit(url: str) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc.lower()
+    with _lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(FETCH_PER_HOST_LIMIT)
+            while len(_host_limits) > FETCH_MAX_HOSTS:
+                _host_limits.popitem(last=False)
+        _host_limits.move_to_end(host)
+        return _host_limits[host]
+
+
+def read_capped(response: requests.Response, max_bytes: int) -> str:
+    """Read at most max_bytes of a streamed response body and decode it"""
+    chunks = []
+    received = 0
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        chunks.append(chunk)
+        received += len(chunk)
+        if received >= max_bytes:
+            logger.info(f"Truncated {response.url} at {max_bytes} bytes")
+            break
+    body = b"".join(chunks)[:max_bytes]
+    WEB_FETCH_BYTES.observe(len(body))
+    return body.decode(response.encoding or "utf-8", errors="replace")
+
+
+def fetch_article(url: str, deadline_at: float) -> str:
+    """Return one page's paragraph text from the page cache or the network, respecting the per-host limit"""
+    with span("web_fetch", url=url):
+        started = time.perf_counter()
+        source = "error"
+        try:
+            source, text = _fetch_article(url, deadline_at)
+            return text
+        finally:
+            WEB_FETCH_DURATION.labels(source=source).observe(time.perf_counter() - started)
+
+
+def _fetch_article(url: str, deadline_at: float) -> tuple:
+    """(source, text) of one page, source being where the text came from: cache, revalidated or network"""
+    cache = get_page_cache()
+    entry = cache.lookup(url) if cache is not None else None
+    if cache is not None:
+        result = "miss" if entry is None else "fresh" if entry["fresh"] else "stale"
+        CACHE_REQUESTS.labels(cache="page", result=result).inc()
+    if entry is not None and entry["fresh"]:
+        return "cache", entry["text"]
+
+    with host_limit(url):
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("fetch deadline passed before the request started")
+        headers = cache.validators(entry) if cache is not None else {}
+        with get_session().get(url, headers=headers, timeout=min(FETCH_TIMEOUT, remaining), stream=True) as response:
+            if response.status_code == 304 and entry is not None:
+                cache.revalidated(url, entry)
+                return "revalidated", entry["text"]
+            if response.status_code >= 400:
+                # Error pages are not articles; don't spend the download and extraction on them
+                raise ValueError(f"HTTP {response.status_code}")
+            content_type = response.headers.get("Content-Type", "text/html")
+            if "html" not in content_type and "text/plain" not in content_type:
+                raise ValueError(f"unsupported content type {content_type}")
+            html = read_capped(response, FETCH_MAX_BYTES)
+
+    text = extract_text(html)
+    if cache is not None and response.ok:
+        cache.store(url, text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return "network", text
+
+
+def fetch_articles(urls: list, deadline: float = FETCH_DEADLINE) -> dict:
+    """Fetch several pages concurrently and return {url: text} for those that finished before the deadline"""
+    deadline_at = time.monotonic() + deadline
+    futures = {get_executor().submit(in_current_context(fetch_article), url, deadline_at): url for url in urls}
+    done, pending = wait(futures, timeout=deadline)
+
+    articles = {}
+    for future in done:
+        url = futures[future]
+        try:
+            articles[url] = future.result()
+        except Exception as e:
+            logger.warning(f"Skipping {url}: {e}")
+    for future in pending:
+        future.cancel()
+        logger.warning(f"Skipping {futures[future]}: not finished within {deadline:.0f}s")
+    return articles
@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+import pytest
+
+# Every store goes to a throwaway directory and nothing reaches a provider; set before the app modules are imported
+TMP_DIR = tempfile.mkdtemp(prefix="social_media_blog_tests_")
+os.environ.update({
+    "GOOGLE_API_KEY": "test",
+    "GROQ_API_KEY": "test",
+    "GROQ_MODEL": "test",
+    "COHERE_API_KEY": "test",
+    "RETRIEVER_BACKEND": "local",
+    "EMBEDDINGS_BACKEND": "hashing",
+    "HYBRID_RETRIEVAL": "false",
+    "LOCAL_INDEX_DIR": os.path.join(TMP_DIR, "local_index"),
+    "EMBEDDING_CACHE_DIR": "",
+    "PAGE_CACHE_DIR": "",
+    "JOB_DB_PATH": ":memory:",
+    "BLOG_CACHE_DB_PATH": os.path.join(TMP_DIR, "blogs.sqlite3"),
+    "CHECKPOINT_DB_PATH": os.path.join(TMP_DIR, "checkpoints.sqlite3"),
+    "ROUTER_LOG_PATH": os.path.join(TMP_DIR, "router_decisions.jsonl"),
+    "CREWAI_DISABLE_TELEMETRY": "true",
+    "OTEL_SDK_DISABLED": "true",
+})
+
+
+@pytest.fixture
+def app_client(monkeypatch):
+    """TestClient for the API with the background warm-up (crews, knowledge base) skipped"""
+    from fastapi.testclient import TestClient
+    from src.social_media_blog import app as app_module
+
+    async def no_warm_up(app):
+        pass
+
+    monkeypatch.setattr(app_module, "warm_up", no_warm_up)
+    with TestClient(app_module.app) as client:
+        yield client
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from src.social_media_blog import admission
+from src.social_media_blog import app as app_module
+from src.social_media_blog.admission import AdmissionRejected, CrewAdmission, MemoryStore, TokenBucket
+from src.social_media_blog.chat_models import BlogOutput, BlogResponse
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_a_burst_then_refills(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    bucket = TokenBucket(MemoryStore(), "blog", rate_per_minute=6, burst=2)
+
+    async def main():
+        await bucket.take("client")
+        await bucket.take("client")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await bucket.take("client")
+        # Other clients have buckets of their own
+        await bucket.take("other")
+        clock.now += 10
+        await bucket.take("client")
+        return rejected.value
+
+    rejected = asyncio.run(main())
+    assert rejected.limit == "blog" and rejected.retry_after == 10
+
+
+def test_token_bucket_lets_requests_through_when_its_store_fails():
+    class BrokenStore:
+        async def take(self, *args):
+            raise ConnectionError("store is down")
+
+    asyncio.run(TokenBucket(BrokenStore(), "chat", 1, 1).take("client"))
+
+
+def test_crew_admission_caps_runs_and_bounds_the_queue():
+    crew = CrewAdmission(MemoryStore(), max_concurrent=1, max_waiting=1, max_wait=5, expected_seconds=30)
+
+    async def main():
+        release, order = asyncio.Event(), []
+
+        async def run(name, hold=None):
+            async with crew.slot():
+                order.append(name)
+                if hold is not None:
+                    await hold.wait()
+
+        first = asyncio.create_task(run("first", release))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(run("second"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await run("third")
+        release.set()
+        await asyncio.gather(first, second)
+        return order, rejected.value, await crew.snapshot()
+
+    order, rejected, snapshot = asyncio.run(main())
+    assert order == ["first", "second"]
+    assert rejected.limit == "crew_queue"
+    assert snapshot["active"] == 0 and snapshot["waiting"] == 0
+
+
+def test_chat_is_limited_by_the_chat_bucket_not_a_fixed_rate(app_client, monkeypatch):
+    async def route(user_request):
+        return "langchain"
+
+    async def assistant(user_query, session_id=None):
+        return "hello"
+
+    monkeypatch.setattr(app_module, "route_query_fast", route)
+    monkeypatch.setattr(app_module, "assistant", assistant)
+    state = app_client.app.state
+    state.chat_bucket = TokenBucket(MemoryStore(), "chat", 1, 8)
+    responses = [app_client.post("/chat", json={"topic": "hi"}).status_code for _ in range(9)]
+    assert responses == [200] * 8 + [429]
+
+
+def test_blog_bucket_is_charged_only_for_new_crew_runs(app_client, monkeypatch):
+    runs = []
+
+    async def generate_with_crew(app, topic, tone, task_callback=None, resume=True):
+        runs.append(topic)
+        return BlogResponse(status="success", title=topic, content="C", meta_description="M", blog_preview="P")
+
+    async def route(user_request):
+        return "crewai"
+
+    monkeypatch.setattr(app_module, "generate_with_crew", generate_with_crew)
+    monkeypatch.setattr(app_module, "route_query_fast", route)
+    state = app_client.app.state
+    state.blog_bucket = TokenBucket(MemoryStore(), "blog", 0.001, 1)
+    state.blog_cache.set("Cached topic", "informative", BlogOutput(title="T", blog_post="P", meta_description="M", blog_preview="B"))
+
+    # Cache hits are free, through /chat and /jobs alike
+    assert app_client.post("/chat", json={"topic": "Cached topic"}).json()["title"] == "T"
+    assert app_client.post("/jobs", json={"topic": "Cached topic"}).status_code == 202
+
+    first = app_client.post("/jobs", json={"topic": "New topic"})
+    assert first.status_code == 202
+    # Joining the same job is free; a different topic needs a crew run and the bucket is empty
+    assert app_client.post("/jobs", json={"topic": "New topic"}).json()["job_id"] == first.json()["job_id"]
+    assert app_client.post("/jobs", json={"topic": "Another topic"}).status_code == 429
+    assert app_client.post("/chat", json={"topic": "Another topic"}).status_code == 429
+
+
+def test_rejected_chat_requests_are_not_routed(app_client, monkeypatch):
+    routed = []
+
+    async def route(user_request):
+        routed.append(user_request)
+        return "langchain"
+
+    monkeypatch.setattr(app_module, "route_query_fast", route)
+    app_client.app.state.chat_bucket = TokenBucket(MemoryStore(), "chat", 0.001, 0)
+    assert app_client.post("/chat", json={"topic": "hi"}).status_code == 429
+    assert app_client.post("/chat/stream", json={"topic": "hi"}).status_code == 429
+    assert routed == []
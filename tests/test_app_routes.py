@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/cache/stats", "/router/stats", "/admission/stats", "/llm/stats", "/healthz", "/metrics"])
+def test_monitoring_routes_are_not_rate_limited(app_client, path):
+    statuses = {app_client.get(path).status_code for _ in range(8)}
+    assert 429 not in statuses
+
+
+def test_job_status_can_be_polled(app_client):
+    job = app_client.app.state.job_queue.store.create("polling topic", "casual")
+    for _ in range(10):
+        response = app_client.get(f"/jobs/{job['id']}")
+        assert response.status_code == 200
+        assert response.json()["topic"] == "polling topic"
+
+
+def test_unknown_job_is_404(app_client):
+    assert app_client.get("/jobs/missing").status_code == 404
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from src.social_media_blog.app import generate_blog_cached
+from src.social_media_blog.blog_cache import BlogCache
+from src.social_media_blog.chat_models import BlogOutput
+
+
+class ThreadRecordingCache(BlogCache):
+    def get(self, topic, tone):
+        self.thread = threading.current_thread()
+        return super().get(topic, tone)
+
+
+def test_cached_blog_is_read_off_the_event_loop(tmp_path):
+    cache = ThreadRecordingCache(str(tmp_path / "blogs.sqlite3"), max_age=60)
+    cache.set("Rust", "casual", BlogOutput(title="T", blog_post="P", meta_description="M", blog_preview="B"))
+    app = SimpleNamespace(state=SimpleNamespace(blog_cache=cache))
+
+    async def main():
+        return await generate_blog_cached(app, "Rust", "casual"), threading.current_thread()
+
+    response, loop_thread = asyncio.run(main())
+    assert response.title == "T"
+    assert cache.thread is not loop_thread
+
+
+def test_batch_cli_state_has_no_job_queue(monkeypatch):
+    from fastapi import FastAPI
+    from src.social_media_blog import app as app_module
+    from src.social_media_blog.chat_models import BlogResponse
+
+    async def generate_with_crew(app, topic, tone, task_callback=None, resume=True):
+        return BlogResponse(status="success", title=topic, content="C", meta_description="M", blog_preview="P")
+
+    monkeypatch.setattr(app_module, "generate_with_crew", generate_with_crew)
+    app = FastAPI()
+
+    async def main():
+        async with app_module.blog_generation(app):
+            return await generate_blog_cached(app, "CLI topic", "casual", bounded=False)
+
+    assert asyncio.run(main()).title == "CLI topic"
+    assert not hasattr(app.state, "job_queue") and app.state.crew_pool is None
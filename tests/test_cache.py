@@ -0,0 +1,66 @@
+import asyncio
+
+import numpy as np
+
+from src.social_media_blog.cache import MemoryBackend, ResponseCache, normalize_query
+
+
+class GatedEmbeddings:
+    """Fixed vectors per text; embedding `held` waits until the gate opens"""
+
+    def __init__(self, vectors: dict, held: str):
+        self.vectors = vectors
+        self.held = held
+        self.gate = asyncio.Event()
+
+    async def aembed_query(self, text):
+        if text == self.held:
+            await self.gate.wait()
+        return self.vectors[text]
+
+
+def test_normalize_query():
+    assert normalize_query("  What does   Mindtype DO?! ") == "what does mindtype do"
+
+
+def test_memory_backend_expires_and_evicts():
+    async def scenario():
+        backend = MemoryBackend(max_entries=2)
+        await backend.set("a", "1", ttl=60)
+        await backend.set("b", "2", ttl=-1)
+        await backend.set("c", "3", ttl=60)
+        return await backend.get("a"), await backend.get("b"), await backend.get("c")
+
+    # "b" is expired and "a" was evicted as the least recently used of three
+    assert asyncio.run(scenario()) == (None, None, "3")
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    async def scenario():
+        cache = ResponseCache("test")
+        await cache.set("What does Mindtype do?", "It writes blogs.")
+        return await cache.get("what does mindtype do")
+
+    assert asyncio.run(scenario()) == "It writes blogs."
+
+
+def test_similar_hit_survives_a_concurrent_rebuild():
+    unit = np.eye(4, dtype=np.float32)
+    embeddings = GatedEmbeddings({
+        "question one": unit[0], "question one again": unit[0],
+        "question two": unit[1], "question three": unit[2], "question four": unit[3],
+    }, held="question one again")
+
+    async def scenario():
+        cache = ResponseCache("test", embeddings=embeddings, similarity_threshold=0.9, max_vectors=2)
+        await cache.set("question one", "answer one")
+        await cache.set("question two", "answer two")
+        lookup = asyncio.create_task(cache.get("question one again"))
+        await asyncio.sleep(0)
+        # While the lookup waits for its embedding, "question one" leaves the vectors and the matrix is rebuilt
+        await cache.set("question three", "answer three")
+        assert await cache.get("question four") is None
+        embeddings.gate.set()
+        return await lookup
+
+    assert asyncio.run(scenario()) == "answer one"
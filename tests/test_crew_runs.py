@@ -0,0 +1,83 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from crewai.tasks.task_output import TaskOutput
+
+from src.social_media_blog import app as app_module
+from src.social_media_blog.app import CREW_STAGES, generate_with_crew
+from src.social_media_blog.checkpoints import CheckpointStore
+from src.social_media_blog.registry import CrewPool
+
+
+def blog_json(topic):
+    return json.dumps({"title": topic, "blog_post": f"Post on {topic}", "meta_description": "M", "blog_preview": "P"})
+
+
+class FakeCrew:
+    """Runs the given stages, setting task callbacks the way crewai does (only where none is set)"""
+
+    def __init__(self, stages=CREW_STAGES):
+        self.tasks = [SimpleNamespace(name=stage, callback=None) for stage in stages]
+        self.task_callback = None
+        self.thread = None
+
+    def kickoff(self, inputs):
+        self.thread = threading.current_thread()
+        for task in self.tasks:
+            if not task.callback:
+                task.callback = self.task_callback
+        outputs = []
+        for task in self.tasks:
+            raw = blog_json(inputs["topic"]) if task.name == "summarizing_task" else f"{task.name} on {inputs['topic']}"
+            outputs.append(TaskOutput(name=task.name, description=task.name, agent="agent", raw=raw))
+            task.callback(outputs[-1])
+        return SimpleNamespace(tasks_output=outputs, pydantic=None, raw=outputs[-1].raw)
+
+
+def fake_app(tmp_path, executor):
+    return SimpleNamespace(state=SimpleNamespace(
+        crew_pool=CrewPool(FakeCrew, size=1),
+        crew_pool_lock=asyncio.Lock(),
+        crew_executor=executor,
+        checkpoints=CheckpointStore(str(tmp_path / "checkpoints.sqlite3"), max_age=60),
+    ))
+
+
+def test_runs_on_a_pooled_crew_checkpoint_their_own_outputs(tmp_path):
+    async def main():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            app = fake_app(tmp_path, executor)
+            first = await generate_with_crew(app, "Rust", "casual", resume=False)
+            second = await generate_with_crew(app, "Go", "casual", resume=False)
+            return app, first, second
+
+    app, first, second = asyncio.run(main())
+    assert (first.title, second.title) == ("Rust", "Go")
+    checkpoints = app.state.checkpoints
+    assert checkpoints.load(CREW_STAGES, "Rust", "casual")["research_task"].raw == "research_task on Rust"
+    assert checkpoints.load(CREW_STAGES, "Go", "casual")["research_task"].raw == "research_task on Go"
+
+
+def test_resumed_crew_is_built_in_the_crew_executor(tmp_path, monkeypatch):
+    built = []
+
+    class Project:
+        def resume_crew(self, completed):
+            built.append(threading.current_thread())
+            return FakeCrew([stage for stage in CREW_STAGES if stage not in completed])
+
+    monkeypatch.setattr(app_module, "crew_project", Project)
+
+    async def main():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            app = fake_app(tmp_path, executor)
+            research = TaskOutput(name="research_task", description="research_task", agent="agent", raw="research")
+            app.state.checkpoints.save("earlier", "Rust", "formal", research)
+            return await generate_with_crew(app, "Rust", "formal"), threading.current_thread()
+
+    response, loop_thread = asyncio.run(main())
+    assert response.title == "Rust"
+    assert built and built[0] is not loop_thread
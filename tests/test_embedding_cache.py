@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from prometheus_client import REGISTRY
+
+from src.social_media_blog.embedding_cache import CachedEmbeddings, TimedEmbeddings, get_store
+from src.social_media_blog.local_index import HashingEmbeddings
+
+
+def embed_count(stage):
+    return REGISTRY.get_sample_value("retrieval_latency_seconds_count", {"stage": stage}) or 0
+
+
+def test_query_embedding_is_timed_without_a_cache():
+    before = embed_count("embed")
+    asyncio.run(TimedEmbeddings(HashingEmbeddings()).aembed_query("what is rag"))
+    assert embed_count("embed") == before + 1
+
+
+def test_cached_queries_are_timed_as_cache_hits(tmp_path):
+    embeddings = CachedEmbeddings(HashingEmbeddings(), get_store(str(tmp_path), "hashing", 100))
+    before, before_cached = embed_count("embed"), embed_count("embed_cached")
+
+    first = embeddings.embed_query("what is rag")
+    assert embeddings.embed_query("what  is rag") == first
+
+    assert embed_count("embed") == before + 1
+    assert embed_count("embed_cached") == before_cached + 1
+    assert embeddings.store.snapshot()["hits"] == 1
+
+
+def test_async_embedding_uses_the_store_off_the_event_loop(tmp_path):
+    import threading
+
+    embeddings = CachedEmbeddings(HashingEmbeddings(), get_store(str(tmp_path), "hashing", 100))
+    threads = []
+    get_many, put_many = embeddings.store.get_many, embeddings.store.put_many
+    embeddings.store.get_many = lambda keys: threads.append(threading.current_thread()) or get_many(keys)
+    embeddings.store.put_many = lambda vectors: threads.append(threading.current_thread()) or put_many(vectors)
+
+    async def main():
+        await embeddings.aembed_query("what is rag")
+        await embeddings.aembed_documents(["a chunk", "another chunk"])
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(main())
+    assert len(threads) == 4 and loop_thread not in threads
+
+
+def test_lazy_embeddings_are_built_on_first_use_and_retried_until_available():
+    from src.social_media_blog.embedding_cache import LazyEmbeddings
+
+    built = []
+
+    def factory():
+        built.append(1)
+        return HashingEmbeddings() if len(built) > 1 else None
+
+    embeddings = LazyEmbeddings(factory)
+    assert built == []
+    with pytest.raises(RuntimeError):
+        asyncio.run(embeddings.aembed_query("what is rag"))
+    assert len(asyncio.run(embeddings.aembed_query("what is rag"))) > 0
+    embeddings.embed_query("again")
+    assert len(built) == 2
+
+
+def test_app_import_builds_no_cache_embeddings():
+    import subprocess
+    import sys
+
+    code = ("import os; os.environ['RESPONSE_CACHE_SIMILARITY'] = '0.95'\n"
+            "from src.social_media_blog import db_handler\n"
+            "db_handler.get_embeddings = lambda: (_ for _ in ()).throw(AssertionError('built at import'))\n"
+            "from src.social_media_blog import app\n"
+            "assert app.cache_embeddings is not None")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-500:]
@@ -0,0 +1,109 @@
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pinecone
+
+from src.social_media_blog import app as app_module
+from src.social_media_blog import db_handler
+from src.social_media_blog.hybrid import BM25Index
+from src.social_media_blog.ingest import PineconeTarget
+
+
+class FakeIndex:
+    def __init__(self):
+        self.vectors = {}
+
+    def upsert(self, vectors):
+        self.vectors.update({record["id"]: record for record in vectors})
+
+    def delete(self, ids):
+        for i in ids:
+            self.vectors.pop(i, None)
+
+
+class FakePinecone:
+    index = None
+
+    def __init__(self, api_key=None):
+        pass
+
+    def Index(self, name):
+        return FakePinecone.index
+
+
+def chunk(i, text):
+    return {"id": i, "text": text, "metadata": {"source": "a.pdf", "page": 1}}
+
+
+def test_pinecone_target_keeps_the_bm25_chunk_file_in_step(tmp_path, monkeypatch):
+    FakePinecone.index = FakeIndex()
+    monkeypatch.setattr(pinecone, "Pinecone", FakePinecone)
+    chunk_file = tmp_path / "pinecone_chunks.jsonl"
+
+    store = PineconeTarget({}, chunk_file=str(chunk_file))
+    store.commit({"a", "b"}, [chunk("a", "alpha text"), chunk("b", "beta text")], np.ones((2, 3), dtype=np.float32))
+
+    # "a" is unchanged, "b" is dropped and "c" is new
+    store = PineconeTarget({"a.pdf": {"chunk_ids": ["a", "b"]}}, chunk_file=str(chunk_file))
+    assert store.known_ids() == {"a", "b"}
+    store.commit({"a", "c"}, [chunk("c", "gamma text")], np.ones((1, 3), dtype=np.float32))
+
+    assert set(FakePinecone.index.vectors) == {"a", "c"}
+    with open(chunk_file, encoding="utf-8") as f:
+        assert sorted(json.loads(line)["id"] for line in f) == ["a", "c"]
+    assert BM25Index.from_chunk_file(str(chunk_file)).search("gamma", 1)[0][0]["id"] == "c"
+
+
+def test_forced_pinecone_commit_does_not_duplicate_the_chunk_file(tmp_path, monkeypatch):
+    FakePinecone.index = FakeIndex()
+    monkeypatch.setattr(pinecone, "Pinecone", FakePinecone)
+    chunk_file = tmp_path / "pinecone_chunks.jsonl"
+    PineconeTarget({}, chunk_file=str(chunk_file)).commit({"a"}, [chunk("a", "alpha")], np.ones((1, 3), dtype=np.float32))
+
+    # --force starts from an empty manifest and embeds every chunk again
+    PineconeTarget({}, chunk_file=str(chunk_file)).commit({"a"}, [chunk("a", "alpha")], np.ones((1, 3), dtype=np.float32))
+    assert len(chunk_file.read_text().splitlines()) == 1
+
+
+def test_chunks_missing_from_the_chunk_file_are_not_known(tmp_path, monkeypatch):
+    monkeypatch.setattr(pinecone, "Pinecone", FakePinecone)
+    store = PineconeTarget({"a.pdf": {"chunk_ids": ["a"]}}, chunk_file=str(tmp_path / "missing.jsonl"))
+    assert store.known_ids() == set()
+
+
+def test_readiness_reports_the_bm25_corpus_without_requiring_it(app_client, monkeypatch, tmp_path):
+    app_client.app.state.crew_pool = object()
+    monkeypatch.setattr(app_module.chains, "compiled", lambda: True)
+    monkeypatch.setattr(db_handler, "HYBRID_RETRIEVAL", True)
+    monkeypatch.setattr(db_handler, "LOCAL_INDEX_DIR", str(tmp_path))
+    response = app_client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json()["bm25_corpus"] == "missing"
+
+    (tmp_path / "chunks.jsonl").write_text(json.dumps(chunk("a", "alpha")) + "\n")
+    assert app_client.get("/readyz").json()["bm25_corpus"] == "ready"
+    monkeypatch.setattr(db_handler, "HYBRID_RETRIEVAL", False)
+    assert app_client.get("/readyz").json()["bm25_corpus"] == "disabled"
+
+
+def test_forced_ingest_replaces_the_local_index_instead_of_duplicating_it(tmp_path, monkeypatch):
+    from src.social_media_blog import ingest as ingest_module
+    from src.social_media_blog.local_index import LocalVectorIndex
+
+    pdfs = tmp_path / "content"
+    pdfs.mkdir()
+    shutil.copy(Path(ingest_module.PDF_DIRECTORY) / "finance.pdf", pdfs)
+    monkeypatch.setattr(ingest_module, "LOCAL_INDEX_DIR", str(tmp_path / "index"))
+
+    def chunk_ids():
+        return [chunk["id"] for chunk in LocalVectorIndex(str(tmp_path / "index")).chunks]
+
+    first = ingest_module.ingest(str(pdfs), "local", workers=1)
+    ids = chunk_ids()
+    assert len(ids) == first["chunks"] == len(set(ids)) > 0
+
+    forced = ingest_module.ingest(str(pdfs), "local", workers=1, force=True)
+    assert forced["chunks_embedded"] == len(ids)
+    assert sorted(chunk_ids()) == sorted(ids)
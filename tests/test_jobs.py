@@ -0,0 +1,100 @@
+import asyncio
+import sqlite3
+import time
+
+from src.social_media_blog.blog_cache import SingleFlight
+from src.social_media_blog.chat_models import BlogResponse
+from src.social_media_blog.jobs import JobQueue, JobStore
+
+# Schema of job databases written before force_refresh was added
+OLD_SCHEMA = """
+CREATE TABLE jobs (
+    id TEXT PRIMARY KEY, dedup_key TEXT NOT NULL, topic TEXT NOT NULL, tone TEXT NOT NULL, status TEXT NOT NULL,
+    result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL
+)
+"""
+
+
+def blog(title="A title") -> BlogResponse:
+    return BlogResponse(title=title, content="Body", meta_description="Meta", blog_preview="Preview")
+
+
+def test_old_job_database_is_migrated(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute(OLD_SCHEMA)
+        conn.execute("INSERT INTO jobs VALUES ('old', 'k', 'topic', 'casual', 'queued', NULL, NULL, 1, 1)")
+    store = JobStore(path)
+    assert store.get("old")["force_refresh"] == 0
+    assert store.create("new topic", "casual", force_refresh=True)["force_refresh"] == 1
+
+
+def test_succeeded_jobs_are_reused_only_while_fresh():
+    store = JobStore(":memory:", max_age=60)
+    job = store.create("topic", "casual")
+    assert store.find_reusable("Topic!", "casual")["id"] == job["id"]
+    store.update(job["id"], "succeeded", result=blog().model_dump_json())
+    assert store.find_reusable("topic", "casual")["id"] == job["id"]
+    assert store.find_reusable("topic", "professional") is None
+    with store._conn:
+        store._conn.execute("UPDATE jobs SET updated_at = ?", (time.time() - 120,))
+    assert store.find_reusable("topic", "casual") is None
+
+
+def test_failed_jobs_are_not_reused():
+    store = JobStore(":memory:")
+    job = store.create("topic", "casual")
+    store.update(job["id"], "failed", error="boom")
+    assert store.find_reusable("topic", "casual") is None
+
+
+def test_queue_runs_and_deduplicates_jobs():
+    calls = []
+
+    async def runner(topic, tone, force_refresh=False):
+        calls.append((topic, tone, force_refresh))
+        await asyncio.sleep(0.01)
+        return blog(topic)
+
+    async def scenario():
+        queue = JobQueue(JobStore(":memory:"), runner, workers=2)
+        await queue.start()
+        first, deduplicated_first = queue.submit("topic", "casual")
+        second, deduplicated_second = queue.submit("topic", "casual")
+        await queue._queue.join()
+        finished = queue.store.get(first["id"])
+        refreshed, _ = queue.submit("topic", "casual", force_refresh=True)
+        await queue._queue.join()
+        await queue.stop()
+        return first, second, deduplicated_first, deduplicated_second, finished, refreshed
+
+    first, second, deduplicated_first, deduplicated_second, finished, refreshed = asyncio.run(scenario())
+    assert (deduplicated_first, deduplicated_second) == (False, True)
+    assert second["id"] == first["id"]
+    assert finished["status"] == "succeeded"
+    assert refreshed["id"] != first["id"]
+    assert calls == [("topic", "casual", False), ("topic", "casual", True)]
+
+
+def test_single_flight_shares_one_run_and_survives_a_cancelled_caller():
+    runs = []
+
+    async def scenario():
+        flights = SingleFlight()
+
+        async def factory():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        first = asyncio.create_task(flights.run("key", factory))
+        second = asyncio.create_task(flights.run("key", factory))
+        await asyncio.sleep(0.01)
+        assert "key" in flights
+        first.cancel()
+        result = await second
+        await asyncio.sleep(0)
+        return result, "key" in flights
+
+    assert asyncio.run(scenario()) == ("result", False)
+    assert runs == [1]
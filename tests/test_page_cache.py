@@ -0,0 +1,24 @@
+import os
+import time
+
+from src.social_media_blog.page_cache import PageCache, _digest
+
+
+def test_read_entries_survive_eviction(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=10 ** 6, fresh_for=60, search_ttl=60)
+    cache.store("https://a.example/post", "article a " * 50)
+    cache.store("https://b.example/post", "article b " * 50)
+    now = time.time()
+    for path in (tmp_path / "pages").iterdir():
+        os.utime(path, (now - 100, now - 100))
+    for path in (tmp_path / "blobs").iterdir():
+        os.utime(path, (now - 50, now - 50))
+
+    assert cache.lookup("https://a.example/post") is not None
+    # Room for one entry: the one read least recently goes
+    a_files = [tmp_path / "pages" / _digest("https://a.example/post"), tmp_path / "blobs" / _digest("article a " * 50)]
+    cache.max_bytes = int(sum(f.stat().st_size for f in a_files) / 0.9) + 1
+    cache.evict()
+
+    assert cache.lookup("https://a.example/post")["text"] == "article a " * 50
+    assert cache.lookup("https://b.example/post") is None
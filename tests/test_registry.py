@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from src.social_media_blog.registry import CrewPool
+
+
+class FakeCrew:
+    """Sets task callbacks the way crewai's Crew.kickoff does: only on tasks that have none"""
+
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def __init__(self, fail_on=None):
+        self.tasks = [SimpleNamespace(name="research_task", callback=None),
+                      SimpleNamespace(name="writing_task", callback=None)]
+        self.task_callback = None
+        self.fail_on = fail_on
+
+    def kickoff(self, inputs):
+        with FakeCrew.lock:
+            FakeCrew.active += 1
+            FakeCrew.max_active = max(FakeCrew.max_active, FakeCrew.active)
+        try:
+            for task in self.tasks:
+                if not task.callback:
+                    task.callback = self.task_callback
+            if inputs["topic"] == self.fail_on:
+                raise RuntimeError("crew failed")
+            outputs = [f"{task.name}:{inputs['topic']}" for task in self.tasks]
+            for task, output in zip(self.tasks, outputs):
+                if task.callback:
+                    task.callback(output)
+            return outputs
+        finally:
+            with FakeCrew.lock:
+                FakeCrew.active -= 1
+
+
+def test_each_lease_gets_its_own_task_callback():
+    async def main():
+        pool = CrewPool(FakeCrew, size=1)
+        first, second = [], []
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            await pool.kickoff(executor, {"topic": "a"}, task_callback=first.append)
+            await pool.kickoff(executor, {"topic": "b"}, task_callback=second.append)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == ["research_task:a", "writing_task:a"]
+    assert second == ["research_task:b", "writing_task:b"]
+
+
+def test_pool_runs_one_kickoff_per_crew():
+    FakeCrew.max_active = 0
+
+    async def main():
+        pool = CrewPool(FakeCrew, size=2)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            return await asyncio.gather(*(pool.kickoff(executor, {"topic": str(i)}) for i in range(6)))
+
+    results = asyncio.run(main())
+    assert [outputs[0] for outputs in results] == [f"research_task:{i}" for i in range(6)]
+    assert FakeCrew.max_active <= 2
+
+
+def test_failed_run_returns_a_fresh_crew_without_its_callback():
+    built, threads = [], []
+
+    def factory():
+        threads.append(threading.current_thread())
+        built.append(FakeCrew(fail_on="bad"))
+        return built[-1]
+
+    async def main():
+        pool = CrewPool(factory, size=1)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with pytest.raises(RuntimeError):
+                await pool.kickoff(executor, {"topic": "bad"}, task_callback=print)
+            return await pool._idle.get(), threading.current_thread()
+
+    crew, loop_thread = asyncio.run(main())
+    assert len(built) == 2 and crew is built[1]
+    # The replacement is built in the crew worker thread, not on the event loop
+    assert threads[1] is not loop_thread
+    assert all(task.callback is None for task in built[0].tasks)
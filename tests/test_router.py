@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from src.social_media_blog.router import FastRouter, parse_route
+
+
+@pytest.fixture
+def router(tmp_path):
+    return FastRouter(log_path=str(tmp_path / "decisions.jsonl"))
+
+
+@pytest.mark.parametrize("query", [
+    "Write a blog post about remote work",
+    "Can you generate an engaging, SEO-friendly article on quantum computing?",
+    "write me a short blog on sleep science",
+    "Please draft 3 blog posts about urban gardening",
+    "Compose an essay covering AI in healthcare",
+])
+def test_blog_requests_go_to_the_crew(router, query):
+    guess = router.classify(query)
+    assert (guess.route, guess.source) == ("crewai", "rule")
+
+
+@pytest.mark.parametrize("query", [
+    "create an account and post comments",
+    "how do I make a post public?",
+    "Hi! How do I make a post public?",
+    "I want to make a post private",
+    "How to write a blog for Mindtype?",
+])
+def test_support_questions_do_not_start_a_crew(router, query):
+    assert router.classify(query).route != "crewai"
+
+
+@pytest.mark.parametrize("answer, route", [
+    ("crewai", "crewai"),
+    ("Crewai.", "crewai"),
+    ("  LangChain\n", "langchain"),
+    ("Route: langchain", "langchain"),
+    ("I think this is a general question", None),
+    ("crewai or langchain", None),
+])
+def test_parse_route(answer, route):
+    assert parse_route(answer) == route
+
+
+class FakeChain:
+    def __init__(self, answer):
+        self.answer = answer
+
+    async def ainvoke(self, inputs):
+        return self.answer
+
+
+@pytest.mark.parametrize("answer, expected, cached", [
+    ("Crewai.", "crewai", "crewai"),
+    ("Sure! Let me think about where this should go.", "langchain", None),
+])
+def test_only_valid_router_answers_are_cached(monkeypatch, answer, expected, cached):
+    from src.social_media_blog import app as app_module
+
+    query = f"tell me something interesting {answer}"
+    monkeypatch.setattr(app_module.chains, "get", lambda name: FakeChain(answer))
+    assert asyncio.run(app_module.route_query_fast(query)) == expected
+    assert asyncio.run(app_module.route_cache.get(query)) == cached
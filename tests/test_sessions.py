@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from src.social_media_blog import app as app_module
+from src.social_media_blog import sessions as sessions_module
+from src.social_media_blog.sessions import SessionStore
+from src.social_media_blog.tokens import count_tokens
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions_module.time, "monotonic", clock)
+    return clock
+
+
+async def no_summary(summary, transcript):
+    raise AssertionError("nothing should be folded")
+
+
+def turn_tokens(user_message, reply):
+    return count_tokens(f"User: {user_message}\nAssistant: {reply}")
+
+
+def test_client_chosen_ids_are_replaced_with_issued_ones(clock):
+    store = SessionStore(no_summary)
+    started = store.resolve(None)
+    assert started and store.resolve(started) == started
+    issued = store.resolve("guessable")
+    assert issued != "guessable" and len(issued) >= 32
+    assert store.resolve(issued) == issued
+    # Recording under an id the store never issued keeps nothing
+    store.record("guessable", "hello", "hi")
+    assert store.history("guessable") == ""
+
+
+def test_history_keeps_the_newest_turns_within_budget(clock):
+    tokens = turn_tokens("question 1", "answer 1")
+    store = SessionStore(no_summary, window_tokens=tokens * 10)
+
+    async def main():
+        session_id = store.resolve("new")
+        for i in range(1, 4):
+            store.record(session_id, f"question {i}", f"answer {i}")
+        full = store.history(session_id)
+        store.window_tokens = tokens * 2
+        return full, store.history(session_id)
+
+    full, trimmed = asyncio.run(main())
+    assert full.splitlines()[0] == "User: question 1" and full.count("User:") == 3
+    assert trimmed == "User: question 2\nAssistant: answer 2\nUser: question 3\nAssistant: answer 3"
+
+
+def test_overflowing_turns_are_folded_into_the_summary(clock):
+    transcripts = []
+
+    async def summarize(summary, transcript):
+        transcripts.append(transcript)
+        return f"{summary} folded {transcript.count('User:')}".strip()
+
+    tokens = turn_tokens("question 1", "answer 1")
+    store = SessionStore(summarize, window_tokens=tokens * 4)
+
+    async def main():
+        session_id = store.resolve("new")
+        for i in range(1, 6):
+            store.record(session_id, f"question {i}", f"answer {i}")
+        await asyncio.gather(*store._folds)
+        return store.history(session_id), store._sessions[session_id]
+
+    history, session = asyncio.run(main())
+    # Folded down to half the window: the three oldest turns went into the summary
+    assert transcripts == ["\n".join(f"User: question {i}\nAssistant: answer {i}" for i in range(1, 4))]
+    assert history.startswith("Summary of earlier conversation: folded 3\nUser: question 4")
+    assert len(session.turns) == 2 and session.tokens == tokens * 2 and not session.folding
+
+
+def test_failed_summary_still_drops_the_old_turns(clock):
+    async def summarize(summary, transcript):
+        raise RuntimeError("provider down")
+
+    tokens = turn_tokens("question 1", "answer 1")
+    store = SessionStore(summarize, window_tokens=tokens * 2)
+
+    async def main():
+        session_id = store.resolve("new")
+        for i in range(1, 4):
+            store.record(session_id, f"question {i}", f"answer {i}")
+        await asyncio.gather(*store._folds)
+        return store.history(session_id)
+
+    assert asyncio.run(main()) == "User: question 3\nAssistant: answer 3"
+
+
+def test_idle_and_least_recently_used_sessions_are_evicted(clock):
+    store = SessionStore(no_summary, idle_seconds=60, max_sessions=2)
+    first, second = store.resolve("new"), store.resolve("new")
+    clock.now += 30
+    store.history(first)
+    third = store.resolve("new")
+    # Over max_sessions, the next access drops the least recently used session
+    store.history(third)
+    assert list(store._sessions) == [first, third]
+
+    # Past idle_seconds and the sweep interval, both idle sessions go
+    clock.now += 61
+    assert store.resolve(first) != first
+    assert store.snapshot()["sessions"] == 1
+
+
+def test_chat_returns_the_issued_session_id(app_client, monkeypatch):
+    seen = []
+
+    async def route(user_request):
+        return "langchain"
+
+    async def assistant(user_query, session_id=None):
+        seen.append(session_id)
+        return "hello"
+
+    monkeypatch.setattr(app_module, "route_query_fast", route)
+    monkeypatch.setattr(app_module, "assistant", assistant)
+    first = app_client.post("/chat", json={"topic": "hi"}).json()["session_id"]
+    second = app_client.post("/chat", json={"topic": "and then?", "session_id": first}).json()["session_id"]
+    guessed = app_client.post("/chat", json={"topic": "hi", "session_id": "mine"}).json()["session_id"]
+    assert first and second == first and seen[:2] == [first, first]
+    assert guessed not in ("mine", first)
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from src.social_media_blog import web_fetch
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"<html><body><p>Article text that is long enough to keep.</p></body></html>"):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = {"Content-Type": "text/html"}
+        self.url = "https://example.com/page"
+        self.encoding = "utf-8"
+        self.body = body
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, **kwargs):
+        return self.response
+
+
+@pytest.fixture
+def no_page_cache(monkeypatch):
+    monkeypatch.setattr(web_fetch, "PAGE_CACHE_DIR", "")
+
+
+def test_host_limits_are_bounded(monkeypatch):
+    monkeypatch.setattr(web_fetch, "FETCH_MAX_HOSTS", 3)
+    monkeypatch.setattr(web_fetch, "_host_limits", web_fetch.OrderedDict())
+    first = web_fetch.host_limit("https://a.example/1")
+    for host in ("b", "c"):
+        web_fetch.host_limit(f"https://{host}.example/")
+    assert web_fetch.host_limit("https://a.example/2") is first
+    web_fetch.host_limit("https://d.example/")
+    # b was the least recently used host
+    assert list(web_fetch._host_limits) == ["c.example", "a.example", "d.example"]
+
+
+def test_error_responses_are_not_extracted(monkeypatch, no_page_cache):
+    extracted = []
+    monkeypatch.setattr(web_fetch, "get_session", lambda: FakeSession(FakeResponse(404)))
+    monkeypatch.setattr(web_fetch, "extract_text", lambda html: extracted.append(html) or "text")
+    with pytest.raises(ValueError, match="HTTP 404"):
+        web_fetch.fetch_article("https://example.com/missing", time.monotonic() + 5)
+    assert extracted == []
+
+
+def test_ok_responses_are_extracted(monkeypatch, no_page_cache):
+    monkeypatch.setattr(web_fetch, "get_session", lambda: FakeSession(FakeResponse(200)))
+    monkeypatch.setattr(web_fetch, "extract_text", lambda html: "extracted")
+    assert web_fetch.fetch_article("https://example.com/page", time.monotonic() + 5) == "extracted"